@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class AuthenticationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'authentication'
+
+    def ready(self):
+        from django.conf import settings
+        from PIL import Image
+
+        from . import signals  # noqa: F401
+
+        # Pillow refuses to decode anything twice this size (decompression bombs).
+        Image.MAX_IMAGE_PIXELS = settings.PROFILE_PHOTO_MAX_PIXELS
@@ -1,6 +1,10 @@
-import bcrypt
 from django.contrib.auth.backends import ModelBackend
-from .models import User
+from .services_factory import ServiceFactory
+from .throttling import get_client_ip
+
+services_factory = ServiceFactory()
+login_service = services_factory.get_service("LOGIN")
+user_loader = services_factory.get_service("USER_LOADER")
 
 class EmailPasswordAuthBackend(ModelBackend):
     """
@@ -20,20 +24,19 @@ class EmailPasswordAuthBackend(ModelBackend):
             A user object if authentication is successful.
             None if authentication fails.
         """
-        try:
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
-            return None
-
-        if bcrypt.checkpw(password.encode('utf-8'), user.password.encode('utf-8')):
-            return user
-        else:
-            return None
+        result = login_service.authenticate(
+            email, password, client_ip=get_client_ip(request)
+        )
+        return result.user if result.is_authenticated else None
 
     def get_user(self, user_id):
         """
         Gets a user object based on its ID.
 
+        The user comes with its customer/companion row and is served from
+        the cache for a short time, so authenticated requests usually do not
+        query the database to load it.
+
         Args:
             user_id: ID of the user.
 
@@ -41,7 +44,4 @@ class EmailPasswordAuthBackend(ModelBackend):
             A user object if it exists.
             None if the user does not exist.
         """
-        try:
-            return User.objects.get(pk=user_id)
-        except User.DoesNotExist:
-            return None
+        return user_loader.get(user_id)
@@ -0,0 +1,110 @@
+"""
+Coded taxonomy of care needs.
+
+Every care need has a fixed bit. A customer's needs
+(MedicalInformation.careNeedsMask) and a companion's competencies
+(Companion.competenciesMask) are integer masks of these bits, so "the
+companion covers every need of the customer" is the single predicate
+`competenciesMask & needs == needs`.
+
+Bits are stored in the database: never reuse or renumber one, only append.
+
+The keywords, in English and Spanish, let `extract_mask` derive codes from
+the free text of the medical information and of the companion skills and
+certifications (see the `backfill_care_codes` command).
+"""
+import re
+from collections import namedtuple
+
+from django.db.models import F
+
+from .text_search import normalize
+
+CareNeed = namedtuple("CareNeed", ["bit", "code", "label", "keywords"])
+
+CARE_TAXONOMY = [
+    CareNeed(0, "diabetes", "Diabetes", ["diabetes", "diabetic", "diabetico", "glucose", "glucosa"]),
+    CareNeed(1, "hypertension", "Hypertension", ["hypertension", "high blood pressure", "hipertension", "presion alta"]),
+    CareNeed(2, "dementia", "Dementia / Alzheimer", ["dementia", "alzheimer", "demencia"]),
+    CareNeed(3, "parkinson", "Parkinson", ["parkinson"]),
+    CareNeed(4, "mobility", "Reduced mobility", ["wheelchair", "walker", "reduced mobility", "mobility", "silla de ruedas", "caminador", "movilidad"]),
+    CareNeed(5, "heart", "Heart disease", ["heart failure", "heart disease", "cardiac", "arrhythmia", "cardiaco", "cardiaca", "arritmia"]),
+    CareNeed(6, "respiratory", "Respiratory disease / oxygen", ["copd", "epoc", "asthma", "asma", "oxygen", "oxigeno"]),
+    CareNeed(7, "stroke", "Stroke recovery", ["stroke", "acv", "ictus"]),
+    CareNeed(8, "visual", "Visual impairment", ["blind", "blindness", "visual impairment", "low vision", "ceguera", "baja vision"]),
+    CareNeed(9, "hearing", "Hearing impairment", ["deaf", "hearing loss", "hearing impairment", "sordera", "hipoacusia"]),
+    CareNeed(10, "food_allergy", "Food allergy", ["peanut", "nuts", "gluten", "shellfish", "lactose", "mani", "mariscos", "lactosa"]),
+    CareNeed(11, "drug_allergy", "Drug allergy", ["penicillin", "sulfa", "aspirin", "penicilina", "aspirina"]),
+    CareNeed(12, "injections", "Injections / insulin", ["insulin", "injection", "injections", "insulina", "inyeccion", "inyecciones"]),
+    CareNeed(13, "incontinence", "Incontinence", ["incontinence", "diaper", "incontinencia", "panal"]),
+    CareNeed(14, "mental_health", "Depression / anxiety", ["depression", "anxiety", "depresion", "ansiedad"]),
+    CareNeed(15, "medication", "Medication management", ["medication management", "medication", "medicacion", "medicamentos"]),
+]
+
+CARE_CHOICES = [(1 << need.bit, need.label) for need in CARE_TAXONOMY]
+
+_BY_CODE = {need.code: need for need in CARE_TAXONOMY}
+
+# A keyword preceded by one of these in the same clause, within four words,
+# is not counted ("no diabetes", "sin alergia a la penicilina").
+_NEGATIONS = {"no", "not", "without", "denies", "sin", "niega", "nunca", "never"}
+_NEGATION_WINDOW = 4
+_CLAUSE_BREAK = re.compile(r"[,.;:()]|\b(?:but|and|pero|y)\b")
+
+_KEYWORDS = [
+    (re.compile(r"\b" + re.escape(keyword) + r"\b"), need.bit)
+    for need in CARE_TAXONOMY
+    for keyword in need.keywords
+]
+
+
+def to_mask(codes):
+    """
+    Converts care codes to a mask.
+
+    Raises:
+        ValueError: If a code is not in the taxonomy.
+    """
+    mask = 0
+    for code in codes:
+        if code not in _BY_CODE:
+            raise ValueError(f"Unknown care code '{code}'.")
+        mask |= 1 << _BY_CODE[code].bit
+    return mask
+
+
+def to_codes(mask):
+    return [need.code for need in CARE_TAXONOMY if mask & (1 << need.bit)]
+
+
+def to_labels(mask):
+    return [need.label for need in CARE_TAXONOMY if mask & (1 << need.bit)]
+
+
+def to_choices(mask):
+    """Values of the CARE_CHOICES selected by a mask, for form initial data."""
+    return [value for value, _ in CARE_CHOICES if mask & value]
+
+
+def extract_mask(*texts):
+    """Derives a mask from free text by keyword, skipping negated mentions."""
+    mask = 0
+    for text in texts:
+        text = normalize(text)
+        for pattern, bit in _KEYWORDS:
+            for match in pattern.finditer(text):
+                clause = _CLAUSE_BREAK.split(text[:match.start()])[-1]
+                before = clause.split()[-_NEGATION_WINDOW:]
+                if not _NEGATIONS & set(before):
+                    mask |= 1 << bit
+                    break
+    return mask
+
+
+def covering(queryset, needs, field="competenciesMask"):
+    """
+    Filters a queryset to the rows whose mask has every bit of `needs`.
+    """
+    if not needs:
+        return queryset
+    return queryset.alias(covered_needs=F(field).bitand(needs)).filter(covered_needs=needs)
@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from .models import User
+from .photos import PhotoTooLarge, check_limits
 
 
 class UserRegistrationForm(UserCreationForm):
@@ -67,3 +68,19 @@ class UserProfileForm(forms.ModelForm):
         super(UserProfileForm, self).__init__(*args, **kwargs)
         for field in self.fields.values():
             field.required = False
+
+    def clean_profilePhoto(self):
+        """
+        Rejects uploads over the configured byte or pixel ceilings.
+
+        Only the file size and the image header are inspected, the pixels
+        are never decoded here.
+        """
+        photo = self.cleaned_data.get("profilePhoto")
+        image = getattr(photo, "image", None)
+        if image is not None:
+            try:
+                check_limits(photo.size, *image.size)
+            except PhotoTooLarge as e:
+                raise forms.ValidationError(str(e))
+        return photo
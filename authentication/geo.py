@@ -0,0 +1,167 @@
+"""
+Offline geocoding and distance queries.
+
+Locations and addresses are free text ("Medellín", "Cra 43 # 10-20,
+Envigado"). They are matched against a gazetteer of Colombian
+municipalities bundled with the app (data/gazetteer_co.csv): no network
+call is made, and a text naming no municipality of the file is left
+without coordinates.
+
+Coordinates are stored with the number of the CELL_DEGREES grid cell that
+holds them. A "within N km" query only reads the rows of the cells touched
+by the bounding box of the circle, one indexed range of cell numbers per
+row of cells, and computes the exact haversine distance of those
+candidates alone.
+"""
+import csv
+import math
+import re
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from django.db.models import Q
+
+from .text_search import normalize
+
+GAZETTEER_PATH = Path(__file__).resolve().parent / "data" / "gazetteer_co.csv"
+
+EARTH_RADIUS_KM = 6371.0088
+
+# About 11 km of latitude: a 10 km query reads a handful of cells and a
+# 100 km one about twenty ranges.
+CELL_DEGREES = 0.1
+COLUMNS = round(360 / CELL_DEGREES)
+ROWS = round(180 / CELL_DEGREES)
+
+WORD_RE = re.compile(r"[^\W_]+")
+
+
+def _words(text):
+    return WORD_RE.findall(normalize(text))
+
+
+@lru_cache(maxsize=None)
+def gazetteer():
+    """
+    Loads the gazetteer.
+
+    Returns:
+        dict: (latitude, longitude) by place name and alias, as a tuple of
+        normalized words.
+    """
+    places = {}
+    with open(GAZETTEER_PATH, newline="", encoding="utf-8") as file:
+        for row in csv.DictReader(file):
+            point = (float(row["latitude"]), float(row["longitude"]))
+            names = [row["name"]] + [alias for alias in row["aliases"].split("|") if alias]
+            for name in names:
+                places[tuple(_words(name))] = point
+    return places
+
+
+def geocode(*texts):
+    """
+    Finds the first text naming a place of the gazetteer.
+
+    Within a text the longest name wins, then the last one, since addresses
+    end with the municipality ("Calle Bogotá 12, Chía").
+
+    Returns:
+        tuple: (latitude, longitude), or None when no text names a place.
+    """
+    places = gazetteer()
+    longest = max(map(len, places))
+    for text in texts:
+        words = _words(text)
+        for size in range(min(longest, len(words)), 0, -1):
+            for start in range(len(words) - size, -1, -1):
+                point = places.get(tuple(words[start:start + size]))
+                if point is not None:
+                    return point
+    return None
+
+
+def _row(latitude):
+    return min(max(math.floor((latitude + 90) / CELL_DEGREES), 0), ROWS - 1)
+
+
+def _column(longitude):
+    return math.floor((longitude + 180) / CELL_DEGREES) % COLUMNS
+
+
+def cell_of(latitude, longitude):
+    """Number of the grid cell holding a point."""
+    return _row(latitude) * COLUMNS + _column(longitude)
+
+
+def cell_ranges(latitude, longitude, radius_km):
+    """
+    Ranges of cell numbers covering the bounding box of a circle.
+
+    Returns:
+        list: Inclusive (first, last) cell numbers, one range per row of
+        cells (two where the box crosses the antimeridian).
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    south, north = latitude - math.degrees(angle), latitude + math.degrees(angle)
+    if south <= -90 or north >= 90 or angle >= math.pi / 2:
+        # A pole is inside the circle, every longitude is.
+        columns = [(0, COLUMNS - 1)]
+    else:
+        spread = math.degrees(
+            math.asin(min(math.sin(angle) / math.cos(math.radians(latitude)), 1.0))
+        )
+        west, east = _column(longitude - spread), _column(longitude + spread)
+        if spread >= 180 or (west, east) == (0, COLUMNS - 1):
+            columns = [(0, COLUMNS - 1)]
+        elif west <= east:
+            columns = [(west, east)]
+        else:
+            columns = [(west, COLUMNS - 1), (0, east)]
+    return [
+        (row * COLUMNS + first, row * COLUMNS + last)
+        for row in range(_row(south), _row(north) + 1)
+        for first, last in columns
+    ]
+
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """Great circle distances from a point to arrays of points, in km."""
+    latitude, longitude = math.radians(latitude), math.radians(longitude)
+    latitudes, longitudes = np.radians(latitudes), np.radians(longitudes)
+    a = (
+        np.sin((latitudes - latitude) / 2) ** 2
+        + math.cos(latitude) * np.cos(latitudes) * np.sin((longitudes - longitude) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def within(queryset, latitude, longitude, radius_km, limit=None, prefix=""):
+    """
+    Rows of a queryset within a distance of a point, nearest first.
+
+    Args:
+        queryset (QuerySet): Rows to search.
+        latitude (float), longitude (float): The point.
+        radius_km (float): Maximum distance, in km.
+        limit (int): Maximum number of rows, all by default.
+        prefix (str): Path to the User holding the coordinates, such as
+            "idUser__"; empty for a User queryset.
+
+    Returns:
+        list: (primary key, distance in km) pairs, nearest first.
+    """
+    cells = Q()
+    for first, last in cell_ranges(latitude, longitude, radius_km):
+        cells |= Q(**{f"{prefix}geoCell__range": (first, last)})
+    rows = list(
+        queryset.filter(cells).values_list("pk", f"{prefix}latitude", f"{prefix}longitude")
+    )
+    if not rows:
+        return []
+    ids, latitudes, longitudes = (np.array(column) for column in zip(*rows))
+    distances = haversine_km(latitude, longitude, latitudes.astype(float), longitudes.astype(float))
+    inside = np.flatnonzero(distances <= radius_km)
+    order = inside[np.lexsort((ids[inside], distances[inside]))][:limit]
+    return [(int(ids[row]), float(distances[row])) for row in order]
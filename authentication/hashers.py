@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.contrib.auth.hashers import BCryptSHA256PasswordHasher as BaseHasher
+
+
+class BCryptSHA256PasswordHasher(BaseHasher):
+    """
+    Django's BCryptSHA256 hasher with its cost factor tied to the
+    BCRYPT_ROUNDS setting, so the admin users and the custom User model
+    are tuned with the same knob.
+    """
+
+    @property
+    def rounds(self):
+        return settings.BCRYPT_ROUNDS
@@ -0,0 +1,61 @@
+import re
+
+import bcrypt
+from django.conf import settings
+
+# bcrypt only accepts cost factors in this range.
+MIN_ROUNDS = 4
+MAX_ROUNDS = 31
+
+# A bcrypt hash: version, two-digit cost factor, then 22 salt and 31 hash
+# characters of bcrypt's base64 alphabet.
+BCRYPT_HASH = re.compile(r"^\$2[aby]\$(\d{2})\$[./A-Za-z0-9]{53}$")
+
+
+def get_rounds(hashed):
+    """
+    Extracts the cost factor from a bcrypt hash ("$2b$12$...").
+
+    Args:
+        hashed (str): The stored bcrypt hash.
+
+    Returns:
+        int or None: The cost factor, or None if the value is not a bcrypt hash.
+    """
+    match = BCRYPT_HASH.fullmatch(hashed or "")
+    return int(match.group(1)) if match else None
+
+
+def is_hashed(value):
+    """Returns True if the value is a complete bcrypt hash."""
+    return get_rounds(value) is not None
+
+
+def hash_password(password, rounds=None):
+    """
+    Hashes a raw password with bcrypt.
+
+    Args:
+        password (str): The raw password.
+        rounds (int): Cost factor, defaults to the BCRYPT_ROUNDS setting.
+
+    Returns:
+        str: The bcrypt hash.
+    """
+    rounds = rounds or settings.BCRYPT_ROUNDS
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode(
+        "utf-8"
+    )
+
+
+def check_password(password, hashed):
+    """Checks a raw password against a stored bcrypt hash."""
+    return bcrypt.checkpw((password or "").encode("utf-8"), hashed.encode("utf-8"))
+
+
+def needs_rehash(hashed):
+    """
+    Returns True if the stored hash was made with a cost factor other than
+    the configured BCRYPT_ROUNDS, in either direction.
+    """
+    return get_rounds(hashed) != settings.BCRYPT_ROUNDS
@@ -0,0 +1,96 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from authentication.care_taxonomy import extract_mask, to_mask
+from companion.models import Certification, Companion, Skill
+from customer.models import MedicalInformation
+from reserve.matching import companion_index
+
+MEDICATION = to_mask(["medication"])
+
+
+class Command(BaseCommand):
+    help = (
+        "Derives the care codes of the medical information (careNeedsMask) "
+        "and of the companions (competenciesMask) from their free text. By "
+        "default only rows without codes are filled, so codes chosen in the "
+        "forms are kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--overwrite",
+            action="store_true",
+            help="Recompute the codes of every row, including rows that have some.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Count the rows that would change without saving them.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows read and updated per query (default: 1000).",
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        changed = self._backfill(
+            MedicalInformation.objects.all(), "careNeedsMask", self._medical_masks
+        )
+        self.stdout.write(f"Medical information: {changed} rows coded.")
+        changed = self._backfill(
+            Companion.objects.all(), "competenciesMask", self._companion_masks
+        )
+        self.stdout.write(f"Companions: {changed} rows coded.")
+        if changed and not options["dry_run"]:
+            # bulk_update bypasses the save signals that refresh the search index.
+            companion_index.invalidate()
+
+    def _backfill(self, queryset, field, masks):
+        if not self.options["overwrite"]:
+            queryset = queryset.filter(**{field: 0})
+        pks = list(queryset.order_by("pk").values_list("pk", flat=True))
+        changed = 0
+        size = self.options["batch_size"]
+        for start in range(0, len(pks), size):
+            rows = queryset.model.objects.filter(pk__in=pks[start:start + size])
+            updated = []
+            for row, mask in masks(rows):
+                if getattr(row, field) != mask:
+                    setattr(row, field, mask)
+                    updated.append(row)
+            changed += len(updated)
+            if updated and not self.options["dry_run"]:
+                with transaction.atomic():
+                    queryset.model.objects.bulk_update(updated, [field])
+        return changed
+
+    def _medical_masks(self, rows):
+        for row in rows:
+            mask = extract_mask(
+                row.allergies or "",
+                row.medicalConditions or "",
+                row.medicationIntake or "",
+                row.medicationRestriction or "",
+            )
+            # Any medication taken has to be managed by the companion.
+            if (row.medicationIntake or "").strip():
+                mask |= MEDICATION
+            yield row, mask
+
+    def _companion_masks(self, rows):
+        rows = list(rows)
+        texts = defaultdict(list)
+        ids = [row.pk for row in rows]
+        for model in (Skill, Certification):
+            for companion_id, description in model.objects.filter(
+                idCompanion__in=ids
+            ).values_list("idCompanion", "description"):
+                texts[companion_id].append(description)
+        for row in rows:
+            yield row, extract_mask(*texts[row.pk])
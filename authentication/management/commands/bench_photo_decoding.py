@@ -0,0 +1,94 @@
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from authentication.photos import open_bounded
+
+
+def _current_rss_kb():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * resource.getpagesize() // 1024
+
+
+def _generate(path, megapixels):
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    height = width * 3 // 4
+    # A gradient compresses like a photo far better than random noise.
+    img = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    img.save(path, "JPEG", quality=90)
+
+
+def _decode_naive(path, size):
+    # What User.save used to do: full decode, then thumbnail.
+    img = Image.open(path)
+    img.load()
+    img.thumbnail((size, size))
+
+
+def _decode_bounded(path, size):
+    with open(path, "rb") as photo_file:
+        open_bounded(photo_file, size, size_bytes=os.path.getsize(path))
+
+
+def _measure(strategy, path, size, queue):
+    """Runs in a fresh process so the peak RSS belongs to a single decode."""
+    baseline = _current_rss_kb()
+    start = time.perf_counter()
+    strategy(path, size)
+    elapsed = (time.perf_counter() - start) * 1000
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((elapsed, max(peak - baseline, 0) / 1024))
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks profile photo decoding: peak memory and time per upload "
+        "size, full decode versus the bounded draft-mode path."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--megapixels",
+            type=float,
+            nargs="+",
+            default=[2, 12, 24, 40],
+            help="Synthetic JPEG sizes to test (default: 2 12 24 40).",
+        )
+
+    def run_isolated(self, target, *args):
+        context = multiprocessing.get_context("fork")
+        queue = context.Queue()
+        process = context.Process(target=target, args=args + (queue,))
+        process.start()
+        result = queue.get()
+        process.join()
+        return result
+
+    def handle(self, *args, **options):
+        size = max(settings.PROFILE_PHOTO_RENDITIONS.values())
+        strategies = [("full decode", _decode_naive), ("bounded", _decode_bounded)]
+
+        self.stdout.write(
+            f"{'megapixels':>10} {'file MB':>8} {'strategy':>12} {'time ms':>9} {'peak MB':>8}"
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            for megapixels in options["megapixels"]:
+                path = os.path.join(tmp, f"{megapixels}mp.jpg")
+                context = multiprocessing.get_context("fork")
+                process = context.Process(target=_generate, args=(path, megapixels))
+                process.start()
+                process.join()
+                file_mb = os.path.getsize(path) / (1024 * 1024)
+
+                for name, strategy in strategies:
+                    elapsed, peak_mb = self.run_isolated(_measure, strategy, path, size)
+                    self.stdout.write(
+                        f"{megapixels:>10g} {file_mb:>8.1f} {name:>12} "
+                        f"{elapsed:>9.1f} {peak_mb:>8.1f}"
+                    )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from authentication.models import User
+from authentication.photos import build_renditions
+
+
+class Command(BaseCommand):
+    help = "Builds the renditions of every stored profile photo (e.g. after an upgrade)."
+
+    def handle(self, *args, **options):
+        photos = (
+            User.objects.exclude(profilePhoto="")
+            .exclude(profilePhoto__isnull=True)
+            .values_list("profilePhoto", flat=True)
+        )
+        built = failed = 0
+        for photo_name in photos.iterator():
+            try:
+                build_renditions(photo_name)
+                built += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"{photo_name}: {e}")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Built renditions for {built} photos ({failed} failed).")
+        )
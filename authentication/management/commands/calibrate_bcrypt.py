@@ -0,0 +1,108 @@
+import re
+import statistics
+import time
+
+import bcrypt
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.hashing import MAX_ROUNDS, MIN_ROUNDS
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks bcrypt on this host and recommends the highest cost factor "
+        "whose password check stays within the target latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target-ms",
+            type=float,
+            default=250.0,
+            help="Maximum acceptable time for one password check (default: 250).",
+        )
+        parser.add_argument("--min-rounds", type=int, default=10)
+        parser.add_argument("--max-rounds", type=int, default=16)
+        parser.add_argument(
+            "--samples",
+            type=int,
+            default=3,
+            help="Number of checks measured per cost factor (default: 3).",
+        )
+        parser.add_argument(
+            "--env-file",
+            help="Write the chosen BCRYPT_ROUNDS into this .env file.",
+        )
+
+    def measure(self, rounds, samples):
+        """Returns the median time in milliseconds of bcrypt.checkpw at a cost factor."""
+        password = b"calibration-password"
+        hashed = bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+        timings = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            bcrypt.checkpw(password, hashed)
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    def handle(self, *args, **options):
+        min_rounds = options["min_rounds"]
+        max_rounds = options["max_rounds"]
+        target_ms = options["target_ms"]
+
+        if not MIN_ROUNDS <= min_rounds <= max_rounds <= MAX_ROUNDS:
+            raise CommandError(
+                f"Rounds must satisfy {MIN_ROUNDS} <= min <= max <= {MAX_ROUNDS}."
+            )
+
+        chosen = None
+        for rounds in range(min_rounds, max_rounds + 1):
+            elapsed = self.measure(rounds, max(options["samples"], 1))
+            within = elapsed <= target_ms
+            self.stdout.write(
+                f"rounds={rounds:2d}  verify={elapsed:9.1f} ms  "
+                f"{'ok' if within else 'over target'}"
+            )
+            if not within:
+                # Each extra round doubles the cost, no need to go further.
+                break
+            chosen = rounds
+
+        if chosen is None:
+            chosen = min_rounds
+            self.stdout.write(
+                self.style.WARNING(
+                    f"No cost factor meets {target_ms} ms, falling back to {chosen}."
+                )
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Recommended BCRYPT_ROUNDS={chosen} (current: {settings.BCRYPT_ROUNDS})"
+            )
+        )
+
+        if options["env_file"]:
+            self.write_env(options["env_file"], chosen)
+
+    def write_env(self, path, rounds):
+        """Sets BCRYPT_ROUNDS in the given .env file, keeping every other line."""
+        try:
+            with open(path, newline="") as env_file:
+                content = env_file.read()
+        except FileNotFoundError:
+            content = ""
+
+        newline = "\r\n" if "\r\n" in content else "\n"
+        line = f"BCRYPT_ROUNDS = {rounds}"
+        if re.search(r"^BCRYPT_ROUNDS\s*=.*$", content, flags=re.M):
+            content = re.sub(r"^BCRYPT_ROUNDS\s*=.*$", line, content, flags=re.M)
+        else:
+            if content and not content.endswith(("\n", "\r\n")):
+                content += newline
+            content += line + newline
+
+        with open(path, "w", newline="") as env_file:
+            env_file.write(content)
+        self.stdout.write(f"Updated {path}.")
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from authentication.models import User
+
+GEO_FIELDS = ["latitude", "longitude", "geoCell"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Looks up the coordinates of the users from their location or address "
+        "in the offline gazetteer. By default only users without coordinates "
+        "are geocoded; use --overwrite after updating the gazetteer file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--overwrite",
+            action="store_true",
+            help="Geocode every user, including users that have coordinates.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Count the users that would change without saving them.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Users read and updated per query (default: 1000).",
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if not options["overwrite"]:
+            users = users.filter(geoCell__isnull=True)
+        pks = list(users.order_by("pk").values_list("pk", flat=True))
+
+        changed = unmatched = 0
+        size = options["batch_size"]
+        for start in range(0, len(pks), size):
+            updated = []
+            for user in User.objects.filter(pk__in=pks[start:start + size]).only(
+                "location", "address", *GEO_FIELDS
+            ):
+                before = [getattr(user, field) for field in GEO_FIELDS]
+                user.geocode()
+                if user.geoCell is None:
+                    unmatched += 1
+                if [getattr(user, field) for field in GEO_FIELDS] != before:
+                    updated.append(user)
+            changed += len(updated)
+            if updated and not options["dry_run"]:
+                with transaction.atomic():
+                    User.objects.bulk_update(updated, GEO_FIELDS)
+
+        self.stdout.write(
+            f"{changed} users geocoded, {unmatched} with no known place in "
+            "their location or address."
+        )
@@ -0,0 +1,315 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from authentication.hashing import hash_password
+from authentication.models import Language, LanguageUser, User
+from authentication.text_search import skill_index
+from companion.autocomplete import skill_autocomplete
+from companion.models import Companion, Skill
+from customer.models import Customer
+from reserve.matching import companion_index
+
+ROLES = ("companion", "customer")
+GENRES = ("male", "female", "other")
+
+
+def _hash(args):
+    password, rounds = args
+    return hash_password(password, rounds)
+
+
+def _split_list(value):
+    """Skills and languages come as a JSON list or a ';' separated string."""
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if str(item).strip()]
+    return [item.strip() for item in (value or "").split(";") if item.strip()]
+
+
+def _clean_row(row):
+    """
+    Validates a raw input row.
+
+    Returns:
+        dict: The cleaned values.
+
+    Raises:
+        ValueError: If the row cannot be imported.
+    """
+    for required in ("names", "lastNames", "email", "password"):
+        if not (row.get(required) or "").strip():
+            raise ValueError(f"missing {required}")
+
+    role = (row.get("role") or "companion").strip().lower()
+    if role not in ROLES:
+        raise ValueError(f"unknown role '{role}'")
+
+    genre = (row.get("genre") or "").strip().lower() or None
+    if genre is not None and genre not in GENRES:
+        raise ValueError(f"unknown genre '{genre}'")
+
+    birth_date = (row.get("birthDate") or "").strip() or None
+    hourly_rate = (str(row.get("hourlyRate") or "")).strip() or None
+    try:
+        birth_date = date.fromisoformat(birth_date) if birth_date else None
+        hourly_rate = Decimal(hourly_rate) if hourly_rate else None
+    except (ValueError, InvalidOperation) as e:
+        raise ValueError(str(e))
+
+    return {
+        "names": row["names"].strip(),
+        "lastNames": row["lastNames"].strip(),
+        "email": row["email"].strip(),
+        "password": row["password"],
+        "phone": (row.get("phone") or "").strip() or None,
+        "address": (row.get("address") or "").strip() or None,
+        "location": (row.get("location") or "").strip() or None,
+        "birthDate": birth_date,
+        "genre": genre,
+        "role": role,
+        "hourlyRate": hourly_rate,
+        "personalDescription": (row.get("personalDescription") or "").strip() or None,
+        "skills": _split_list(row.get("skills")),
+        "languages": _split_list(row.get("languages")),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports users with their companion/customer profile, skills and "
+        "languages from a CSV or JSONL file, hashing passwords in parallel."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV (with header) or JSONL file.")
+        parser.add_argument("--format", choices=("csv", "jsonl"))
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Processes used to hash passwords (default: CPU count).",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="Checkpoint file (default: <path>.checkpoint).",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Skip the rows already imported according to the checkpoint.",
+        )
+
+    def read_rows(self, path, fmt, after=0):
+        """
+        Streams (row number, row dict) pairs from the input file: CSV record
+        numbers, or JSONL line numbers counting the blank lines.
+
+        Args:
+            after (int): Row number to resume after, from the checkpoint.
+        """
+        with open(path, newline="", encoding="utf-8") as input_file:
+            if fmt == "csv":
+                for number, row in enumerate(csv.DictReader(input_file), start=1):
+                    if number > after:
+                        yield number, row
+            else:
+                for number, line in enumerate(input_file, start=1):
+                    if number > after and line.strip():
+                        yield number, json.loads(line)
+
+    def read_checkpoint(self, path):
+        try:
+            with open(path) as checkpoint:
+                return json.load(checkpoint)["rows_done"]
+        except FileNotFoundError:
+            return 0
+
+    def write_checkpoint(self, path, rows_done):
+        # Write then rename, so an interrupted run never leaves a torn file.
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as checkpoint:
+            json.dump({"rows_done": rows_done}, checkpoint)
+        os.replace(tmp_path, path)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.exists(path):
+            raise CommandError(f"{path} does not exist.")
+        fmt = options["format"] or ("jsonl" if path.endswith(".jsonl") else "csv")
+        checkpoint_path = options["checkpoint"] or f"{path}.checkpoint"
+        batch_size = max(options["batch_size"], 1)
+
+        rows_done = self.read_checkpoint(checkpoint_path) if options["resume"] else 0
+        if rows_done:
+            self.stdout.write(f"Resuming after row {rows_done}.")
+        rows = self.read_rows(path, fmt, after=rows_done)
+
+        self.imported = self.skipped = 0
+        started = time.perf_counter()
+        rounds = settings.BCRYPT_ROUNDS
+        self.workers = options["workers"] or os.cpu_count() or 1
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            batch = list(islice(rows, batch_size))
+            cleaned = self.clean_batch(batch)
+            hashed = self.submit_hashes(pool, cleaned, rounds)
+            while batch:
+                # Hash the next batch while this one is written.
+                next_batch = list(islice(rows, batch_size))
+                next_cleaned = self.clean_batch(next_batch)
+                next_hashed = self.submit_hashes(pool, next_cleaned, rounds)
+
+                self.import_batch(cleaned, hashed)
+                rows_done = batch[-1][0]
+                self.write_checkpoint(checkpoint_path, rows_done)
+
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"row {rows_done}: {self.imported} imported, {self.skipped} "
+                    f"skipped, {self.imported / elapsed:.0f} rows/s"
+                )
+                batch, cleaned, hashed = next_batch, next_cleaned, next_hashed
+
+        # Bulk inserts bypass the signals maintaining the skill vocabulary
+        # and the companion index used by search, pricing and assignment.
+        skill_index.invalidate()
+        skill_autocomplete.invalidate()
+        companion_index.invalidate()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {self.imported} users ({self.skipped} skipped) in "
+                f"{elapsed:.1f} s, {self.imported / max(elapsed, 1e-9):.0f} rows/s."
+            )
+        )
+
+    def clean_batch(self, batch):
+        """
+        Validates the rows of a batch, so only importable rows get hashed.
+
+        Emails and language names are compared casefolded, as the
+        case-insensitive collation of the database does.
+
+        Returns:
+            dict: Cleaned values by casefolded email.
+        """
+        cleaned = {}
+        for number, row in batch:
+            try:
+                values = _clean_row(row)
+            except ValueError as e:
+                self.skip(number, str(e))
+                continue
+            email = values["email"].casefold()
+            if email in cleaned:
+                self.skip(number, "duplicated email in the file")
+                continue
+            values["number"] = number
+            cleaned[email] = values
+        return cleaned
+
+    def submit_hashes(self, pool, cleaned, rounds):
+        passwords = [(str(values["password"]), rounds) for values in cleaned.values()]
+        chunksize = max(len(passwords) // (self.workers * 4), 1)
+        return pool.map(_hash, passwords, chunksize=chunksize)
+
+    def import_batch(self, cleaned, hashed):
+        for values, password_hash in zip(cleaned.values(), hashed):
+            values["password"] = password_hash
+        emails = [values["email"] for values in cleaned.values()]
+
+        with transaction.atomic():
+            existing = {
+                email.casefold()
+                for email in User.objects.filter(email__in=emails).values_list(
+                    "email", flat=True
+                )
+            }
+            for email in existing & cleaned.keys():
+                self.skip(cleaned.pop(email)["number"], "email already registered")
+            if not cleaned:
+                return
+            emails = [values["email"] for values in cleaned.values()]
+
+            user_fields = (
+                "names", "lastNames", "email", "password", "phone",
+                "address", "location", "birthDate", "genre",
+            )
+            users = [User(**{f: values[f] for f in user_fields}) for values in cleaned.values()]
+            for user in users:
+                # bulk_create skips User.save(), which looks up the coordinates.
+                user.geocode()
+            User.objects.bulk_create(users)
+            # Some backends (MySQL) do not return primary keys from bulk_create.
+            user_ids = {
+                email.casefold(): user_id
+                for email, user_id in User.objects.filter(
+                    email__in=emails
+                ).values_list("email", "idUser")
+            }
+
+            Customer.objects.bulk_create(
+                Customer(idUser_id=user_ids[email], accountState="active")
+                for email, values in cleaned.items()
+                if values["role"] == "customer"
+            )
+            Companion.objects.bulk_create(
+                Companion(
+                    idUser_id=user_ids[email],
+                    stateAvailability="available",
+                    hourlyRate=values["hourlyRate"],
+                    personalDescription=values["personalDescription"],
+                )
+                for email, values in cleaned.items()
+                if values["role"] == "companion"
+            )
+
+            companion_ids = dict(
+                Companion.objects.filter(idUser_id__in=user_ids.values()).values_list(
+                    "idUser_id", "idCompanion"
+                )
+            )
+            Skill.objects.bulk_create(
+                Skill(idCompanion_id=companion_ids[user_ids[email]], description=skill)
+                for email, values in cleaned.items()
+                if values["role"] == "companion"
+                for skill in values["skills"]
+            )
+
+            # First spelling of each language, by casefolded name.
+            language_names = {}
+            for values in cleaned.values():
+                for name in values["languages"]:
+                    language_names.setdefault(name.casefold(), name)
+            Language.objects.bulk_create(
+                [Language(name=name) for name in language_names.values()],
+                ignore_conflicts=True,
+            )
+            language_ids = {
+                name.casefold(): language_id
+                for name, language_id in Language.objects.filter(
+                    name__in=language_names.values()
+                ).values_list("name", "idLanguage")
+            }
+            LanguageUser.objects.bulk_create(
+                LanguageUser(idUser_id=user_ids[email], idLanguage_id=language_ids[name])
+                for email, values in cleaned.items()
+                for name in {name.casefold() for name in values["languages"]}
+            )
+
+        self.imported += len(cleaned)
+
+    def skip(self, number, reason):
+        self.skipped += 1
+        self.stderr.write(f"row {number}: skipped, {reason}")
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from authentication.throttling import LoginShield
+
+
+class Command(BaseCommand):
+    help = (
+        "Shows the login shield counters: throttled attempts, unknown email "
+        "cache hits and the bcrypt checks they saved."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset", action="store_true", help="Reset the counters afterwards."
+        )
+
+    def handle(self, *args, **options):
+        shield = LoginShield()
+        for counter, value in shield.stats().items():
+            self.stdout.write(f"{counter:26s} {value}")
+
+        if options["reset"]:
+            shield.reset_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from authentication.text_search import text_indexes
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the skill and preference text indexes: the SQLite FTS5 "
+        "table when it is used, and the in-process vocabulary and index of "
+        "every running process. Run it after loading rows with bulk inserts "
+        "or raw SQL, which bypass the save and delete signals."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--index",
+            choices=sorted(text_indexes),
+            action="append",
+            help="Index to rebuild, may be repeated (default: all).",
+        )
+
+    def handle(self, *args, **options):
+        for name in options["index"] or sorted(text_indexes):
+            index = text_indexes[name]
+            start = time.perf_counter()
+            state = index.rebuild()
+            self.stdout.write(
+                f"{name}: {index.backend} backend, {len(state.vocabulary.tokens)} tokens, "
+                f"rebuilt in {(time.perf_counter() - start) * 1000:.0f} ms."
+            )
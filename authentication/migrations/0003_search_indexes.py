@@ -0,0 +1,21 @@
+# Generated by Django 4.2.4 on 2026-10-17 03:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_alter_user_profilephoto'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='languageuser',
+            index=models.Index(fields=['idUser', 'idLanguage'], name='languageuser_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['location', 'genre'], name='user_location_genre_idx'),
+        ),
+    ]
@@ -0,0 +1,95 @@
+from django.db.models import FileField
+
+
+class DirtyFieldsMixin:
+    """
+    Model mixin that remembers the field values loaded from the database.
+
+    `save()` on a loaded instance then only writes the columns that changed
+    (`UPDATE ... SET changed columns`), and skips the query entirely when
+    nothing changed. Models can use `get_dirty_fields()` and
+    `get_loaded_value()` in their own save() to run side effects only when
+    the relevant fields changed, without fetching the stored row again.
+
+    Passing `update_fields` explicitly keeps Django's default behaviour.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            field.attname: instance._comparable_value(field)
+            for field in cls._meta.concrete_fields
+            if field.attname in field_names
+        }
+        return instance
+
+    def _comparable_value(self, field):
+        value = getattr(self, field.attname)
+        if isinstance(field, FileField):
+            # Compare files by name; a new upload is dirty until it is committed.
+            if value and not value._committed:
+                return object()
+            return value.name or None
+        return value
+
+    def get_loaded_value(self, attname):
+        """Returns the value a field had when the instance was loaded."""
+        return getattr(self, "_loaded_values", {}).get(attname)
+
+    def get_dirty_fields(self):
+        """
+        Returns the names of the concrete fields changed since the instance
+        was loaded or last saved. Deferred fields that were never touched are
+        not considered dirty.
+        """
+        loaded = getattr(self, "_loaded_values", None)
+        if loaded is None:
+            return [field.name for field in self._meta.concrete_fields]
+
+        dirty = []
+        for field in self._meta.concrete_fields:
+            if field.primary_key or field.attname not in self.__dict__:
+                continue
+            if (
+                field.attname not in loaded
+                or self._comparable_value(field) != loaded[field.attname]
+            ):
+                dirty.append(field.name)
+        return dirty
+
+    def _snapshot(self, field_names=None):
+        fields = self._meta.concrete_fields
+        if field_names is not None:
+            fields = [
+                field
+                for field in fields
+                if field.name in field_names or field.attname in field_names
+            ]
+        loaded = self.__dict__.setdefault("_loaded_values", {})
+        for field in fields:
+            if field.attname in self.__dict__:
+                loaded[field.attname] = self._comparable_value(field)
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and self.pk is not None
+            and hasattr(self, "_loaded_values")
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+            and not args
+        ):
+            # auto_now fields change on every save, they must always be written.
+            kwargs["update_fields"] = self.get_dirty_fields() + [
+                field.name
+                for field in self._meta.concrete_fields
+                if getattr(field, "auto_now", False)
+            ]
+
+        super().save(*args, **kwargs)
+        self._snapshot(kwargs.get("update_fields"))
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self._snapshot(fields)
@@ -1,14 +1,17 @@
-import bcrypt
 from django.db import models
-from PIL import Image
-import os
 from django.contrib.auth.models import AbstractBaseUser
+from .geo import cell_of, geocode
+from .hashing import hash_password, is_hashed
+from .mixins import DirtyFieldsMixin
+from .photos import delete_photo, enqueue_renditions
 
 
-class User(AbstractBaseUser):
+class User(DirtyFieldsMixin, AbstractBaseUser):
     """
     Custom User model extending AbstractBaseUser.
 
+    Saving a loaded user only writes the fields that changed (see DirtyFieldsMixin).
+
     Attributes:
         idUser (AutoField): Primary key for the User model.
         names (CharField): User's first name(s).
@@ -22,6 +25,9 @@ class User(AbstractBaseUser):
         profilePhoto (CharField): Path to the user's profile photo.
         registrationDate (DateField): Date when the user registered.
         location (CharField): User's current location.
+        latitude (FloatField): Latitude of the location (or address), from the offline gazetteer.
+        longitude (FloatField): Longitude of the location (or address), from the offline gazetteer.
+        geoCell (IntegerField): Grid cell of the coordinates, see geo.py.
     """
 
     idUser = models.AutoField(primary_key=True)
@@ -40,43 +46,69 @@ class User(AbstractBaseUser):
     profilePhoto = models.ImageField(upload_to="profile_photos/", null=True)
     registrationDate = models.DateField(auto_now_add=True)
     location = models.CharField(max_length=100, null=True)
+    latitude = models.FloatField(null=True, editable=False)
+    longitude = models.FloatField(null=True, editable=False)
+    geoCell = models.IntegerField(null=True, editable=False)
 
     USERNAME_FIELD = "email"
 
+    class Meta:
+        indexes = [
+            # Companion search filters by location and genre.
+            models.Index(fields=["location", "genre"], name="user_location_genre_idx"),
+            # Distance queries read the users of a few ranges of grid cells.
+            models.Index(fields=["geoCell"], name="user_geo_cell_idx"),
+        ]
+
+    def geocode(self):
+        """
+        Sets the coordinates from the location, or else the address, using
+        the offline gazetteer. They are cleared when neither names a place.
+        """
+        point = geocode(self.location, self.address)
+        self.latitude, self.longitude = point or (None, None)
+        self.geoCell = cell_of(*point) if point else None
+
     def save(self, *args, **kwargs):
         """
         Overrides the save method to hash the password before saving.
 
+        The password is hashed when it was set or changed to a raw value, and
+        the coordinates are looked up when the location or address changed. A
+        new profile photo is stored as uploaded; its renditions are built
+        by a background worker once the transaction commits (see photos.py).
+
         Args:
             *args: Additional positional arguments.
             **kwargs: Additional keyword arguments.
         """
-        if not self.idUser and self.password:
-            self.password = bcrypt.hashpw(
-                self.password.encode("utf-8"), bcrypt.gensalt()
-            ).decode("utf-8")
-
-        # Remove the previous profile photo before saving the new one
-        try:
-            old_instance = User.objects.get(pk=self.pk)
-            if (
-                old_instance.profilePhoto
-                and self.profilePhoto != old_instance.profilePhoto
-            ):
-                if os.path.isfile(old_instance.profilePhoto.path):
-                    os.remove(old_instance.profilePhoto.path)
-        except User.DoesNotExist:
-            pass
+        dirty_fields = self.get_dirty_fields()
+
+        if "password" in dirty_fields and self.password and not is_hashed(self.password):
+            self.password = hash_password(self.password)
+
+        update_fields = kwargs.get("update_fields")
+        place_fields = {"location", "address"}
+        if place_fields & set(dirty_fields) and (
+            update_fields is None or place_fields & set(update_fields)
+        ):
+            self.geocode()
+            if update_fields is not None:
+                kwargs["update_fields"] = list(update_fields) + [
+                    "latitude", "longitude", "geoCell"
+                ]
+
+        stored_photo = self.get_loaded_value("profilePhoto")
+        photo_changed = "profilePhoto" in dirty_fields
 
         super(User, self).save(*args, **kwargs)
 
-        # Resize and save the profile photo if it exists
-        if self.profilePhoto:
-            img = Image.open(self.profilePhoto.path)
-            if img.height > 300 or img.width > 300:
-                output_size = (300, 300)
-                img.thumbnail(output_size)
-                img.save(self.profilePhoto.path)
+        if photo_changed:
+            # Remove the previous profile photo and its renditions
+            if stored_photo:
+                delete_photo(stored_photo)
+            if self.profilePhoto:
+                enqueue_renditions(self.profilePhoto.name)
 
 
 class Language(models.Model):
@@ -105,3 +137,9 @@ class LanguageUser(models.Model):
     idLanguageUser = models.AutoField(primary_key=True)
     idUser = models.ForeignKey(User, on_delete=models.CASCADE)
     idLanguage = models.ForeignKey(Language, on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            # Companion search probes "does this user speak this language".
+            models.Index(fields=["idUser", "idLanguage"], name="languageuser_user_idx"),
+        ]
@@ -0,0 +1,216 @@
+"""
+Profile photo renditions.
+
+Uploaded photos are stored as-is; a background worker then writes one
+rendition per size in PROFILE_PHOTO_RENDITIONS, both in WebP and JPEG,
+next to the original under `profile_photos/renditions/`. Templates pick the
+smallest rendition that fits with the `profile_photo_url` tag and fall back
+to the original until the renditions exist.
+
+Decoding is memory bounded: uploads over PROFILE_PHOTO_MAX_BYTES or
+PROFILE_PHOTO_MAX_PIXELS are rejected from the file size and the image
+header, before any pixel is decoded, and JPEGs are decoded in draft mode
+directly at the scale needed by the largest rendition.
+"""
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS_DIR = "profile_photos/renditions"
+
+# Pillow format name and file extension of every rendition format.
+FORMATS = {
+    "webp": ("WEBP", "webp"),
+    "jpeg": ("JPEG", "jpg"),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Rendition names known to exist, so templates do not stat files on every render.
+_existing = set()
+
+
+class PhotoTooLarge(ValueError):
+    """Raised when a photo exceeds the configured byte or pixel ceilings."""
+
+
+def check_limits(size_bytes, width, height):
+    """
+    Enforces PROFILE_PHOTO_MAX_BYTES and PROFILE_PHOTO_MAX_PIXELS.
+
+    Raises:
+        PhotoTooLarge: If the photo exceeds any of the ceilings.
+    """
+    if size_bytes is not None and size_bytes > settings.PROFILE_PHOTO_MAX_BYTES:
+        raise PhotoTooLarge(
+            f"The photo exceeds {settings.PROFILE_PHOTO_MAX_BYTES // (1024 * 1024)} MB."
+        )
+    if width * height > settings.PROFILE_PHOTO_MAX_PIXELS:
+        raise PhotoTooLarge(
+            f"The photo exceeds {settings.PROFILE_PHOTO_MAX_PIXELS // 1_000_000} megapixels."
+        )
+
+
+def open_bounded(photo_file, max_size, size_bytes=None):
+    """
+    Decodes a photo using as little memory as possible.
+
+    Only the header is read before the limits are checked. JPEGs are then
+    decoded in draft mode, which lets libjpeg scale by 1/2, 1/4 or 1/8 while
+    decoding, so a 40 megapixel photo never exists in memory at full size.
+    The EXIF orientation is applied on the reduced image.
+
+    Args:
+        photo_file: Open binary file of the photo.
+        max_size (int): Largest bounding box the caller will need, in pixels.
+        size_bytes (int): Size of the file, checked before the header is read.
+
+    Returns:
+        Image: An upright RGB image no larger than `max_size` on either side.
+
+    Raises:
+        PhotoTooLarge: If the photo exceeds the configured ceilings.
+    """
+    check_limits(size_bytes, 0, 0)
+    img = Image.open(photo_file)
+    check_limits(None, *img.size)
+
+    if img.format == "JPEG":
+        img.draft("RGB", (max_size, max_size))
+    img = ImageOps.exif_transpose(img)
+    img.thumbnail((max_size, max_size), reducing_gap=3.0)
+    return img.convert("RGB")
+
+
+def get_renditions():
+    """Returns the configured renditions as (name, size) pairs, smallest first."""
+    return sorted(settings.PROFILE_PHOTO_RENDITIONS.items(), key=lambda item: item[1])
+
+
+def rendition_name(photo_name, rendition, fmt):
+    """
+    Builds the storage name of a rendition.
+
+    Args:
+        photo_name (str): Storage name of the original photo.
+        rendition (str): Rendition name, e.g. "avatar".
+        fmt (str): "webp" or "jpeg".
+
+    The stem of the photo is followed by a digest of its whole name, so
+    photos differing only by extension or directory never share renditions.
+    """
+    stem = os.path.splitext(os.path.basename(photo_name))[0]
+    digest = hashlib.sha1(photo_name.encode("utf-8")).hexdigest()[:12]
+    return f"{RENDITIONS_DIR}/{stem}-{digest}_{rendition}.{FORMATS[fmt][1]}"
+
+
+def build_renditions(photo_name):
+    """
+    Writes every rendition of a stored photo, replacing existing ones.
+
+    Args:
+        photo_name (str): Storage name of the original photo.
+    """
+    renditions = get_renditions()
+    with default_storage.open(photo_name, "rb") as photo_file:
+        img = open_bounded(
+            photo_file, renditions[-1][1], size_bytes=default_storage.size(photo_name)
+        )
+
+    for rendition, size in renditions:
+        resized = img.copy()
+        resized.thumbnail((size, size))
+        for fmt, (pillow_format, _) in FORMATS.items():
+            buffer = BytesIO()
+            resized.save(
+                buffer,
+                pillow_format,
+                quality=settings.PROFILE_PHOTO_QUALITY,
+                optimize=True,
+            )
+            name = rendition_name(photo_name, rendition, fmt)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            default_storage.save(name, ContentFile(buffer.getvalue()))
+            _existing.add(name)
+
+
+def delete_photo(photo_name):
+    """Deletes a stored photo together with all of its renditions."""
+    names = [photo_name] + [
+        rendition_name(photo_name, rendition, fmt)
+        for rendition, _ in get_renditions()
+        for fmt in FORMATS
+    ]
+    for name in names:
+        _existing.discard(name)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.PROFILE_PHOTO_WORKERS,
+                    thread_name_prefix="profile-photos",
+                )
+    return _executor
+
+
+def _build_logged(photo_name):
+    try:
+        build_renditions(photo_name)
+    except Exception:
+        logger.exception("Could not build renditions of %s", photo_name)
+
+
+def enqueue_renditions(photo_name):
+    """
+    Queues the renditions of a photo once the current transaction commits,
+    so the request does not wait for the image processing.
+    """
+    transaction.on_commit(lambda: get_executor().submit(_build_logged, photo_name))
+
+
+def rendition_url(photo, size, accepts_webp=False):
+    """
+    Returns the URL of the smallest rendition at least `size` pixels wide.
+
+    Args:
+        photo (FieldFile): The user's profilePhoto.
+        size (int or str): Minimum size in pixels, or a rendition name.
+        accepts_webp (bool): Whether the client can display WebP.
+
+    Returns:
+        str: The rendition URL, or the original photo URL when the rendition
+        has not been built yet.
+    """
+    renditions = get_renditions()
+    if isinstance(size, str) and not size.isdigit():
+        size = settings.PROFILE_PHOTO_RENDITIONS[size]
+    size = int(size)
+
+    # Smallest rendition that fits, or the largest one if none does.
+    rendition = next(
+        (name for name, px in renditions if px >= size), renditions[-1][0]
+    )
+    name = rendition_name(photo.name, rendition, "webp" if accepts_webp else "jpeg")
+    if name in _existing or default_storage.exists(name):
+        _existing.add(name)
+        return default_storage.url(name)
+    return photo.url
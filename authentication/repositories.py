@@ -0,0 +1,95 @@
+from abc import ABC, abstractmethod
+from django.core.exceptions import ObjectDoesNotExist
+from .models import User
+
+# Reverse one-to-one accessors of the profile models pointing to User.
+ROLE_RELATIONS = ("customer", "companion")
+
+
+class AbstractUserRepository(ABC):
+    """
+    Interface for the User repository.
+    Defines the abstract methods that must be implemented by concrete repositories.
+    """
+
+    @abstractmethod
+    def get_with_role_by_email(self, email):
+        """Gets a user and its customer/companion profile by email."""
+        pass
+
+    @abstractmethod
+    def get_with_role_by_id(self, user_id):
+        """Gets a user and its customer/companion profile by primary key."""
+        pass
+
+    @abstractmethod
+    def get_role(self, user):
+        """Returns the role ("customer" or "companion") of a loaded user."""
+        pass
+
+    @abstractmethod
+    def update_password(self, user, hashed):
+        """Stores a new password hash for the user."""
+        pass
+
+
+class UserRepository(AbstractUserRepository):
+    """Concrete repository that implements AbstractUserRepository using Django ORM."""
+
+    def __init__(self, model=User):
+        self.model = model
+
+    def get_with_role_by_email(self, email):
+        """
+        Retrieves a user together with its Customer/Companion row in a single query.
+
+        Returns:
+            User or None: The user, or None if no user has the given email.
+        """
+        try:
+            return self.model.objects.select_related(*ROLE_RELATIONS).get(email=email)
+        except self.model.DoesNotExist:
+            return None
+        except Exception as e:
+            raise RuntimeError(f"An error occurred while fetching the user: {str(e)}")
+
+    def get_with_role_by_id(self, user_id):
+        """
+        Retrieves a user together with its Customer/Companion row in a single query.
+
+        Returns:
+            User or None: The user, or None if it does not exist.
+        """
+        try:
+            return self.model.objects.select_related(*ROLE_RELATIONS).get(pk=user_id)
+        except self.model.DoesNotExist:
+            return None
+        except Exception as e:
+            raise RuntimeError(f"An error occurred while fetching the user: {str(e)}")
+
+    def get_role(self, user):
+        """
+        Resolves the role of a user loaded through `get_with_role_by_email`.
+
+        The related rows are already cached on the instance, so this never
+        queries the database. Users without a customer profile keep being
+        treated as companions, as the login view always did.
+        """
+        try:
+            user.customer
+            return "customer"
+        except ObjectDoesNotExist:
+            return "companion"
+
+    def update_password(self, user, hashed):
+        """
+        Stores a new password hash without going through `User.save`, so no
+        other column is rewritten.
+        """
+        try:
+            self.model.objects.filter(pk=user.pk).update(password=hashed)
+            user.password = hashed
+        except Exception as e:
+            raise RuntimeError(
+                f"An error occurred while updating the password: {str(e)}"
+            )
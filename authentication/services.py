@@ -0,0 +1,323 @@
+import asyncio
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+from .hashing import check_password, hash_password, needs_rehash
+from .repositories import AbstractUserRepository
+
+logger = logging.getLogger(__name__)
+
+_bcrypt_executor = None
+_bcrypt_executor_lock = threading.Lock()
+
+
+def get_bcrypt_executor():
+    """
+    Returns the process-wide thread pool used to run bcrypt.
+
+    bcrypt releases the GIL while hashing, so a small bounded pool lets the
+    hashing run off the request worker while capping how many cores login
+    spikes can take.
+    """
+    global _bcrypt_executor
+    if _bcrypt_executor is None:
+        with _bcrypt_executor_lock:
+            if _bcrypt_executor is None:
+                _bcrypt_executor = ThreadPoolExecutor(
+                    max_workers=settings.BCRYPT_MAX_WORKERS,
+                    thread_name_prefix="bcrypt",
+                )
+    return _bcrypt_executor
+
+
+@dataclass
+class LoginResult:
+    """
+    Outcome of a login attempt.
+
+    Attributes:
+        status (str): One of OK, UNKNOWN_EMAIL, BAD_PASSWORD or THROTTLED.
+        user (User): The authenticated user, only set when status is OK.
+        role (str): "customer" or "companion", only set when status is OK.
+        timings (dict): Milliseconds spent on each stage of the login.
+    """
+
+    OK = "ok"
+    UNKNOWN_EMAIL = "unknown_email"
+    BAD_PASSWORD = "bad_password"
+    THROTTLED = "throttled"
+
+    status: str
+    user: object = None
+    role: str = None
+    timings: dict = field(default_factory=dict)
+
+    @property
+    def is_authenticated(self):
+        return self.status == self.OK
+
+
+class _Stopwatch:
+    """Collects the elapsed milliseconds of consecutive login stages."""
+
+    def __init__(self):
+        self.started = self.last = time.perf_counter()
+        self.timings = {}
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.timings[stage] = round((now - self.last) * 1000, 3)
+        self.last = now
+
+    def stop(self):
+        self.timings["total"] = round((time.perf_counter() - self.started) * 1000, 3)
+        return self.timings
+
+
+class AbstractLoginService(ABC):
+    @abstractmethod
+    def authenticate(self, email, password, client_ip=None):
+        """Authenticates a user by email and password."""
+        pass
+
+    @abstractmethod
+    async def aauthenticate(self, email, password, client_ip=None):
+        """Asynchronous version of authenticate for ASGI callers."""
+        pass
+
+
+class LoginService(AbstractLoginService):
+    """
+    Service that runs the login pipeline: one query for the user and its
+    role, then bcrypt verification on the bounded bcrypt thread pool.
+    Successful logins upgrade or downgrade the stored hash to BCRYPT_ROUNDS.
+
+    When a LoginShield is given, throttled attempts and recently unknown
+    emails are rejected before any query or hashing takes place. When a user
+    loader is given, its cached copy of a rehashed user is dropped.
+    """
+
+    def __init__(
+        self,
+        user_repository: AbstractUserRepository,
+        shield=None,
+        executor=None,
+        user_loader=None,
+    ):
+        self.user_repository = user_repository
+        self.shield = shield
+        self._executor = executor
+        self.user_loader = user_loader
+
+    @property
+    def executor(self):
+        return self._executor or get_bcrypt_executor()
+
+    @staticmethod
+    def _verify(password, hashed, submitted_at):
+        """
+        Runs bcrypt and reports how long the job waited in the pool queue.
+
+        When the password matches but the stored hash uses a cost factor
+        other than BCRYPT_ROUNDS, the password is rehashed in the same job,
+        while the raw password is still at hand.
+        """
+        queued = time.perf_counter() - submitted_at
+        matches = check_password(password, hashed)
+        rehashed = None
+        if matches and needs_rehash(hashed):
+            rehashed = hash_password(password)
+        return matches, queued, rehashed
+
+    @staticmethod
+    def _record_verify(verified, stopwatch):
+        """Splits the time spent waiting for a pool worker from bcrypt itself."""
+        matches, queued, rehashed = verified
+        stopwatch.lap("verify")
+        stopwatch.timings["queue"] = round(queued * 1000, 3)
+        stopwatch.timings["verify"] = round(
+            max(stopwatch.timings["verify"] - queued * 1000, 0), 3
+        )
+        return matches, rehashed
+
+    def _store_rehash(self, user, rehashed, stopwatch):
+        """
+        Moves the stored hash to the configured cost factor.
+
+        The update skips post_save, so the cached user is dropped here: the
+        session hash is checked against the password of the loaded user.
+        """
+        self.user_repository.update_password(user, rehashed)
+        if self.user_loader is not None:
+            self.user_loader.invalidate(user.pk)
+        stopwatch.lap("rehash")
+
+    def _finish(self, user, matches, stopwatch):
+        """Builds the LoginResult once the password check has completed."""
+        if not matches:
+            return self._result(LoginResult.BAD_PASSWORD, stopwatch)
+
+        return self._result(
+            LoginResult.OK,
+            stopwatch,
+            user=user,
+            role=self.user_repository.get_role(user),
+        )
+
+    def _screen(self, email, client_ip, stopwatch):
+        """
+        Runs the shield checks that happen before the user lookup.
+
+        Returns:
+            LoginResult or None: The early result, or None to carry on.
+        """
+        if self.shield is None:
+            return None
+
+        if not self.shield.allow(email, client_ip):
+            return self._result(LoginResult.THROTTLED, stopwatch)
+        if self.shield.is_unknown_email(email):
+            return self._result(LoginResult.UNKNOWN_EMAIL, stopwatch)
+        return None
+
+    def _unknown(self, email, stopwatch):
+        if self.shield is not None:
+            self.shield.remember_unknown_email(email)
+        return self._result(LoginResult.UNKNOWN_EMAIL, stopwatch)
+
+    def _submit_verify(self, password, hashed):
+        if self.shield is not None:
+            self.shield.record("bcrypt_checks")
+        return self.executor.submit(
+            self._verify, password, hashed, time.perf_counter()
+        )
+
+    def _result(self, status, stopwatch, **kwargs):
+        result = LoginResult(status=status, timings=stopwatch.stop(), **kwargs)
+        logger.info("login %s %s", result.status, result.timings)
+        return result
+
+    def authenticate(self, email, password, client_ip=None):
+        """
+        Authenticates a user by email and password.
+
+        Args:
+            email (str): The email the user logs in with.
+            password (str): The raw password submitted by the user.
+            client_ip (str): IP address of the client, used for throttling.
+
+        Returns:
+            LoginResult: The outcome of the attempt with per-stage timings.
+        """
+        stopwatch = _Stopwatch()
+        screened = self._screen(email, client_ip, stopwatch)
+        if screened is not None:
+            return screened
+
+        user = self.user_repository.get_with_role_by_email(email)
+        stopwatch.lap("lookup")
+
+        if user is None:
+            return self._unknown(email, stopwatch)
+
+        future = self._submit_verify(password, user.password)
+        matches, rehashed = self._record_verify(future.result(), stopwatch)
+
+        if matches and rehashed:
+            self._store_rehash(user, rehashed, stopwatch)
+
+        return self._finish(user, matches, stopwatch)
+
+    async def aauthenticate(self, email, password, client_ip=None):
+        """
+        Asynchronous version of authenticate.
+
+        The database lookup runs through `sync_to_async` and bcrypt runs on
+        the bcrypt thread pool, so the event loop is never blocked.
+        """
+        stopwatch = _Stopwatch()
+        screened = self._screen(email, client_ip, stopwatch)
+        if screened is not None:
+            return screened
+
+        user = await sync_to_async(self.user_repository.get_with_role_by_email)(
+            email
+        )
+        stopwatch.lap("lookup")
+
+        if user is None:
+            return self._unknown(email, stopwatch)
+
+        future = self._submit_verify(password, user.password)
+        matches, rehashed = self._record_verify(
+            await asyncio.wrap_future(future), stopwatch
+        )
+
+        if matches and rehashed:
+            await sync_to_async(self._store_rehash)(user, rehashed, stopwatch)
+
+        return self._finish(user, matches, stopwatch)
+
+
+class AbstractUserLoader(ABC):
+    @abstractmethod
+    def get(self, user_id):
+        """Returns the user with the given ID, or None."""
+        pass
+
+    @abstractmethod
+    def invalidate(self, user_id):
+        """Drops any cached copy of the user."""
+        pass
+
+
+class CachedUserLoader(AbstractUserLoader):
+    """
+    Loads the user of an authenticated request for AuthenticationMiddleware.
+
+    The User is fetched with its Customer or Companion row in one query and
+    kept in the cache for USER_LOADER_TTL seconds, so views can read
+    `request.user.customer` / `request.user.companion` without touching the
+    database. Saving a User, Customer or Companion drops the cached copy
+    (see signals.py).
+    """
+
+    def __init__(self, user_repository: AbstractUserRepository, cache_alias="default"):
+        self.user_repository = user_repository
+        self.cache_alias = cache_alias
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    @staticmethod
+    def _key(user_id):
+        return f"user-loader:{user_id}"
+
+    def get(self, user_id):
+        """
+        Returns the user with the given ID and its role profile.
+
+        Args:
+            user_id: Primary key stored in the session.
+
+        Returns:
+            User or None: The user, or None if it no longer exists.
+        """
+        user = self.cache.get(self._key(user_id))
+        if user is None:
+            user = self.user_repository.get_with_role_by_id(user_id)
+            if user is not None:
+                self.cache.set(self._key(user_id), user, settings.USER_LOADER_TTL)
+        return user
+
+    def invalidate(self, user_id):
+        self.cache.delete(self._key(user_id))
@@ -0,0 +1,37 @@
+from .services import CachedUserLoader, LoginService
+from .repositories import UserRepository
+from .throttling import LoginShield
+
+
+class ServiceFactory:
+    """
+    Factory to create instances of authentication services with their associated repositories.
+    """
+
+    def get_service(self, service_type: str):
+        """
+        Returns the appropriate service based on the specified type.
+
+        Args:
+            service_type (str): The type of service to create.
+
+        Returns:
+            An instance of the requested service with its associated repository.
+
+        Raises:
+            ValueError: If the service_type is not supported.
+        """
+
+        services = {
+            "LOGIN": lambda: LoginService(
+                UserRepository(),
+                shield=LoginShield(),
+                user_loader=CachedUserLoader(UserRepository()),
+            ),
+            "USER_LOADER": lambda: CachedUserLoader(UserRepository()),
+        }
+
+        if service_type not in services:
+            raise ValueError(f"The service type '{service_type}' is not supported.")
+
+        return services[service_type]()
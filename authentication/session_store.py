@@ -0,0 +1,424 @@
+"""
+Session engine with a local LRU, the shared cache and write-behind
+persistence to the database.
+
+Reads are served from a small in-process LRU, then from the shared cache
+and only then from the `django_session` table. Every save stores a new
+version tag of the session in the cache next to its data, and the LRU only
+serves a session while its tag is current, so a session changed or deleted
+by another worker is never served from the LRU.
+
+New and deleted sessions are written to the database right away. Updates go
+to the cache and are queued; a background thread coalesces the queued
+writes (the last write of a session wins) and stores them in the database
+in batches, so sessions survive a cache restart without one INSERT/UPDATE
+per request. The same thread removes expired rows in bounded chunks.
+
+The cache must be shared by the workers (Redis, Memcached, ...): with a
+per-process cache such as LocMemCache, the store reads and writes the
+database directly, like Django's database session engine.
+
+Enable it with SESSION_ENGINE = "authentication.session_store".
+"""
+import atexit
+import copy
+import logging
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.sessions.backends.base import CreateError
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "authentication.session_store"
+VERSION_SUFFIX = ":version"
+
+
+def is_shared(cache):
+    """Returns False for the cache backends that are not shared by processes."""
+    return not isinstance(cache, (LocMemCache, DummyCache))
+
+
+class LocalSessionCache:
+    """
+    Bounded, thread-safe LRU of decoded session data for this process, with
+    the version tag each entry was loaded at.
+
+    Entries live SESSION_LOCAL_CACHE_TTL seconds at most.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_key):
+        """
+        Returns:
+            tuple or None: (data, version) of the session, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(session_key)
+            if entry is None:
+                return None
+            data, version, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[session_key]
+                return None
+            self._entries.move_to_end(session_key)
+        return copy.deepcopy(data), version
+
+    def set(self, session_key, data, version):
+        ttl = settings.SESSION_LOCAL_CACHE_TTL
+        if ttl <= 0 or version is None:
+            return
+        with self._lock:
+            self._entries[session_key] = (
+                copy.deepcopy(data), version, time.monotonic() + ttl
+            )
+            self._entries.move_to_end(session_key)
+            while len(self._entries) > settings.SESSION_LOCAL_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def delete(self, session_key):
+        with self._lock:
+            self._entries.pop(session_key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class WriteBehindQueue:
+    """
+    Pending session writes, keyed by session key.
+
+    A session written several times before a flush is stored once, with its
+    latest data. Flushing happens on a daemon thread every
+    SESSION_WRITE_BEHIND_INTERVAL seconds, or earlier when
+    SESSION_WRITE_BEHIND_BATCH writes are pending, and at interpreter exit.
+
+    Sessions being flushed stay "in flight" until their batch is written; a
+    discarded session is also dropped from the batches not yet written.
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        # Held while a batch is written, so a discard never interleaves with it.
+        self._writing = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._last_sweep = time.monotonic()
+
+    def put(self, session_key, session_data, expire_date):
+        with self._lock:
+            self._pending[session_key] = (session_data, expire_date)
+            pending = len(self._pending)
+        self._ensure_thread()
+        if pending >= settings.SESSION_WRITE_BEHIND_BATCH:
+            self._wakeup.set()
+
+    def get(self, session_key):
+        with self._lock:
+            return self._pending.get(session_key)
+
+    def discard(self, session_key, then=None):
+        """
+        Drops the queued write of a session, even from a flush in progress.
+
+        Args:
+            session_key (str): The session.
+            then (callable): Runs before any other batch is written, such as
+                the deletion of the row: a batch written before it no longer
+                holds the session, and one written after it cannot bring
+                the row back.
+        """
+        with self._writing:
+            with self._lock:
+                self._pending.pop(session_key, None)
+                self._in_flight.discard(session_key)
+            if then is not None:
+                then()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def flush(self):
+        """
+        Writes every pending session to the database.
+
+        Returns:
+            int: Number of sessions written.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._in_flight.update(pending)
+        if not pending:
+            return 0
+
+        model = SessionStore.get_model_class()
+        using = router.db_for_write(model)
+        items = list(pending.items())
+        batch_size = settings.SESSION_WRITE_BEHIND_BATCH
+        written = done = 0
+        try:
+            for start in range(0, len(items), batch_size):
+                batch = dict(items[start : start + batch_size])
+                with self._writing:
+                    with self._lock:
+                        batch = {
+                            key: value
+                            for key, value in batch.items()
+                            if key in self._in_flight
+                        }
+                    if batch:
+                        self._write_batch(model, using, batch)
+                    with self._lock:
+                        self._in_flight.difference_update(batch)
+                written += len(batch)
+                done = start + batch_size
+        except Exception:
+            logger.exception("Could not flush %s queued sessions", len(pending))
+            self._requeue(dict(items[done:]))
+            raise
+        return written
+
+    @staticmethod
+    def _write_batch(model, using, batch):
+        with transaction.atomic(using=using):
+            existing = set(
+                model.objects.using(using)
+                .filter(session_key__in=batch.keys())
+                .values_list("session_key", flat=True)
+            )
+            rows = [
+                model(session_key=key, session_data=data, expire_date=expire_date)
+                for key, (data, expire_date) in batch.items()
+            ]
+            model.objects.using(using).bulk_update(
+                [row for row in rows if row.session_key in existing],
+                ["session_data", "expire_date"],
+            )
+            model.objects.using(using).bulk_create(
+                [row for row in rows if row.session_key not in existing],
+                ignore_conflicts=True,
+            )
+
+    def _requeue(self, batch):
+        # Writes that arrived during the failed flush are newer, keep them,
+        # and sessions discarded meanwhile stay discarded.
+        with self._lock:
+            for key, value in batch.items():
+                if key in self._in_flight:
+                    self._pending.setdefault(key, value)
+            self._in_flight.difference_update(batch)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="session-write-behind", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(settings.SESSION_WRITE_BEHIND_INTERVAL)
+            self._wakeup.clear()
+            try:
+                self.flush()
+                if (
+                    time.monotonic() - self._last_sweep
+                    >= settings.SESSION_SWEEP_INTERVAL
+                ):
+                    self._last_sweep = time.monotonic()
+                    SessionStore.clear_expired()
+            except Exception:
+                # Already logged, the writes were queued again.
+                pass
+            finally:
+                connections.close_all()
+
+
+local_sessions = LocalSessionCache()
+write_behind = WriteBehindQueue()
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        write_behind.flush()
+    except Exception:
+        pass
+
+
+class SessionStore(DBStore):
+    """
+    Session store reading from the local LRU, the shared cache and the
+    database, in that order, and writing updates to the database behind the
+    cache. Without a shared cache it is the database store.
+    """
+
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        self._cache = caches[settings.SESSION_CACHE_ALIAS]
+        self._shared = is_shared(self._cache)
+        super().__init__(session_key)
+
+    @property
+    def cache_key(self):
+        return self.cache_key_prefix + self._get_or_create_session_key()
+
+    def _cache_keys(self, session_key):
+        key = self.cache_key_prefix + session_key
+        return key, key + VERSION_SUFFIX
+
+    def _cache_session(self, session_key, data, age, must_create=False):
+        """
+        Stores the session in the cache under a new version tag.
+
+        Returns:
+            str: The version tag.
+
+        Raises:
+            CreateError: If must_create and the key is already taken.
+        """
+        data_key, version_key = self._cache_keys(session_key)
+        version = secrets.token_hex(8)
+        if must_create:
+            if not self._cache.add(data_key, data, age):
+                raise CreateError
+            self._cache.set(version_key, version, age)
+        else:
+            self._cache.set_many({data_key: data, version_key: version}, age)
+        return version
+
+    def _write_now(self, session_key, data):
+        WriteBehindQueue._write_batch(
+            self.model,
+            router.db_for_write(self.model),
+            {session_key: (self.encode(data), self.get_expiry_date())},
+        )
+
+    def load(self):
+        if not self._shared:
+            return super().load()
+
+        session_key = self.session_key
+        data_key, version_key = self._cache_keys(session_key)
+        local = local_sessions.get(session_key)
+        if local is not None:
+            data, version = local
+            if self._cache.get(version_key) == version:
+                return data
+
+        try:
+            cached = self._cache.get_many([data_key, version_key])
+        except Exception:
+            # Some backends raise on invalid keys, treat it as a miss.
+            cached = {}
+        data, version = cached.get(data_key), cached.get(version_key)
+
+        if data is None:
+            pending = write_behind.get(session_key)
+            if pending is not None:
+                data = self.decode(pending[0])
+                age = self.get_expiry_age(expiry=pending[1])
+            else:
+                s = self._get_session_from_db()
+                if not s:
+                    return {}
+                data = self.decode(s.session_data)
+                age = self.get_expiry_age(expiry=s.expire_date)
+            version = self._cache_session(session_key, data, age)
+
+        local_sessions.set(session_key, data, version)
+        return data
+
+    def exists(self, session_key):
+        if not self._shared:
+            return super().exists(session_key)
+        return bool(session_key) and (
+            write_behind.get(session_key) is not None
+            or self._cache_keys(session_key)[0] in self._cache
+            or super().exists(session_key)
+        )
+
+    def save(self, must_create=False):
+        """
+        Saves the session to the cache, and to the database: right away for
+        a new session, in the background for an update.
+
+        New keys are reserved with `cache.add`.
+        """
+        if not self._shared:
+            return super().save(must_create)
+        if self.session_key is None:
+            return self.create()
+
+        data = self._get_session(no_load=must_create)
+        version = self._cache_session(
+            self.session_key, data, self.get_expiry_age(), must_create
+        )
+        local_sessions.set(self.session_key, data, version)
+        if must_create or settings.SESSION_WRITE_BEHIND_INTERVAL <= 0:
+            self._write_now(self.session_key, data)
+        else:
+            write_behind.put(self.session_key, self.encode(data), self.get_expiry_date())
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        if not self._shared:
+            return super().delete(session_key)
+        delete_row = super().delete
+        write_behind.discard(session_key, then=lambda: delete_row(session_key))
+        self._cache.delete_many(self._cache_keys(session_key))
+        local_sessions.delete(session_key)
+
+    def flush(self):
+        """
+        Remove the current session data from every layer and regenerate the key.
+        """
+        self.clear()
+        self.delete(self.session_key)
+        self._session_key = None
+
+    @classmethod
+    def clear_expired(cls, chunk_size=None):
+        """
+        Deletes expired sessions in chunks of SESSION_SWEEP_CHUNK rows, so the
+        sweep never holds long locks on the session table.
+
+        Returns:
+            int: Number of sessions deleted.
+        """
+        chunk_size = chunk_size or settings.SESSION_SWEEP_CHUNK
+        model = cls.get_model_class()
+        deleted = 0
+        while True:
+            keys = list(
+                model.objects.filter(expire_date__lt=timezone.now()).values_list(
+                    "session_key", flat=True
+                )[:chunk_size]
+            )
+            if not keys:
+                return deleted
+            model.objects.filter(session_key__in=keys).delete()
+            deleted += len(keys)
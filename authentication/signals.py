@@ -0,0 +1,31 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import User
+from .services_factory import ServiceFactory
+from .throttling import LoginShield
+
+user_loader = ServiceFactory().get_service("USER_LOADER")
+
+
+@receiver(post_save, sender=User)
+def forget_unknown_email(sender, instance, created, **kwargs):
+    """Lets a newly registered email log in even if it was cached as unknown."""
+    if created:
+        LoginShield().forget_unknown_email(instance.email)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Drops the cached user loaded by the authentication backend."""
+    user_loader.invalidate(instance.pk)
+
+
+@receiver(post_save, sender="customer.Customer")
+@receiver(post_delete, sender="customer.Customer")
+@receiver(post_save, sender="companion.Companion")
+@receiver(post_delete, sender="companion.Companion")
+def invalidate_cached_user_profile(sender, instance, **kwargs):
+    """The cached user embeds its customer/companion row, drop it as well."""
+    user_loader.invalidate(instance.idUser_id)
@@ -0,0 +1,28 @@
+from django import template
+from django.conf import settings
+
+from authentication.photos import rendition_url
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def profile_photo_url(context, user, size="card"):
+    """
+    Returns the URL of the smallest rendition of the user's profile photo
+    that fits `size` (pixels or a rendition name), in WebP when the browser
+    accepts it.
+
+    Usage:
+        {% load profile_photos %}
+        <img src="{% profile_photo_url user 150 %}">
+    """
+    photo = getattr(user, "profilePhoto", None)
+    if not photo:
+        return settings.PROFILE_PHOTO_DEFAULT_URL
+
+    request = context.get("request")
+    accepts_webp = request is not None and "image/webp" in request.META.get(
+        "HTTP_ACCEPT", ""
+    )
+    return rendition_url(photo, size, accepts_webp=accepts_webp)
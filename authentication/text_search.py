@@ -0,0 +1,455 @@
+"""
+Full-text search over short free-text descriptions (companion skills,
+customer preferences).
+
+A query is split into terms and every term is expanded against the
+vocabulary of the indexed descriptions: the token itself, the tokens it is
+a prefix of, and the tokens within a few typos of it (found through a
+trigram index of the vocabulary). A description matches when it contains
+an expansion of every term.
+
+Matching descriptions are found by the database when it can: an FTS5
+table kept in sync by triggers on SQLite, a FULLTEXT index on MySQL (both
+created by the apps' migrations). Otherwise an in-process inverted index
+of the descriptions is used. The vocabulary, and the in-process index, are
+loaded lazily and reloaded when the version stamp in the shared cache
+changes; save and delete signals apply changes incrementally.
+"""
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+
+# Token quality, the score a description gets for matching a term.
+EXACT, PREFIX, FUZZY = 3, 2, 1
+
+# Bound on the vocabulary tokens a term expands to.
+MAX_EXPANSIONS = 50
+
+# InnoDB does not index shorter tokens (innodb_ft_min_token_size).
+MYSQL_MIN_TOKEN_SIZE = 3
+
+TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def normalize(text):
+    """Lower cases the text and strips its accents."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(normalize(text))
+
+
+def trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_typos(term):
+    """Typos tolerated in a term: none in short words, more in long ones."""
+    if len(term) <= 3:
+        return 0
+    return 1 if len(term) <= 7 else 2
+
+
+def edit_distance(a, b, limit):
+    """
+    Optimal string alignment distance (insertions, deletions, substitutions
+    and transpositions), or limit + 1 when it exceeds the limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (a[i - 1] != b[j - 1]),
+            )
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class Vocabulary:
+    """Sorted tokens of the indexed descriptions with a trigram index."""
+
+    def __init__(self, tokens=()):
+        self.tokens = []
+        self.grams = {}
+        for token in sorted(set(tokens)):
+            self.add(token)
+
+    def add(self, token):
+        position = bisect_left(self.tokens, token)
+        if position < len(self.tokens) and self.tokens[position] == token:
+            return
+        self.tokens.insert(position, token)
+        for gram in trigrams(token):
+            self.grams.setdefault(gram, set()).add(token)
+
+    def expand(self, term):
+        """
+        Returns the vocabulary tokens matching a term with their quality:
+        EXACT for the term itself, PREFIX for longer tokens starting with
+        it, FUZZY for tokens within max_typos(term) edits.
+        """
+        expansions = {}
+        position = bisect_left(self.tokens, term)
+        while position < len(self.tokens) and len(expansions) < MAX_EXPANSIONS:
+            token = self.tokens[position]
+            if not token.startswith(term):
+                break
+            expansions[token] = EXACT if token == term else PREFIX
+            position += 1
+
+        limit = max_typos(term)
+        if limit:
+            grams = trigrams(term)
+            shared = {}
+            for gram in grams:
+                for token in self.grams.get(gram, ()):
+                    shared[token] = shared.get(token, 0) + 1
+            # Every edit changes at most three trigrams.
+            needed = len(grams) - 3 * limit
+            for token, count in sorted(shared.items(), key=lambda item: -item[1]):
+                if len(expansions) >= MAX_EXPANSIONS:
+                    break
+                if (
+                    count >= needed
+                    and token not in expansions
+                    and edit_distance(term, token, limit) <= limit
+                ):
+                    expansions[token] = FUZZY
+        return expansions
+
+
+class _State:
+    def __init__(self, version, vocabulary, documents=None):
+        self.version = version
+        self.vocabulary = vocabulary
+        # In-process index only: {pk: (owner, tokens)} and {token: {pk}}.
+        self.documents = documents
+        self.postings = None
+        if documents is not None:
+            self.postings = {}
+            for pk, (_, tokens) in documents.items():
+                for token in tokens:
+                    self.postings.setdefault(token, set()).add(pk)
+
+
+class TextIndex:
+    """
+    Search index over one text field of a model.
+
+    Args:
+        name (str): Name of the index, used in cache keys and commands.
+        model (str): "app_label.ModelName" of the indexed model.
+        field (str): The indexed text field.
+        owner_field (str): Foreign key the searches return the IDs of.
+    """
+
+    def __init__(self, name, model, field, owner_field, cache_alias="default"):
+        self.name = name
+        self.model_label = model
+        self.field = field
+        self.owner_field = owner_field
+        self.cache_alias = cache_alias
+        self._state = None
+        self._backend = None
+        self._lock = threading.RLock()
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    @property
+    def version_key(self):
+        return f"text-index:{self.name}:version"
+
+    @property
+    def backend(self):
+        """One of "fts5", "fulltext" or "memory", depending on the database."""
+        if self._backend is None:
+            self._backend = self._detect_backend()
+        return self._backend
+
+    def _detect_backend(self):
+        if settings.TEXT_SEARCH_BACKEND != "auto":
+            return settings.TEXT_SEARCH_BACKEND
+        table = self.model._meta.db_table
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+                    [fts_table(table)],
+                )
+                return "fts5" if cursor.fetchone() else "memory"
+            if connection.vendor == "mysql":
+                cursor.execute(
+                    "SELECT 1 FROM information_schema.statistics "
+                    "WHERE table_schema = DATABASE() AND table_name = %s "
+                    "AND index_name = %s",
+                    [table, fulltext_index(table)],
+                )
+                return "fulltext" if cursor.fetchone() else "memory"
+        return "memory"
+
+    def _load(self, version):
+        texts = self.model.objects.values_list(self.field, flat=True)
+        if self.backend != "memory":
+            vocabulary = Vocabulary(
+                token for text in texts.distinct().iterator() for token in tokenize(text)
+            )
+            return _State(version, vocabulary)
+
+        documents = {
+            pk: (owner, tuple(set(tokenize(text))))
+            for pk, owner, text in self.model.objects.values_list(
+                "pk", self.owner_field, self.field
+            ).iterator()
+        }
+        vocabulary = Vocabulary(
+            token for _, tokens in documents.values() for token in tokens
+        )
+        return _State(version, vocabulary, documents)
+
+    def _get(self):
+        version = self.cache.get(self.version_key, 0)
+        with self._lock:
+            if self._state is None or self._state.version != version:
+                self._state = self._load(version)
+            return self._state
+
+    def _bump_version(self):
+        if self.cache.add(self.version_key, 1, None):
+            return 1
+        try:
+            return self.cache.incr(self.version_key)
+        except ValueError:
+            self.cache.set(self.version_key, 1, None)
+            return 1
+
+    def invalidate(self):
+        """Makes every process reload the index on its next search."""
+        self._bump_version()
+
+    def update(self, pk, owner=None, text=None):
+        """
+        Applies a saved (text given) or deleted (text None) description.
+        The database index is maintained by the database itself.
+        """
+        version = self._bump_version()
+        with self._lock:
+            state = self._state
+            # Our bump must directly follow the version we loaded, otherwise
+            # another process changed the index too and it is reloaded lazily.
+            if state is None or state.version != version - 1:
+                self._state = None
+                return
+            tokens = tuple(set(tokenize(text))) if text is not None else ()
+            for token in tokens:
+                state.vocabulary.add(token)
+            if state.documents is not None:
+                _, old_tokens = state.documents.pop(pk, (None, ()))
+                for token in old_tokens:
+                    state.postings.get(token, set()).discard(pk)
+                if text is not None:
+                    state.documents[pk] = (owner, tokens)
+                    for token in tokens:
+                        state.postings.setdefault(token, set()).add(pk)
+            state.version = version
+
+    def rebuild(self):
+        """Rebuilds the database index, then reloads the vocabulary everywhere."""
+        if self.backend == "fts5":
+            table = fts_table(self.model._meta.db_table)
+            with connection.cursor() as cursor:
+                cursor.execute(f'INSERT INTO "{table}"("{table}") VALUES (\'rebuild\')')
+        self.invalidate()
+        return self._get()
+
+    def search(self, query, limit=None):
+        """
+        Finds the owners of the descriptions matching every term of a query.
+
+        Args:
+            query (str): Free text, e.g. "dementa car".
+            limit (int): Maximum number of owners returned, all when None.
+
+        Returns:
+            list: Owner IDs, best matches first.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        state = self._get()
+        expansions = [state.vocabulary.expand(term) for term in terms]
+        if not all(expansions):
+            return []
+
+        if self.backend == "fts5":
+            owners = self._search_fts5(expansions)
+        elif self.backend == "fulltext":
+            owners = self._search_fulltext(expansions)
+        else:
+            owners = self._search_memory(state, expansions)
+        return owners if limit is None else owners[:limit]
+
+    def _search_memory(self, state, expansions):
+        scores = None
+        for expansion in expansions:
+            term_scores = {}
+            for token, quality in expansion.items():
+                for pk in state.postings.get(token, ()):
+                    term_scores[pk] = max(term_scores.get(pk, 0), quality)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {
+                    pk: score + term_scores[pk]
+                    for pk, score in scores.items()
+                    if pk in term_scores
+                }
+
+        best = {}
+        for pk, score in scores.items():
+            owner = state.documents[pk][0]
+            best[owner] = max(best.get(owner, 0), score)
+        return sorted(best, key=lambda owner: (-best[owner], owner))
+
+    def _owners(self, sql, params):
+        owners = {}
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            for (owner,) in cursor.fetchall():
+                owners.setdefault(owner, None)
+        return list(owners)
+
+    def _columns(self):
+        meta = self.model._meta
+        return (
+            meta.db_table,
+            meta.pk.column,
+            meta.get_field(self.field).column,
+            meta.get_field(self.owner_field).column,
+        )
+
+    def _search_fts5(self, expansions):
+        table, pk, _, owner = self._columns()
+        fts = fts_table(table)
+        match = " AND ".join(
+            "(" + " OR ".join(f'"{token}"' for token in expansion) + ")"
+            for expansion in expansions
+        )
+        return self._owners(
+            f'SELECT t."{owner}" FROM "{fts}" JOIN "{table}" t ON t."{pk}" = "{fts}".rowid '
+            f'WHERE "{fts}" MATCH %s ORDER BY bm25("{fts}"), t."{owner}"',
+            [match],
+        )
+
+    def _search_fulltext(self, expansions):
+        table, _, column, owner = self._columns()
+        groups = []
+        for expansion in expansions:
+            tokens = [token for token in expansion if len(token) >= MYSQL_MIN_TOKEN_SIZE]
+            if tokens:
+                groups.append("+(" + " ".join(tokens) + ")")
+        if not groups:
+            return []
+        against = " ".join(groups)
+        return self._owners(
+            f"SELECT `{owner}` FROM `{table}` "
+            f"WHERE MATCH(`{column}`) AGAINST (%s IN BOOLEAN MODE) "
+            f"ORDER BY MATCH(`{column}`) AGAINST (%s IN BOOLEAN MODE) DESC, `{owner}`",
+            [against, against],
+        )
+
+
+def fts_table(table):
+    return f"{table}_fts"
+
+
+def fulltext_index(table):
+    return f"{table}_fulltext"
+
+
+def create_database_index(schema_editor, table, pk, column):
+    """
+    Creates the FTS5 table and its sync triggers on SQLite, or the FULLTEXT
+    index on MySQL. Other databases, and SQLite builds without FTS5, use the
+    in-process index and get nothing.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == "mysql":
+        schema_editor.execute(
+            f"CREATE FULLTEXT INDEX `{fulltext_index(table)}` ON `{table}` (`{column}`)"
+        )
+    elif vendor == "sqlite":
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("PRAGMA compile_options")
+            if ("ENABLE_FTS5",) not in cursor.fetchall():
+                return
+        fts = fts_table(table)
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE "{fts}" USING fts5("{column}", content="{table}", '
+            f"content_rowid=\"{pk}\", tokenize='unicode61 remove_diacritics 2')"
+        )
+        insert = f'INSERT INTO "{fts}"(rowid, "{column}") VALUES (new."{pk}", new."{column}");'
+        delete = (
+            f'INSERT INTO "{fts}"("{fts}", rowid, "{column}") '
+            f"VALUES ('delete', old.\"{pk}\", old.\"{column}\");"
+        )
+        schema_editor.execute(
+            f'CREATE TRIGGER "{fts}_insert" AFTER INSERT ON "{table}" BEGIN {insert} END'
+        )
+        schema_editor.execute(
+            f'CREATE TRIGGER "{fts}_delete" AFTER DELETE ON "{table}" BEGIN {delete} END'
+        )
+        schema_editor.execute(
+            f'CREATE TRIGGER "{fts}_update" AFTER UPDATE ON "{table}" '
+            f"BEGIN {delete} {insert} END"
+        )
+        schema_editor.execute(f'INSERT INTO "{fts}"("{fts}") VALUES (\'rebuild\')')
+
+
+def drop_database_index(schema_editor, table):
+    vendor = schema_editor.connection.vendor
+    if vendor == "mysql":
+        schema_editor.execute(f"DROP INDEX `{fulltext_index(table)}` ON `{table}`")
+    elif vendor == "sqlite":
+        fts = fts_table(table)
+        for suffix in ("insert", "delete", "update"):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS "{fts}_{suffix}"')
+        schema_editor.execute(f'DROP TABLE IF EXISTS "{fts}"')
+
+
+skill_index = TextIndex("skills", "companion.Skill", "description", "idCompanion")
+preference_index = TextIndex(
+    "preferences", "customer.Preference", "description", "idCustomer"
+)
+
+text_indexes = {index.name: index for index in (skill_index, preference_index)}
+
+
+def text_index_for(model):
+    """Returns the index of a model's descriptions."""
+    return next(
+        index for index in text_indexes.values() if index.model_label == model._meta.label
+    )
@@ -0,0 +1,170 @@
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Counters kept by the login shield, see `LoginShield.stats`.
+COUNTERS = (
+    "attempts",
+    "throttled_email",
+    "throttled_ip",
+    "unknown_email_cache_hits",
+    "bcrypt_checks",
+)
+
+
+def normalize_email(email):
+    """Normalizes an email for rate limiting purposes."""
+    return (email or "").strip().lower()
+
+
+def get_client_ip(request):
+    """
+    Returns the client IP of a request.
+
+    X-Forwarded-For is only honoured when LOGIN_SHIELD_TRUST_X_FORWARDED_FOR
+    is enabled, i.e. when the app runs behind a proxy that sets it.
+    """
+    if request is None:
+        return None
+    if settings.LOGIN_SHIELD_TRUST_X_FORWARDED_FOR:
+        forwarded = request.META.get("HTTP_X_FORWARDED_FOR")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.META.get("REMOTE_ADDR")
+
+
+def _digest(value):
+    # Cache keys must be short and free of spaces or control characters.
+    return hashlib.sha1(value.encode("utf-8")).hexdigest()
+
+
+class TokenBucket:
+    """
+    Token bucket stored in a Django cache.
+
+    Each key starts with `capacity` tokens and regains `refill_rate` tokens
+    per second. The read-modify-write is not atomic across workers, which
+    can let a few extra attempts through under heavy concurrency but never
+    blocks legitimate traffic.
+    """
+
+    def __init__(self, cache, prefix, capacity, refill_rate):
+        self.cache = cache
+        self.prefix = prefix
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.timeout = math.ceil(capacity / refill_rate) + 1
+
+    def consume(self, key, tokens=1):
+        """
+        Takes tokens from the bucket of a key.
+
+        Returns:
+            bool: True if the bucket had enough tokens, False if the caller
+            must be rejected.
+        """
+        cache_key = f"{self.prefix}:{_digest(key)}"
+        now = time.time()
+        state = self.cache.get(cache_key)
+        available, updated = state if state else (self.capacity, now)
+        available = min(self.capacity, available + (now - updated) * self.refill_rate)
+
+        allowed = available >= tokens
+        if allowed:
+            available -= tokens
+        self.cache.set(cache_key, (available, now), self.timeout)
+        return allowed
+
+
+class LoginShield:
+    """
+    Rejects login attempts before they reach the database or bcrypt.
+
+    Attempts are limited with one token bucket per normalized email and one
+    per client IP, and emails recently found not to exist are remembered so
+    repeated misses skip the user lookup.
+    """
+
+    def __init__(self, cache_alias=None):
+        self.cache = caches[cache_alias or settings.LOGIN_SHIELD_CACHE]
+        self.email_bucket = TokenBucket(
+            self.cache,
+            "login-shield:email",
+            settings.LOGIN_SHIELD_EMAIL_CAPACITY,
+            settings.LOGIN_SHIELD_EMAIL_REFILL_PER_MINUTE / 60,
+        )
+        self.ip_bucket = TokenBucket(
+            self.cache,
+            "login-shield:ip",
+            settings.LOGIN_SHIELD_IP_CAPACITY,
+            settings.LOGIN_SHIELD_IP_REFILL_PER_MINUTE / 60,
+        )
+
+    def allow(self, email, client_ip=None):
+        """
+        Takes a token for the email and the client IP.
+
+        Returns:
+            bool: True if the attempt may proceed.
+        """
+        self.record("attempts")
+        if client_ip and not self.ip_bucket.consume(client_ip):
+            self.record("throttled_ip")
+            return False
+        if not self.email_bucket.consume(normalize_email(email)):
+            self.record("throttled_email")
+            return False
+        return True
+
+    def _unknown_key(self, email):
+        # Keyed by the exact email: depending on the database collation a
+        # differently cased email may still match an existing user.
+        return f"login-shield:unknown:{_digest((email or '').strip())}"
+
+    def is_unknown_email(self, email):
+        """Returns True if the email was recently looked up and not found."""
+        if self.cache.get(self._unknown_key(email)):
+            self.record("unknown_email_cache_hits")
+            return True
+        return False
+
+    def remember_unknown_email(self, email):
+        self.cache.set(
+            self._unknown_key(email), True, settings.LOGIN_SHIELD_UNKNOWN_EMAIL_TTL
+        )
+
+    def forget_unknown_email(self, email):
+        """Called when a user registers, so the email can log in right away."""
+        self.cache.delete(self._unknown_key(email))
+
+    def record(self, counter, amount=1):
+        key = f"login-shield:counter:{counter}"
+        self.cache.add(key, 0, None)
+        try:
+            self.cache.incr(key, amount)
+        except ValueError:
+            # The key was evicted between add and incr.
+            self.cache.set(key, amount, None)
+
+    def stats(self):
+        """
+        Returns the shield counters, including `bcrypt_checks_saved`: the
+        password checks avoided by rejecting throttled attempts.
+        """
+        values = self.cache.get_many(
+            [f"login-shield:counter:{counter}" for counter in COUNTERS]
+        )
+        stats = {
+            counter: values.get(f"login-shield:counter:{counter}", 0)
+            for counter in COUNTERS
+        }
+        stats["bcrypt_checks_saved"] = stats["throttled_email"] + stats["throttled_ip"]
+        return stats
+
+    def reset_stats(self):
+        self.cache.delete_many(
+            [f"login-shield:counter:{counter}" for counter in COUNTERS]
+        )
@@ -1,12 +1,16 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.contrib.auth import authenticate, login, logout
-from django.core.exceptions import ObjectDoesNotExist
+from django.contrib.auth import login, logout
 from django.views import View
 from .forms import UserRegistrationForm, UserProfileForm
-from .models import User
-from customer.models import Customer
+from .services import LoginResult
+from .services_factory import ServiceFactory
+from .throttling import get_client_ip
+from .repositories import UserRepository
+
+login_service = ServiceFactory().get_service("LOGIN")
+user_repository = UserRepository()
 
 
 class UserRegistrationView(View):
@@ -79,16 +83,10 @@ def get_if_Customer_Companion(request):
 
     Note:
         This function utilizes the Django authentication decorator `@login_required`.
-        It retrieves the current user's ID and checks if there is a corresponding customer entry.
+        The user loaded by the authentication backend already carries its
+        customer/companion row, so no query is needed.
     """
-    # Retrieve the ID of the current authenticated user.
-    idActualUser = request.user.idUser
-
-    # Check if a customer entry exists for the current user.
-    isCustomer = Customer.objects.filter(idUser=idActualUser).exists()
-
-    # Return True if the user is a customer, otherwise return False.
-    return True if isCustomer else False
+    return user_repository.get_role(request.user) == "customer"
 
 
 def login_view(request):
@@ -112,23 +110,30 @@ def login_view(request):
         password = request.POST.get("password")
         remember_me = request.POST.get("remember_me")
 
-        try:
-            user = User.objects.get(email=email)
-        except ObjectDoesNotExist:
-            messages.error(request, "User not found. Please verify your email.")
-            return redirect(actual_page)
+        # Loads the user with its role in one query and checks the password
+        # on the bcrypt thread pool.
+        result = login_service.authenticate(
+            email, password, client_ip=get_client_ip(request)
+        )
 
-        authenticated_user = authenticate(request, email=email, password=password)
+        if result.status == LoginResult.THROTTLED:
+            messages.error(
+                request, "Too many login attempts. Please try again in a few minutes."
+            )
+            return redirect(actual_page)
 
-        if authenticated_user is not None:
-            login(request, authenticated_user)
+        if result.status == LoginResult.UNKNOWN_EMAIL:
+            messages.error(request, "User not found. Please verify your email.")
+            return redirect(actual_page)
 
-            isCustomer = get_if_Customer_Companion(request)
+        if result.is_authenticated:
+            login(
+                request,
+                result.user,
+                backend="authentication.backends.EmailPasswordAuthBackend",
+            )
 
-            if isCustomer:
-                request.session["user_type"] = "customer"
-            if not isCustomer:
-                request.session["user_type"] = "companion"
+            request.session["user_type"] = result.role
 
             if not remember_me:
                 # If "Remember me" is not checked, set session expiration to 0 (logout when closing browser).
@@ -1,8 +1,18 @@
 from django.contrib import admin
-from .models import Companion, Certification, Reference, Skill, TimeAvailability
+from .models import (
+    Companion,
+    Certification,
+    Reference,
+    Skill,
+    TimeAvailability,
+    RecurringAvailability,
+    RecurringAvailabilityException,
+)
 
 admin.site.register(Companion)
 admin.site.register(Certification)
 admin.site.register(Reference)
 admin.site.register(Skill)
 admin.site.register(TimeAvailability)
+admin.site.register(RecurringAvailability)
+admin.site.register(RecurringAvailabilityException)
@@ -0,0 +1,207 @@
+"""
+Skill autocomplete served from an in-memory prefix trie.
+
+Every distinct skill, normalized (accents stripped, lower cased, spaces
+collapsed), is inserted under each of its word starts, so "care" suggests
+both "care planning" and "dementia care". Suggestions are weighted by the
+number of companions having the skill and shown in their most common
+spelling. Each node caches its best suggestions, so an answer walks the
+prefix and reads the cache; a change only updates the caches on its path.
+
+The trie is built from the Skill rows on first use and kept in sync by the
+Skill save and delete signals. Other processes see a change through the
+version stamp in the shared cache and rebuild on their next request.
+"""
+import heapq
+import threading
+from collections import Counter
+
+from django.core.cache import caches
+
+from authentication.text_search import normalize
+
+from .models import Skill
+
+VERSION_KEY = "skill-trie:version"
+
+# Suggestions cached per node, the most an answer can return.
+MAX_SUGGESTIONS = 20
+
+
+def normalize_skill(description):
+    return " ".join(normalize(description).split())
+
+
+class _Node:
+    __slots__ = ("children", "phrases", "top")
+
+    def __init__(self):
+        self.children = {}
+        # Phrases inserted under a key ending at this node.
+        self.phrases = set()
+        # Best (count, phrase) pairs of the subtree, None until computed.
+        self.top = None
+
+
+class SkillTrie:
+    """
+    Prefix trie of the skill vocabulary.
+
+    Attributes:
+        version (int): Version stamp the trie was built at.
+        counts (Counter): Companions per normalized skill.
+        spellings (dict): Counter of the original spellings of each skill.
+    """
+
+    def __init__(self, version, descriptions=()):
+        self.version = version
+        self.root = _Node()
+        self.counts = Counter()
+        self.spellings = {}
+        for description in descriptions:
+            self.add(description)
+
+    @staticmethod
+    def _keys(phrase):
+        words = phrase.split(" ")
+        return [" ".join(words[i:]) for i in range(len(words))]
+
+    def _path(self, key, create=False):
+        nodes = [self.root]
+        for char in key:
+            node = nodes[-1].children.get(char)
+            if node is None:
+                if not create:
+                    return None
+                node = nodes[-1].children[char] = _Node()
+            nodes.append(node)
+        return nodes
+
+    def add(self, description):
+        phrase = normalize_skill(description)
+        if not phrase:
+            return
+        self.counts[phrase] += 1
+        self.spellings.setdefault(phrase, Counter())[" ".join(description.split())] += 1
+        count = self.counts[phrase]
+        for key in self._keys(phrase):
+            nodes = self._path(key, create=True)
+            nodes[-1].phrases.add(phrase)
+            for node in nodes:
+                # A count only grows here, so the phrase can only move up: the
+                # cached best suggestions stay exact without a recomputation.
+                if node.top is not None:
+                    top = [entry for entry in node.top if entry[1] != phrase]
+                    top.append((-count, phrase))
+                    top.sort()
+                    node.top = top[:MAX_SUGGESTIONS]
+
+    def remove(self, description):
+        phrase = normalize_skill(description)
+        if not self.counts.get(phrase):
+            return
+        self.counts[phrase] -= 1
+        spellings = self.spellings[phrase]
+        spelling = " ".join(description.split())
+        spellings[spelling] -= 1
+        if spellings[spelling] <= 0:
+            del spellings[spelling]
+        if self.counts[phrase] == 0:
+            del self.counts[phrase]
+            del self.spellings[phrase]
+        for key in self._keys(phrase):
+            nodes = self._path(key)
+            if phrase not in self.counts:
+                nodes[-1].phrases.discard(phrase)
+            for node in nodes:
+                # The phrase may drop out of the best suggestions, recompute
+                # them lazily where it was one of them.
+                if node.top is not None and any(entry[1] == phrase for entry in node.top):
+                    node.top = None
+
+    def _top(self, node):
+        if node.top is None:
+            phrases = set()
+            stack = [node]
+            while stack:
+                current = stack.pop()
+                phrases |= current.phrases
+                stack.extend(current.children.values())
+            node.top = heapq.nsmallest(
+                MAX_SUGGESTIONS, ((-self.counts[p], p) for p in phrases)
+            )
+        return node.top
+
+    def suggest(self, prefix, limit=10):
+        """
+        Returns the most frequent skills with a word starting with the prefix.
+
+        Returns:
+            list: (spelling, count) pairs, most frequent first.
+        """
+        nodes = self._path(normalize_skill(prefix))
+        if not prefix.strip() or nodes is None:
+            return []
+        return [
+            (self.spellings[phrase].most_common(1)[0][0], -count)
+            for count, phrase in self._top(nodes[-1])[:limit]
+        ]
+
+
+class SkillAutocomplete:
+    """Process wide SkillTrie, versioned through the shared cache."""
+
+    def __init__(self, cache_alias="default"):
+        self.cache_alias = cache_alias
+        self._trie = None
+        self._lock = threading.RLock()
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def get(self):
+        version = self.cache.get(VERSION_KEY, 0)
+        with self._lock:
+            if self._trie is None or self._trie.version != version:
+                self._trie = SkillTrie(
+                    version,
+                    Skill.objects.values_list("description", flat=True).iterator(),
+                )
+            return self._trie
+
+    def _bump_version(self):
+        if self.cache.add(VERSION_KEY, 1, None):
+            return 1
+        try:
+            return self.cache.incr(VERSION_KEY)
+        except ValueError:
+            self.cache.set(VERSION_KEY, 1, None)
+            return 1
+
+    def invalidate(self):
+        """Makes every process rebuild its trie on the next request."""
+        self._bump_version()
+
+    def _apply(self, update):
+        version = self._bump_version()
+        with self._lock:
+            # Our bump must directly follow the version we built at, otherwise
+            # another process changed the skills too and the trie is rebuilt.
+            if self._trie is None or self._trie.version != version - 1:
+                self._trie = None
+                return
+            update(self._trie)
+            self._trie.version = version
+
+    def add(self, description):
+        self._apply(lambda trie: trie.add(description))
+
+    def remove(self, description):
+        self._apply(lambda trie: trie.remove(description))
+
+    def suggest(self, prefix, limit=10):
+        return self.get().suggest(prefix, limit)
+
+
+skill_autocomplete = SkillAutocomplete()
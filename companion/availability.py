@@ -0,0 +1,317 @@
+"""
+In-memory availability engine.
+
+Every companion's day is a bitmap of SLOTS_PER_DAY fifteen-minute slots,
+stored as two uint64 words. A day of N companions is an (N, 2) array, so
+"who is free on this date from 14:00 to 17:00" is one vectorized AND over
+all of them instead of a range scan of TimeAvailability rows.
+
+A companion's day is the union of its one-off TimeAvailability rows on
+that date or, when it has none, of its weekly RecurringAvailability rules
+occurring that day. Days are built lazily from the database and kept up
+to date by the signals of both models. Each day has a version stamp in the shared
+cache, bumped on every change, so a process notices changes made by other
+processes and rebuilds the day on its next query.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F, Q
+
+from .models import RecurringAvailability, TimeAvailability
+from .recurrence import weekday_bit
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+WORDS = 2
+WORD_BITS = 64
+WORD_MASK = (1 << WORD_BITS) - 1
+
+VERSION_KEY_PREFIX = "availability-engine"
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute + value.second / 60
+
+
+def _bits(first_slot, last_slot):
+    """Integer with the bits of the slots in [first_slot, last_slot) set."""
+    if last_slot <= first_slot:
+        return 0
+    return (1 << last_slot) - (1 << first_slot)
+
+
+def availability_bits(start_time, end_time):
+    """
+    Returns the slots fully covered by an availability, as an integer.
+
+    A slot only counts when the companion is available for all of it, so
+    the start is rounded up and the end rounded down.
+    """
+    first_slot = -int(-_minutes(start_time) // SLOT_MINUTES)
+    last_slot = int(_minutes(end_time) // SLOT_MINUTES)
+    return _bits(first_slot, min(last_slot, SLOTS_PER_DAY))
+
+
+def query_bits(start_time, end_time):
+    """
+    Returns the slots touched by a requested time range, as an integer.
+
+    The start is rounded down and the end rounded up: a companion must be
+    available for every slot the range touches.
+
+    Raises:
+        ValueError: If the range does not end after it starts on the same
+            day, as an empty mask would match every companion.
+    """
+    if _minutes(end_time) <= _minutes(start_time):
+        raise ValueError("The time range must end after it starts, on the same day.")
+    first_slot = int(_minutes(start_time) // SLOT_MINUTES)
+    last_slot = -int(-_minutes(end_time) // SLOT_MINUTES)
+    return _bits(first_slot, min(last_slot, SLOTS_PER_DAY))
+
+
+def to_words(bits):
+    """Splits a slot integer into its uint64 words."""
+    return np.array(
+        [(bits >> (WORD_BITS * word)) & WORD_MASK for word in range(WORDS)],
+        dtype=np.uint64,
+    )
+
+
+class DayBitmap:
+    """
+    Bitmaps of every companion with availabilities on one date.
+
+    Attributes:
+        version (tuple): Version stamp the bitmaps were built at.
+        ids (ndarray): Companion IDs, one per row of `words`.
+        words (ndarray): (rows, WORDS) uint64 slot bitmaps.
+        one_offs (set): IDs of the companions whose bitmap comes from
+            one-off availabilities rather than from their rules.
+    """
+
+    def __init__(self, version, bits_by_companion, one_offs=()):
+        self.version = version
+        self.one_offs = set(one_offs)
+        self._rows = {}
+        self._size = 0
+        capacity = max(len(bits_by_companion), 16)
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._words = np.zeros((capacity, WORDS), dtype=np.uint64)
+        for companion_id, bits in bits_by_companion.items():
+            self.set(companion_id, bits)
+
+    @property
+    def ids(self):
+        return self._ids[: self._size]
+
+    @property
+    def words(self):
+        return self._words[: self._size]
+
+    def get(self, companion_id):
+        row = self._rows.get(companion_id)
+        if row is None:
+            return 0
+        return sum(
+            int(word) << (WORD_BITS * index)
+            for index, word in enumerate(self._words[row])
+        )
+
+    def set(self, companion_id, bits):
+        row = self._rows.get(companion_id)
+        if row is None:
+            if self._size == len(self._ids):
+                # Grow geometrically so appends stay amortized O(1).
+                self._ids = np.resize(self._ids, len(self._ids) * 2)
+                self._words = np.resize(self._words, (len(self._words) * 2, WORDS))
+            row = self._rows[companion_id] = self._size
+            self._ids[row] = companion_id
+            self._size += 1
+        self._words[row] = to_words(bits)
+
+
+class AvailabilityEngine:
+    """
+    Answers availability questions over all companions from slot bitmaps.
+
+    Only the AVAILABILITY_ENGINE_MAX_DAYS most recently used days are kept.
+    """
+
+    def __init__(self, cache_alias="default"):
+        self.cache_alias = cache_alias
+        self._days = OrderedDict()
+        self._lock = threading.RLock()
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def _version_key(self, date=None):
+        if date is None:
+            return f"{VERSION_KEY_PREFIX}:all"
+        return f"{VERSION_KEY_PREFIX}:{date.isoformat()}"
+
+    def _get_version(self, date):
+        # (all dates, this date): invalidating every date bumps the first one.
+        keys = [self._version_key(), self._version_key(date)]
+        versions = self.cache.get_many(keys)
+        return tuple(versions.get(key, 0) for key in keys)
+
+    def _bump_version(self, date=None):
+        key = self._version_key(date)
+        if self.cache.add(key, 1, None):
+            return 1
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # Evicted between add and incr.
+            self.cache.set(key, 1, None)
+            return 1
+
+    def _load_bits(self, date, companion_id=None):
+        """
+        Returns:
+            tuple: (bits by companion ID, IDs of the companions with one-off
+            availabilities on the date).
+        """
+        one_offs = TimeAvailability.objects.filter(date=date)
+        rules = (
+            RecurringAvailability.objects.filter(
+                Q(validUntil__isnull=True) | Q(validUntil__gte=date),
+                validFrom__lte=date,
+            )
+            .annotate(onDate=F("weekdays").bitand(weekday_bit(date)))
+            .filter(onDate__gt=0)
+            .exclude(recurringavailabilityexception__date=date)
+        )
+        if companion_id is not None:
+            one_offs = one_offs.filter(idCompanion=companion_id)
+            rules = rules.filter(idCompanion=companion_id)
+
+        def collect(rows):
+            bits_by_companion = {}
+            for companion, start_time, end_time in rows.values_list(
+                "idCompanion", "startTime", "endTime"
+            ):
+                if start_time is None or end_time is None:
+                    continue
+                bits_by_companion[companion] = bits_by_companion.get(
+                    companion, 0
+                ) | availability_bits(start_time, end_time)
+            return bits_by_companion
+
+        # One-off availabilities replace the rules on their date.
+        bits_by_companion = collect(rules)
+        one_off_bits = collect(one_offs)
+        bits_by_companion.update(one_off_bits)
+        return bits_by_companion, one_off_bits.keys()
+
+    def get_day(self, date):
+        """
+        Returns the DayBitmap of a date, rebuilding it when another process
+        changed the date since it was built.
+        """
+        version = self._get_version(date)
+        with self._lock:
+            day = self._days.get(date)
+            if day is None or day.version != version:
+                day = DayBitmap(version, *self._load_bits(date))
+                self._days[date] = day
+            self._days.move_to_end(date)
+            while len(self._days) > settings.AVAILABILITY_ENGINE_MAX_DAYS:
+                self._days.popitem(last=False)
+            return day
+
+    def free_companions(self, date, start_time, end_time):
+        """
+        Finds the companions available for a whole time range.
+
+        Args:
+            date (date): The date.
+            start_time (time): Start of the range.
+            end_time (time): End of the range.
+
+        Returns:
+            ndarray: IDs of the companions available for every slot of the range.
+
+        Raises:
+            ValueError: If the range is empty or ends before it starts.
+        """
+        mask = to_words(query_bits(start_time, end_time))
+        day = self.get_day(date)
+        with self._lock:
+            free = ((day.words & mask) == mask).all(axis=1)
+            return day.ids[free]
+
+    def is_free(self, companion_id, date, start_time, end_time):
+        """Checks whether one companion is available for a whole time range."""
+        bits = query_bits(start_time, end_time)
+        return self.get_day(date).get(companion_id) & bits == bits
+
+    def _apply(self, date, update):
+        # Our bump must directly follow the version we built at, otherwise
+        # another process changed the day too and it is rebuilt lazily.
+        version = self._bump_version(date)
+        with self._lock:
+            day = self._days.get(date)
+            if day is None:
+                return
+            if day.version[1] == version - 1:
+                update(day)
+                day.version = (day.version[0], version)
+            else:
+                del self._days[date]
+
+    def add(self, companion_id, date, start_time, end_time):
+        """
+        Marks a new one-off availability, without querying the database. The
+        first one-off of a companion on a date replaces its rule bits.
+        """
+        bits = availability_bits(start_time, end_time)
+
+        def update(day):
+            if companion_id in day.one_offs:
+                bits_before = day.get(companion_id)
+            else:
+                bits_before = 0
+                day.one_offs.add(companion_id)
+            day.set(companion_id, bits_before | bits)
+
+        self._apply(date, update)
+
+    def refresh(self, companion_id, date):
+        """
+        Rebuilds one companion's day from its stored availabilities, after
+        an availability was changed or deleted.
+        """
+        bits_by_companion, one_offs = self._load_bits(date, companion_id)
+        bits = bits_by_companion.get(companion_id, 0)
+
+        def update(day):
+            day.set(companion_id, bits)
+            if companion_id in one_offs:
+                day.one_offs.add(companion_id)
+            else:
+                day.one_offs.discard(companion_id)
+
+        self._apply(date, update)
+
+    def invalidate(self, date=None):
+        """
+        Drops a date, or every date, in this and every other process. Call it
+        after writes that bypass the signals, such as bulk_create.
+        """
+        self._bump_version(date)
+        with self._lock:
+            if date is None:
+                self._days.clear()
+            else:
+                self._days.pop(date, None)
+
+
+availability_engine = AvailabilityEngine()
@@ -0,0 +1,105 @@
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Prefetch, Q, prefetch_related_objects
+from django.http import Http404
+from django.utils import timezone
+
+from .models import RecurringAvailability, TimeAvailability
+
+# Attribute of the request holding its CompanionContext.
+REQUEST_ATTRIBUTE = "_companion_context"
+
+
+class CompanionContext:
+    """
+    Companion of the logged-in user together with every list shown on its
+    dashboard, loaded once per request.
+
+    The companion comes with the user loaded by the authentication backend.
+    The first time a list is read, its references, upcoming time
+    availabilities, current recurring availabilities, certifications and
+    skills are prefetched together with one query each, so the dashboard
+    costs the same number of queries however many rows the companion has,
+    and views that only need the companion pay nothing.
+
+    Attributes:
+        companion (Companion): The companion of the logged-in user.
+    """
+
+    def __init__(self, companion):
+        self.companion = companion
+        self._loaded = False
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        today = timezone.localdate()
+        prefetch_related_objects(
+            [self.companion],
+            "reference_set",
+            Prefetch(
+                "timeavailability_set",
+                queryset=TimeAvailability.objects.filter(date__gte=today).order_by(
+                    "date", "startTime"
+                ),
+            ),
+            Prefetch(
+                "recurringavailability_set",
+                queryset=RecurringAvailability.objects.filter(
+                    Q(validUntil__isnull=True) | Q(validUntil__gte=today)
+                ).order_by("validFrom", "startTime"),
+            ),
+            "certification_set",
+            "skill_set",
+        )
+
+    @property
+    def references(self):
+        self._load()
+        return self.companion.reference_set.all()
+
+    @property
+    def time_availabilities(self):
+        """Time availabilities from today on, ordered by date and start time."""
+        self._load()
+        return self.companion.timeavailability_set.all()
+
+    @property
+    def recurring_availabilities(self):
+        """Recurring availabilities that have not ended yet."""
+        self._load()
+        return self.companion.recurringavailability_set.all()
+
+    @property
+    def certifications(self):
+        self._load()
+        return self.companion.certification_set.all()
+
+    @property
+    def skills(self):
+        self._load()
+        return self.companion.skill_set.all()
+
+
+def get_companion_context(request):
+    """
+    Returns the CompanionContext of the request, building it on first use.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        CompanionContext: The context shared by every view of the request.
+
+    Raises:
+        Http404: If the user is not a companion.
+    """
+    context = getattr(request, REQUEST_ATTRIBUTE, None)
+    if context is None:
+        try:
+            companion = request.user.companion
+        except ObjectDoesNotExist:
+            raise Http404("No Companion matches the given query.")
+        context = CompanionContext(companion)
+        setattr(request, REQUEST_ATTRIBUTE, context)
+    return context
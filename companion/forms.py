@@ -1,7 +1,16 @@
 from django import forms
 from django.utils import timezone
 from django.core.validators import FileExtensionValidator
-from .models import Reference, TimeAvailability, Skill, Certification, Companion
+from authentication.care_taxonomy import CARE_CHOICES, to_choices
+from .models import (
+    Reference,
+    TimeAvailability,
+    RecurringAvailability,
+    Skill,
+    Certification,
+    Companion,
+)
+from .recurrence import WEEKDAY_CHOICES
 
 
 class ReferenceForm(forms.ModelForm):
@@ -69,6 +78,58 @@ class TimeAvailabilityForm(forms.ModelForm):
         return cleaned_data
 
 
+class RecurringAvailabilityForm(forms.ModelForm):
+    """
+    Form for creating RecurringAvailability model instances.
+
+    Attributes:
+        clean_weekdays(): Converts the selected weekdays to a bit mask.
+        clean_validFrom(): Custom validation to ensure the rule does not start in the past.
+        clean(): Custom validation of the time range and the validity window.
+    """
+
+    weekdays = forms.TypedMultipleChoiceField(
+        choices=WEEKDAY_CHOICES,
+        coerce=int,
+        widget=forms.CheckboxSelectMultiple,
+    )
+
+    class Meta:
+        model = RecurringAvailability
+        fields = ["weekdays", "startTime", "endTime", "validFrom", "validUntil"]
+        widgets = {
+            "startTime": forms.TimeInput(attrs={"type": "time"}),
+            "endTime": forms.TimeInput(attrs={"type": "time"}),
+            "validFrom": forms.DateInput(attrs={"type": "date"}),
+            "validUntil": forms.DateInput(attrs={"type": "date"}),
+        }
+
+    def clean_weekdays(self):
+        return sum(set(self.cleaned_data.get("weekdays", [])))
+
+    def clean_validFrom(self):
+        validFrom = self.cleaned_data.get("validFrom")
+
+        if validFrom and validFrom < timezone.now().date():
+            raise forms.ValidationError("The first date cannot be in the past.")
+
+        return validFrom
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_time = cleaned_data.get("startTime")
+        end_time = cleaned_data.get("endTime")
+        valid_from = cleaned_data.get("validFrom")
+        valid_until = cleaned_data.get("validUntil")
+
+        if start_time and end_time and start_time >= end_time:
+            raise forms.ValidationError("The start time must be before the end time.")
+        if valid_from and valid_until and valid_until < valid_from:
+            raise forms.ValidationError("The last date must be after the first date.")
+
+        return cleaned_data
+
+
 class CertificationForm(forms.ModelForm):
     """
     Form for creating and updating Certification model instances.
@@ -108,14 +169,27 @@ class CompanionUpdateForm(forms.ModelForm):
     Form for updating Companion model instances.
 
     Attributes:
-        __init__(): Set personalDescription and hourlyRate fields as not required.
+        __init__(): Set personalDescription, hourlyRate and competenciesMask fields as not required.
+        clean_competenciesMask(): Converts the selected care needs to a bit mask.
     """
 
+    competenciesMask = forms.TypedMultipleChoiceField(
+        label="Care needs I can cover",
+        choices=CARE_CHOICES,
+        coerce=int,
+        widget=forms.CheckboxSelectMultiple,
+    )
+
     class Meta:
         model = Companion
-        fields = ["personalDescription", "hourlyRate"]
+        fields = ["personalDescription", "hourlyRate", "competenciesMask"]
 
     def __init__(self, *args, **kwargs):
         super(CompanionUpdateForm, self).__init__(*args, **kwargs)
         self.fields["personalDescription"].required = False
         self.fields["hourlyRate"].required = False
+        self.fields["competenciesMask"].required = False
+        self.initial["competenciesMask"] = to_choices(self.initial.get("competenciesMask") or 0)
+
+    def clean_competenciesMask(self):
+        return sum(set(self.cleaned_data.get("competenciesMask", [])))
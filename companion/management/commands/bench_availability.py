@@ -0,0 +1,128 @@
+import random
+import time
+from datetime import date, time as dtime
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from authentication.models import User
+from companion.availability import AvailabilityEngine
+from companion.models import Companion, TimeAvailability
+
+BATCH_SIZE = 5000
+
+
+class Rollback(Exception):
+    pass
+
+
+def _timed(function, runs):
+    """Returns the result of the last run and the median time in ms."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return result, sorted(timings)[len(timings) // 2]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks 'who is free on this date and time range' with the slot "
+        "bitmap engine against the ORM range query. Synthetic companions are "
+        "created inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--companions",
+            type=int,
+            nargs="+",
+            default=[10_000, 100_000],
+            help="Number of companions to test with (default: 10000 100000).",
+        )
+        parser.add_argument("--runs", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'companions':>10} {'build ms':>9} {'engine ms':>10} "
+            f"{'orm ms':>9} {'speedup':>8} {'free':>7}"
+        )
+        for count in options["companions"]:
+            try:
+                with transaction.atomic():
+                    self.run(count, options["runs"], random.Random(options["seed"]))
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def populate(self, count, rng, day):
+        for first in range(0, count, BATCH_SIZE):
+            numbers = range(first, min(first + BATCH_SIZE, count))
+            User.objects.bulk_create(
+                User(
+                    names="Bench",
+                    lastNames=str(n),
+                    email=f"bench-availability-{n}@example.invalid",
+                    password="!",
+                )
+                for n in numbers
+            )
+            user_ids = User.objects.filter(
+                email__startswith="bench-availability-", companion__isnull=True
+            ).values_list("idUser", flat=True)
+            Companion.objects.bulk_create(
+                Companion(idUser_id=user_id, stateAvailability="available")
+                for user_id in user_ids
+            )
+
+        availabilities = []
+        for companion_id in Companion.objects.filter(
+            idUser__email__startswith="bench-availability-"
+        ).values_list("idCompanion", flat=True):
+            # One or two blocks per companion, on quarter hours.
+            start = rng.randrange(6 * 4, 14 * 4)
+            for _ in range(rng.randint(1, 2)):
+                end = min(start + rng.randrange(4, 8 * 4), 23 * 4)
+                availabilities.append(
+                    TimeAvailability(
+                        idCompanion_id=companion_id,
+                        date=day,
+                        startTime=dtime(start // 4, start % 4 * 15),
+                        endTime=dtime(end // 4, end % 4 * 15),
+                    )
+                )
+                start = min(end + rng.randrange(1, 8), 23 * 4 - 4)
+            if len(availabilities) >= BATCH_SIZE:
+                TimeAvailability.objects.bulk_create(availabilities)
+                availabilities = []
+        TimeAvailability.objects.bulk_create(availabilities)
+
+    def run(self, count, runs, rng):
+        day = date(2000, 1, 3)
+        start_time, end_time = dtime(14), dtime(17)
+        self.populate(count, rng, day)
+
+        engine = AvailabilityEngine()
+        _, build_ms = _timed(lambda: engine.invalidate(day) or engine.get_day(day), 3)
+        free, engine_ms = _timed(
+            lambda: engine.free_companions(day, start_time, end_time), runs
+        )
+
+        def orm_query():
+            return set(
+                TimeAvailability.objects.filter(
+                    date=day, startTime__lte=start_time, endTime__gte=end_time
+                ).values_list("idCompanion", flat=True)
+            )
+
+        orm_free, orm_ms = _timed(orm_query, runs)
+
+        # The engine also finds ranges covered by adjacent blocks, which the
+        # ORM query misses.
+        assert orm_free <= set(free.tolist())
+        self.stdout.write(
+            f"{count:>10} {build_ms:>9.1f} {engine_ms:>10.3f} {orm_ms:>9.1f} "
+            f"{orm_ms / max(engine_ms, 1e-6):>7.0f}x {len(free):>7}"
+        )
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.4 on 2026-10-17 03:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companion', '0002_timeavailability_skill_reference_certification'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='timeavailability',
+            index=models.Index(fields=['idCompanion', 'date', 'startTime', 'endTime'], name='timeavailability_slot_idx'),
+        ),
+    ]
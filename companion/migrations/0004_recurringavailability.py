@@ -0,0 +1,41 @@
+# Generated by Django 4.2.4 on 2026-10-17 03:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companion', '0003_timeavailability_slot_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurringAvailability',
+            fields=[
+                ('idRecurringAvailability', models.AutoField(primary_key=True, serialize=False)),
+                ('weekdays', models.PositiveSmallIntegerField()),
+                ('startTime', models.TimeField()),
+                ('endTime', models.TimeField()),
+                ('validFrom', models.DateField()),
+                ('validUntil', models.DateField(blank=True, null=True)),
+                ('idCompanion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='companion.companion')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RecurringAvailabilityException',
+            fields=[
+                ('idRecurringAvailabilityException', models.AutoField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('idRecurringAvailability', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='companion.recurringavailability')),
+            ],
+            options={
+                'unique_together': {('idRecurringAvailability', 'date')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recurringavailability',
+            index=models.Index(fields=['idCompanion', 'validFrom', 'validUntil'], name='recurringavailability_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.4 on 2026-10-17 03:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companion', '0004_recurringavailability'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timeavailability',
+            name='endsAt',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='timeavailability',
+            name='startsAt',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='timeavailability',
+            index=models.Index(fields=['idCompanion', 'startsAt', 'endsAt'], name='timeavailability_range_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeavailability',
+            index=models.Index(fields=['startsAt', 'endsAt', 'idCompanion'], name='timeavailability_window_idx'),
+        ),
+    ]
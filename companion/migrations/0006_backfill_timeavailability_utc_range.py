@@ -0,0 +1,48 @@
+from django.db import migrations
+
+from companion.time_ranges import to_utc_range
+
+BATCH_SIZE = 1000
+
+
+def backfill_utc_range(apps, schema_editor):
+    """
+    Fills startsAt/endsAt of the existing rows, in batches by primary key so
+    no batch holds more than BATCH_SIZE rows in memory or under lock.
+    """
+    TimeAvailability = apps.get_model("companion", "TimeAvailability")
+    rows = TimeAvailability.objects.using(schema_editor.connection.alias).filter(
+        startsAt__isnull=True,
+        date__isnull=False,
+        startTime__isnull=False,
+        endTime__isnull=False,
+    )
+    last_pk = 0
+    while True:
+        batch = list(
+            rows.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .only("pk", "date", "startTime", "endTime")[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        for row in batch:
+            row.startsAt, row.endsAt = to_utc_range(row.date, row.startTime, row.endTime)
+        TimeAvailability.objects.using(schema_editor.connection.alias).bulk_update(
+            batch, ["startsAt", "endsAt"]
+        )
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    # Every batch commits on its own, a failure does not roll back the others.
+    atomic = False
+
+    dependencies = [
+        ('companion', '0005_timeavailability_utc_range'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_utc_range, migrations.RunPython.noop),
+    ]
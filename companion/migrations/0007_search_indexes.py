@@ -0,0 +1,21 @@
+# Generated by Django 4.2.4 on 2026-10-17 03:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companion', '0006_backfill_timeavailability_utc_range'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='companion',
+            index=models.Index(fields=['stateAvailability', 'hourlyRate', 'idCompanion'], name='companion_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='skill',
+            index=models.Index(fields=['idCompanion', 'description'], name='skill_companion_idx'),
+        ),
+    ]
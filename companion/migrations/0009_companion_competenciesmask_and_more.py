@@ -0,0 +1,22 @@
+# Generated by Django 4.2.4 on 2026-10-17 03:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companion', '0008_skill_text_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='companion',
+            name='competenciesMask',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='companion',
+            index=models.Index(fields=['stateAvailability', 'competenciesMask', 'idCompanion'], name='companion_competencies_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.4 on 2026-10-17 04:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companion', '0009_companion_competenciesmask_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='companion',
+            name='bookingVersion',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
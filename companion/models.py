@@ -1,9 +1,12 @@
 from django.db import models
 from authentication.models import User
+from authentication.mixins import DirtyFieldsMixin
 from django.core.validators import FileExtensionValidator
+from .recurrence import weekday_names
+from .time_ranges import to_utc_range
 
 
-class Companion(models.Model):
+class Companion(DirtyFieldsMixin, models.Model):
     """
     Model for representing a companion.
 
@@ -12,6 +15,11 @@ class Companion(models.Model):
         stateAvailability (CharField): Availability state of the companion.
         hourlyRate (DecimalField): Hourly rate of the companion.
         personalDescription (TextField): Personal description of the companion.
+        competenciesMask (PositiveBigIntegerField): Care needs the companion can
+            cover, as a mask of authentication.care_taxonomy bits.
+        bookingVersion (PositiveIntegerField): Incremented by every reservation
+            of the companion, which serializes concurrent bookings (see
+            reserve.repositories.ReservationRepository).
         idUser (OneToOneField): Foreign key linking to the User model.
     """
 
@@ -28,8 +36,25 @@ class Companion(models.Model):
     )
     hourlyRate = models.DecimalField(max_digits=10, decimal_places=2, null=True)
     personalDescription = models.TextField(null=True)
+    competenciesMask = models.PositiveBigIntegerField(default=0)
+    bookingVersion = models.PositiveIntegerField(default=0, editable=False)
     idUser = models.OneToOneField(User, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            # Companion search: available companions by rate, then ID (keyset order).
+            models.Index(
+                fields=["stateAvailability", "hourlyRate", "idCompanion"],
+                name="companion_search_idx",
+            ),
+            # Care needs matching: the bitwise predicate is evaluated on the
+            # index entries of the available companions, not on the table.
+            models.Index(
+                fields=["stateAvailability", "competenciesMask", "idCompanion"],
+                name="companion_competencies_idx",
+            ),
+        ]
+
     def __str__(self):
         """
         String representation of the Companion model.
@@ -82,7 +107,7 @@ class Reference(models.Model):
     idCompanion = models.ForeignKey(Companion, on_delete=models.CASCADE)
 
 
-class TimeAvailability(models.Model):
+class TimeAvailability(DirtyFieldsMixin, models.Model):
     """
     Model to represent time availability associated with a Companion.
 
@@ -91,6 +116,8 @@ class TimeAvailability(models.Model):
         date (DateField): Date for availability.
         startTime (TimeField): Start time for availability.
         endTime (TimeField): End time for availability.
+        startsAt (DateTimeField): Start of the availability in UTC, kept in sync on save.
+        endsAt (DateTimeField): End of the availability in UTC, kept in sync on save.
         idCompanion (ForeignKey): Foreign key relation to the Companion model.
     """
 
@@ -98,8 +125,106 @@ class TimeAvailability(models.Model):
     date = models.DateField(null=True)
     startTime = models.TimeField(null=True)
     endTime = models.TimeField(null=True)
+    startsAt = models.DateTimeField(null=True, editable=False)
+    endsAt = models.DateTimeField(null=True, editable=False)
+    idCompanion = models.ForeignKey(Companion, on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            # Overlap checks probe one companion and date, then a time range.
+            models.Index(
+                fields=["idCompanion", "date", "startTime", "endTime"],
+                name="timeavailability_slot_idx",
+            ),
+            # UTC range of one companion.
+            models.Index(
+                fields=["idCompanion", "startsAt", "endsAt"],
+                name="timeavailability_range_idx",
+            ),
+            # UTC range across companions, covering the companion column.
+            models.Index(
+                fields=["startsAt", "endsAt", "idCompanion"],
+                name="timeavailability_window_idx",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        Keeps startsAt/endsAt in sync with the local date and times.
+        """
+        if self.date and self.startTime and self.endTime:
+            self.startsAt, self.endsAt = to_utc_range(
+                self.date, self.startTime, self.endTime
+            )
+        else:
+            self.startsAt = self.endsAt = None
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"date", "startTime", "endTime"} & set(
+            update_fields
+        ):
+            kwargs["update_fields"] = set(update_fields) | {"startsAt", "endsAt"}
+
+        super().save(*args, **kwargs)
+
+
+class RecurringAvailability(models.Model):
+    """
+    Model to represent a weekly recurring availability of a Companion.
+
+    The rule is expanded into concrete slots only for the dates being looked
+    at (see companion.recurrence). One-off TimeAvailability rows override
+    the rule on their date.
+
+    Attributes:
+        idRecurringAvailability (AutoField): Primary key for RecurringAvailability.
+        weekdays (PositiveSmallIntegerField): Bit mask of the weekdays, Monday is bit 0.
+        startTime (TimeField): Start time of every occurrence.
+        endTime (TimeField): End time of every occurrence.
+        validFrom (DateField): First date the rule applies to.
+        validUntil (DateField): Last date the rule applies to, open-ended if null.
+        idCompanion (ForeignKey): Foreign key relation to the Companion model.
+    """
+
+    idRecurringAvailability = models.AutoField(primary_key=True)
+    weekdays = models.PositiveSmallIntegerField()
+    startTime = models.TimeField()
+    endTime = models.TimeField()
+    validFrom = models.DateField()
+    validUntil = models.DateField(null=True, blank=True)
     idCompanion = models.ForeignKey(Companion, on_delete=models.CASCADE)
 
+    def get_weekdays_display(self):
+        return ", ".join(weekday_names(self.weekdays))
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["idCompanion", "validFrom", "validUntil"],
+                name="recurringavailability_idx",
+            ),
+        ]
+
+
+class RecurringAvailabilityException(models.Model):
+    """
+    Model to represent a date on which a RecurringAvailability does not apply.
+
+    Attributes:
+        idRecurringAvailabilityException (AutoField): Primary key.
+        date (DateField): The skipped date.
+        idRecurringAvailability (ForeignKey): Foreign key relation to the RecurringAvailability model.
+    """
+
+    idRecurringAvailabilityException = models.AutoField(primary_key=True)
+    date = models.DateField()
+    idRecurringAvailability = models.ForeignKey(
+        RecurringAvailability, on_delete=models.CASCADE
+    )
+
+    class Meta:
+        unique_together = [("idRecurringAvailability", "date")]
+
 
 class Skill(models.Model):
     """
@@ -114,3 +239,9 @@ class Skill(models.Model):
     idSkill = models.AutoField(primary_key=True)
     description = models.CharField(max_length=100)
     idCompanion = models.ForeignKey(Companion, on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            # Companion search probes "does this companion have this skill".
+            models.Index(fields=["idCompanion", "description"], name="skill_companion_idx"),
+        ]
@@ -0,0 +1,77 @@
+"""
+Expansion of weekly RecurringAvailability rules into concrete slots.
+
+Rules are never materialized as rows: they are expanded only for the dates
+being looked at. On a date where a companion has one-off TimeAvailability
+rows, those rows replace the companion's rules for that date.
+"""
+from collections import namedtuple
+from datetime import timedelta
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# (bit, name) pairs of the RecurringAvailability.weekdays mask.
+WEEKDAY_CHOICES = [(1 << index, name) for index, name in enumerate(WEEKDAYS)]
+
+Slot = namedtuple("Slot", ["date", "startTime", "endTime", "source"])
+
+
+def weekday_bit(day):
+    """Returns the weekdays mask bit of a date."""
+    return 1 << day.weekday()
+
+
+def weekday_names(weekdays):
+    """Returns the names of the weekdays set in a mask."""
+    return [name for bit, name in WEEKDAY_CHOICES if weekdays & bit]
+
+
+def applies_on(rule, day, skipped_dates=()):
+    """
+    Checks whether a rule has an occurrence on a date.
+
+    Args:
+        rule (RecurringAvailability): The rule.
+        day (date): The date.
+        skipped_dates (set): Exception dates of the rule.
+    """
+    return (
+        rule.validFrom <= day
+        and (rule.validUntil is None or day <= rule.validUntil)
+        and bool(rule.weekdays & weekday_bit(day))
+        and day not in skipped_dates
+    )
+
+
+def expand(rules, start_date, end_date, one_offs=(), skipped_dates=None):
+    """
+    Expands the rules and one-off availabilities of one companion.
+
+    Args:
+        rules (iterable): RecurringAvailability rules of the companion.
+        start_date (date): First date of the window.
+        end_date (date): Last date of the window, included.
+        one_offs (iterable): TimeAvailability rows of the companion.
+        skipped_dates (dict): Exception dates by rule ID.
+
+    Returns:
+        list: Slot tuples within the window, ordered by date and start time.
+    """
+    skipped_dates = skipped_dates or {}
+    slots = [
+        Slot(one_off.date, one_off.startTime, one_off.endTime, one_off)
+        for one_off in one_offs
+        if one_off.date and start_date <= one_off.date <= end_date
+    ]
+    overridden = {slot.date for slot in slots}
+
+    for rule in rules:
+        skipped = skipped_dates.get(rule.pk, ())
+        day = max(start_date, rule.validFrom)
+        last = min(end_date, rule.validUntil or end_date)
+        while day <= last:
+            if day not in overridden and applies_on(rule, day, skipped):
+                slots.append(Slot(day, rule.startTime, rule.endTime, rule))
+            day += timedelta(days=1)
+
+    return sorted(slots, key=lambda slot: (slot.date, slot.startTime))
@@ -0,0 +1,189 @@
+from abc import ABC, abstractmethod
+from datetime import date
+from django.core.exceptions import ValidationError
+from django.db.models import F, Prefetch, Q
+from .time_ranges import overlapping
+from .models import (
+    RecurringAvailability,
+    RecurringAvailabilityException,
+    TimeAvailability,
+)
+
+
+class AbstractTimeAvailabilityRepository(ABC):
+    """
+    Interface for the TimeAvailability repository.
+    Defines the abstract methods that must be implemented by concrete repositories.
+    """
+
+    @abstractmethod
+    def overlapping(self, companion_id, date, start_time, end_time):
+        """Gets the availabilities of a companion overlapping a slot."""
+        pass
+
+    @abstractmethod
+    def get_in_window(self, companion_id, start_date, end_date):
+        """Gets the availabilities of a companion between two dates."""
+        pass
+
+
+class TimeAvailabilityRepository(AbstractTimeAvailabilityRepository):
+    """Concrete repository that implements AbstractTimeAvailabilityRepository using Django ORM."""
+
+    def __init__(self, model=TimeAvailability):
+        self.model = model
+
+    def overlapping(self, companion_id, date, start_time, end_time):
+        """
+        Implements the method to retrieve the overlapping availabilities.
+
+        Slots touching at their bounds overlap. The filter is an equality on
+        idCompanion plus one UTC range, served by the timeavailability_range_idx
+        index, so slots crossing midnight are found too.
+        """
+        try:
+            return self.model.objects.filter(
+                overlapping(date, start_time, end_time, inclusive=True),
+                idCompanion=companion_id,
+            )
+        except Exception as e:
+            # Log or handle the unexpected exception here
+            raise RuntimeError(
+                f"An error occurred while fetching time availabilities: {str(e)}"
+            )
+
+    def get_in_window(self, companion_id, start_date, end_date):
+        """Implements the method to retrieve the availabilities between two dates."""
+        try:
+            return self.model.objects.filter(
+                idCompanion=companion_id, date__gte=start_date, date__lte=end_date
+            ).order_by("date", "startTime")
+        except Exception as e:
+            # Log or handle the unexpected exception here
+            raise RuntimeError(
+                f"An error occurred while fetching time availabilities: {str(e)}"
+            )
+
+
+class AbstractRecurringAvailabilityRepository(ABC):
+    """
+    Interface for the RecurringAvailability repository.
+    Defines the abstract methods that must be implemented by concrete repositories.
+    """
+
+    @abstractmethod
+    def get_active(self, companion_id, start_date, end_date):
+        """Gets the rules of a companion valid between two dates."""
+        pass
+
+    @abstractmethod
+    def overlapping(self, companion_id, weekdays, start_time, end_time, valid_from, valid_until):
+        """Gets the rules of a companion sharing a weekday and time with a new rule."""
+        pass
+
+    @abstractmethod
+    def create(self, rule_form, actualCompanion):
+        """Creates a new rule."""
+        pass
+
+    @abstractmethod
+    def delete(self, rule):
+        """Deletes a rule."""
+        pass
+
+    @abstractmethod
+    def add_exception(self, rule, date):
+        """Skips one date of a rule."""
+        pass
+
+
+class RecurringAvailabilityRepository(AbstractRecurringAvailabilityRepository):
+    """Concrete repository that implements AbstractRecurringAvailabilityRepository using Django ORM."""
+
+    def __init__(self, model=RecurringAvailability):
+        self.model = model
+
+    def _valid_between(self, start_date, end_date):
+        return Q(validFrom__lte=end_date) & (
+            Q(validUntil__isnull=True) | Q(validUntil__gte=start_date)
+        )
+
+    def get_active(self, companion_id, start_date, end_date):
+        """
+        Implements the method to retrieve the rules valid between two dates,
+        with their exceptions in the window prefetched.
+        """
+        try:
+            return self.model.objects.filter(
+                self._valid_between(start_date, end_date), idCompanion=companion_id
+            ).prefetch_related(
+                Prefetch(
+                    "recurringavailabilityexception_set",
+                    queryset=RecurringAvailabilityException.objects.filter(
+                        date__gte=start_date, date__lte=end_date
+                    ),
+                )
+            )
+        except Exception as e:
+            # Log or handle the unexpected exception here
+            raise RuntimeError(
+                f"An error occurred while fetching recurring availabilities: {str(e)}"
+            )
+
+    def overlapping(self, companion_id, weekdays, start_time, end_time, valid_from, valid_until):
+        """Implements the method to retrieve the overlapping rules."""
+        try:
+            rules = self.model.objects.filter(
+                self._valid_between(valid_from, valid_until or date.max),
+                idCompanion=companion_id,
+                startTime__lte=end_time,
+                endTime__gte=start_time,
+            )
+            return rules.annotate(sharedWeekdays=F("weekdays").bitand(weekdays)).filter(
+                sharedWeekdays__gt=0
+            )
+        except Exception as e:
+            # Log or handle the unexpected exception here
+            raise RuntimeError(
+                f"An error occurred while fetching recurring availabilities: {str(e)}"
+            )
+
+    def create(self, rule_form, actualCompanion):
+        """Creates a new rule associated with the current companion."""
+        try:
+            rule = rule_form.save(commit=False)
+            rule.idCompanion = actualCompanion
+            rule.save()
+            return rule
+        except ValidationError as ve:
+            # Handle validation errors raised by the model
+            raise ValueError(
+                f"Validation error occurred while creating a recurring availability: {str(ve)}"
+            )
+        except Exception as e:
+            # Log or handle the unexpected exception here
+            raise RuntimeError(
+                f"An error occurred while creating a recurring availability: {str(e)}"
+            )
+
+    def delete(self, rule):
+        """Deletes a specified rule."""
+        try:
+            rule.delete()
+        except Exception as e:
+            # Log or handle the unexpected exception here
+            raise RuntimeError(
+                f"An error occurred while deleting the recurring availability: {str(e)}"
+            )
+
+    def add_exception(self, rule, date):
+        """Skips one date of a rule, doing nothing if it is already skipped."""
+        try:
+            return RecurringAvailabilityException.objects.get_or_create(
+                idRecurringAvailability=rule, date=date
+            )[0]
+        except Exception as e:
+            # Log or handle the unexpected exception here
+            raise RuntimeError(
+                f"An error occurred while skipping a recurring availability date: {str(e)}"
+            )
@@ -0,0 +1,179 @@
+from abc import ABC, abstractmethod
+from .recurrence import applies_on, expand
+from .repositories import (
+    AbstractRecurringAvailabilityRepository,
+    AbstractTimeAvailabilityRepository,
+)
+
+
+class AbstractTimeAvailabilityService(ABC):
+    @abstractmethod
+    def collides(self, companion, date, start_time, end_time):
+        """Checks whether a slot collides with the companion's availabilities."""
+        pass
+
+
+class TimeAvailabilityService(AbstractTimeAvailabilityService):
+    """
+    Service to manage business logic related to TimeAvailability.
+    """
+
+    def __init__(self, time_availability_repository: AbstractTimeAvailabilityRepository):
+        self.time_availability_repository = time_availability_repository
+
+    def collides(self, companion, date, start_time, end_time):
+        """
+        Checks whether a slot collides with the companion's availabilities.
+
+        Args:
+            companion (Companion or int): The companion or its ID.
+            date (date): Date of the slot.
+            start_time (time): Start of the slot.
+            end_time (time): End of the slot.
+
+        Returns:
+            bool: True if an existing availability overlaps the slot.
+        """
+        try:
+            return self.time_availability_repository.overlapping(
+                getattr(companion, "pk", companion), date, start_time, end_time
+            ).exists()
+        except Exception as e:
+            raise RuntimeError(
+                f"An error occurred while checking time availabilities: {str(e)}"
+            )
+
+
+class AbstractRecurringAvailabilityService(ABC):
+    @abstractmethod
+    def get_slots(self, companion, start_date, end_date):
+        """Expands the companion's availabilities between two dates."""
+        pass
+
+    @abstractmethod
+    def collides(self, companion, weekdays, start_time, end_time, valid_from, valid_until):
+        """Checks whether a new rule collides with the companion's rules."""
+        pass
+
+    @abstractmethod
+    def create_rule(self, rule_form, actualCompanion):
+        """Creates a new rule."""
+        pass
+
+    @abstractmethod
+    def delete_rule(self, rule):
+        """Deletes a rule."""
+        pass
+
+    @abstractmethod
+    def skip_date(self, rule, date):
+        """Skips one date of a rule."""
+        pass
+
+
+class RecurringAvailabilityService(AbstractRecurringAvailabilityService):
+    """
+    Service to manage business logic related to RecurringAvailability.
+    """
+
+    def __init__(
+        self,
+        recurring_availability_repository: AbstractRecurringAvailabilityRepository,
+        time_availability_repository: AbstractTimeAvailabilityRepository,
+    ):
+        self.recurring_availability_repository = recurring_availability_repository
+        self.time_availability_repository = time_availability_repository
+
+    def get_slots(self, companion, start_date, end_date):
+        """
+        Expands the companion's availabilities between two dates.
+
+        Only the rules valid in the window and the one-off availabilities of
+        the window are read, so the cost depends on the window, not on how
+        long the rules run.
+
+        Args:
+            companion (Companion or int): The companion or its ID.
+            start_date (date): First date of the window.
+            end_date (date): Last date of the window, included.
+
+        Returns:
+            list: Slot tuples ordered by date and start time.
+        """
+        companion_id = getattr(companion, "pk", companion)
+        try:
+            rules = list(
+                self.recurring_availability_repository.get_active(
+                    companion_id, start_date, end_date
+                )
+            )
+            one_offs = list(
+                self.time_availability_repository.get_in_window(
+                    companion_id, start_date, end_date
+                )
+            )
+        except Exception as e:
+            raise RuntimeError(
+                f"An error occurred while fetching availabilities: {str(e)}"
+            )
+        skipped_dates = {
+            rule.pk: {
+                exception.date
+                for exception in rule.recurringavailabilityexception_set.all()
+            }
+            for rule in rules
+        }
+        return expand(rules, start_date, end_date, one_offs, skipped_dates)
+
+    def collides(self, companion, weekdays, start_time, end_time, valid_from, valid_until):
+        """
+        Checks whether a new rule collides with the companion's rules.
+
+        Args:
+            companion (Companion or int): The companion or its ID.
+            weekdays (int): Weekdays mask of the new rule.
+            start_time (time): Start time of the new rule.
+            end_time (time): End time of the new rule.
+            valid_from (date): First date of the new rule.
+            valid_until (date): Last date of the new rule, or None.
+
+        Returns:
+            bool: True if an existing rule shares a weekday, time and date.
+        """
+        try:
+            return self.recurring_availability_repository.overlapping(
+                getattr(companion, "pk", companion),
+                weekdays,
+                start_time,
+                end_time,
+                valid_from,
+                valid_until,
+            ).exists()
+        except Exception as e:
+            raise RuntimeError(
+                f"An error occurred while checking recurring availabilities: {str(e)}"
+            )
+
+    def create_rule(self, rule_form, actualCompanion):
+        """
+        Creates a new rule for the current companion.
+
+        Returns:
+            RecurringAvailability: The created rule.
+        """
+        return self.recurring_availability_repository.create(rule_form, actualCompanion)
+
+    def delete_rule(self, rule):
+        """Deletes a rule."""
+        self.recurring_availability_repository.delete(rule)
+
+    def skip_date(self, rule, date):
+        """
+        Skips one date of a rule.
+
+        Raises:
+            ValueError: If the rule has no occurrence on the date.
+        """
+        if not applies_on(rule, date):
+            raise ValueError("The recurring availability does not apply on this date.")
+        return self.recurring_availability_repository.add_exception(rule, date)
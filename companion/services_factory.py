@@ -0,0 +1,36 @@
+from .services import RecurringAvailabilityService, TimeAvailabilityService
+from .repositories import RecurringAvailabilityRepository, TimeAvailabilityRepository
+
+
+class ServiceFactory:
+    """
+    Factory to create instances of services with their associated repositories.
+    """
+
+    def get_service(self, service_type: str):
+        """
+        Returns the appropriate service based on the specified type.
+
+        Args:
+            service_type (str): The type of service to create.
+
+        Returns:
+            An instance of the requested service with its associated repository.
+
+        Raises:
+            ValueError: If the service_type is not supported.
+        """
+
+        services = {
+            "TIME_AVAILABILITY": lambda: TimeAvailabilityService(
+                TimeAvailabilityRepository()
+            ),
+            "RECURRING_AVAILABILITY": lambda: RecurringAvailabilityService(
+                RecurringAvailabilityRepository(), TimeAvailabilityRepository()
+            ),
+        }
+
+        if service_type not in services:
+            raise ValueError(f"The service type '{service_type}' is not supported.")
+
+        return services[service_type]()
@@ -0,0 +1,94 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from authentication.text_search import skill_index
+
+from .autocomplete import skill_autocomplete
+from .availability import availability_engine
+from .models import (
+    RecurringAvailability,
+    RecurringAvailabilityException,
+    Skill,
+    TimeAvailability,
+)
+
+
+@receiver(post_save, sender=TimeAvailability)
+def update_availability_engine(sender, instance, created, **kwargs):
+    """Applies a saved availability to the bitmaps once it is committed."""
+    companion_id = instance.idCompanion_id
+    if created:
+        slot = (instance.date, instance.startTime, instance.endTime)
+        if all(slot):
+            transaction.on_commit(
+                lambda: availability_engine.add(companion_id, *slot)
+            )
+        return
+
+    # The slot may have moved to another date, rebuild both.
+    dates = {instance.get_loaded_value("date"), instance.date} - {None}
+    for date in dates:
+        transaction.on_commit(
+            lambda date=date: availability_engine.refresh(companion_id, date)
+        )
+
+
+@receiver(post_delete, sender=TimeAvailability)
+def remove_from_availability_engine(sender, instance, **kwargs):
+    """Rebuilds the companion's day once a deleted availability is committed."""
+    if instance.date:
+        companion_id, date = instance.idCompanion_id, instance.date
+        transaction.on_commit(lambda: availability_engine.refresh(companion_id, date))
+
+
+@receiver(post_save, sender=RecurringAvailability)
+@receiver(post_delete, sender=RecurringAvailability)
+def invalidate_availability_engine(sender, instance, **kwargs):
+    """A rule spans many dates, drop every day once the change is committed."""
+    transaction.on_commit(availability_engine.invalidate)
+
+
+@receiver(post_save, sender=RecurringAvailabilityException)
+@receiver(post_delete, sender=RecurringAvailabilityException)
+def refresh_skipped_date(sender, instance, **kwargs):
+    """Rebuilds the companion's day of a skipped (or no longer skipped) date."""
+    # Read the rule now, it may be deleted along with the exception.
+    companion_id = RecurringAvailability.objects.filter(
+        pk=instance.idRecurringAvailability_id
+    ).values_list("idCompanion", flat=True).first()
+    if companion_id is not None:
+        date = instance.date
+        transaction.on_commit(lambda: availability_engine.refresh(companion_id, date))
+
+
+@receiver(post_save, sender=Skill)
+def update_skill_autocomplete(sender, instance, created, **kwargs):
+    """Adds a new skill to the trie once it is committed."""
+    if created:
+        description = instance.description
+        transaction.on_commit(lambda: skill_autocomplete.add(description))
+    else:
+        # The previous description is unknown, rebuild.
+        transaction.on_commit(skill_autocomplete.invalidate)
+
+
+@receiver(post_delete, sender=Skill)
+def remove_from_skill_autocomplete(sender, instance, **kwargs):
+    """Removes a deleted skill from the trie once it is committed."""
+    description = instance.description
+    transaction.on_commit(lambda: skill_autocomplete.remove(description))
+
+
+@receiver(post_save, sender=Skill)
+def update_skill_text_index(sender, instance, **kwargs):
+    """Applies a saved skill description to the text index once it is committed."""
+    pk, owner, description = instance.pk, instance.idCompanion_id, instance.description
+    transaction.on_commit(lambda: skill_index.update(pk, owner, description))
+
+
+@receiver(post_delete, sender=Skill)
+def remove_from_skill_text_index(sender, instance, **kwargs):
+    """Removes a deleted skill description from the text index once it is committed."""
+    pk = instance.pk
+    transaction.on_commit(lambda: skill_index.update(pk))
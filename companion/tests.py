@@ -1,3 +1,128 @@
-from django.test import TestCase
+from datetime import time, timedelta
 
-# Create your tests here.
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from authentication.models import User
+from .models import (
+    Companion,
+    Certification,
+    Reference,
+    TimeAvailability,
+    RecurringAvailability,
+    Skill,
+)
+from . import views
+
+
+@override_settings(SESSION_WRITE_BEHIND_INTERVAL=0)
+class CompanionDashboardQueriesTest(TestCase):
+    """The companion dashboard runs a fixed number of queries."""
+
+    def setUp(self):
+        self.user = User.objects.create(
+            names="Ana", lastNames="Diaz", email="ana@example.com", password="secret"
+        )
+        self.companion = Companion.objects.create(
+            idUser=self.user, stateAvailability="available"
+        )
+        self.client.force_login(
+            self.user, backend="authentication.backends.EmailPasswordAuthBackend"
+        )
+
+    def add_rows(self, count):
+        first_day = timezone.localdate()
+        start = Reference.objects.count()
+        for n in range(start, start + count):
+            Reference.objects.create(
+                names=f"Reference {n}",
+                email=f"reference{n}@example.com",
+                idCompanion=self.companion,
+            )
+            TimeAvailability.objects.create(
+                date=first_day + timedelta(days=n),
+                startTime=time(8),
+                endTime=time(12),
+                idCompanion=self.companion,
+            )
+            Certification.objects.create(
+                description=f"Certification {n}", idCompanion=self.companion
+            )
+            Skill.objects.create(description=f"Skill {n}", idCompanion=self.companion)
+            RecurringAvailability.objects.create(
+                weekdays=1 << (n % 7),
+                startTime=time(14),
+                endTime=time(18),
+                validFrom=first_day,
+                idCompanion=self.companion,
+            )
+
+    def count_dashboard_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("editGeneralAllCompanion"))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_depend_on_rows(self):
+        # Warm the user cache so both measured requests start alike.
+        self.count_dashboard_queries()
+
+        self.add_rows(1)
+        few_rows = self.count_dashboard_queries()
+        self.add_rows(20)
+        many_rows = self.count_dashboard_queries()
+
+        self.assertEqual(few_rows, many_rows)
+
+    def test_lists_are_loaded_once(self):
+        self.add_rows(3)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("editGeneralAllCompanion"))
+
+        companion_table = Companion._meta.db_table
+        list_tables = [
+            model._meta.db_table
+            for model in (
+                Reference,
+                TimeAvailability,
+                RecurringAvailability,
+                Certification,
+                Skill,
+            )
+        ]
+        for table in [companion_table] + list_tables:
+            selects = [
+                query["sql"]
+                for query in queries
+                if query["sql"].startswith("SELECT")
+                and f'FROM "{table}"' in query["sql"]
+            ]
+            self.assertLessEqual(len(selects), 1, table)
+
+        dates = [
+            availability.date
+            for availability in response.context["listTimeAvailabilityCompanion"]
+        ]
+        self.assertEqual(dates, sorted(dates))
+
+    def test_views_share_the_request_context(self):
+        self.add_rows(3)
+        request = RequestFactory().get(reverse("editGeneralAllCompanion"))
+        request.user = User.objects.select_related("companion").get(pk=self.user.pk)
+        list_views = (
+            views.reference_companion_list,
+            views.time_availability_list,
+            views.recurring_availability_list,
+            views.certifications_companion_list,
+            views.skill_companion_list,
+        )
+
+        # One query per list, however many views read them.
+        with self.assertNumQueries(5):
+            for _ in range(2):
+                for view in list_views:
+                    self.assertEqual(len(list(view(request))), 3)
+                views.get_actualCompanion(request)
@@ -0,0 +1,71 @@
+"""
+Availability (and booking) times stored as UTC datetime ranges.
+
+Forms keep working with a local date plus start and end times; models store
+them as `startsAt`/`endsAt` UTC datetimes as well, so "date + local time
+window" becomes one range predicate on an index, also when the window
+crosses midnight or a DST change. Local times are in AVAILABILITY_TIME_ZONE.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db.models import Q
+
+
+def get_time_zone():
+    """Returns the time zone local dates and times are expressed in."""
+    return ZoneInfo(settings.AVAILABILITY_TIME_ZONE)
+
+
+def to_utc_range(date, start_time, end_time, tz=None):
+    """
+    Converts a local date and time window to a UTC datetime range.
+
+    A window ending at or before its start time ends the next day.
+
+    Args:
+        date (date): Local date the window starts on.
+        start_time (time): Local start time.
+        end_time (time): Local end time.
+        tz (tzinfo): Time zone of the window, AVAILABILITY_TIME_ZONE by default.
+
+    Returns:
+        tuple: (start, end) aware UTC datetimes.
+    """
+    tz = tz or get_time_zone()
+    end_date = date if end_time > start_time else date + timedelta(days=1)
+    start = datetime.combine(date, start_time, tzinfo=tz)
+    end = datetime.combine(end_date, end_time, tzinfo=tz)
+    return start.astimezone(dt_timezone.utc), end.astimezone(dt_timezone.utc)
+
+
+def overlapping(date, start_time, end_time, tz=None, inclusive=False,
+                start_field="startsAt", end_field="endsAt"):
+    """
+    Builds the predicate of the ranges overlapping a local time window.
+
+    Args:
+        date, start_time, end_time, tz: The window, see `to_utc_range`.
+        inclusive (bool): Whether ranges touching the window at a bound overlap.
+        start_field (str): Field (or lookup path) of the range start.
+        end_field (str): Field (or lookup path) of the range end.
+
+    Returns:
+        Q: `start < window end AND end > window start`, or with <=/>= if inclusive.
+    """
+    start, end = to_utc_range(date, start_time, end_time, tz)
+    lower, upper = ("lte", "gte") if inclusive else ("lt", "gt")
+    return Q(**{f"{start_field}__{lower}": end, f"{end_field}__{upper}": start})
+
+
+def covering(date, start_time, end_time, tz=None,
+             start_field="startsAt", end_field="endsAt"):
+    """
+    Builds the predicate of the ranges containing a whole local time window.
+
+    Returns:
+        Q: `start <= window start AND end >= window end`.
+    """
+    start, end = to_utc_range(date, start_time, end_time, tz)
+    return Q(**{f"{start_field}__lte": start, f"{end_field}__gte": end})
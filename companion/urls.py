@@ -22,6 +22,21 @@ urlpatterns = [
         views.delete_time_availability,
         name="deleteTimeAvailability",
     ),
+    path(
+        "edit/createRecurringAvailability",
+        views.create_recurring_availability,
+        name="createRecurringAvailability",
+    ),
+    path(
+        "edit/deleteRecurringAvailability/<int:idRecurringAvailability>/",
+        views.delete_recurring_availability,
+        name="deleteRecurringAvailability",
+    ),
+    path(
+        "edit/skipRecurringAvailabilityDate/<int:idRecurringAvailability>/",
+        views.skip_recurring_availability_date,
+        name="skipRecurringAvailabilityDate",
+    ),
     path(
         "edit/createCertification",
         views.create_certification,
@@ -33,6 +48,7 @@ urlpatterns = [
         name="deleteCertification",
     ),
     path("edit/createSkill", views.create_skill, name="createSkill"),
+    path("edit/skillSuggestions", views.skill_suggestions, name="skillSuggestions"),
     path("edit/deleteSkill/<int:idSkill>/", views.delete_skill, name="deleteSkill"),
     path("edit/editCompanion", views.edit_companion, name="editCompanion"),
 ]
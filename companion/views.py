@@ -1,19 +1,39 @@
-from django.http import Http404
+from django import forms
+from django.core.exceptions import ValidationError
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_GET
 from django.contrib.auth.decorators import login_required
 from django.db import IntegrityError, transaction
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from authentication.views import UserRegistrationView, edit_user_profile
 from authentication.models import User
-from .models import Companion, Certification, Reference, TimeAvailability, Skill
+from .models import (
+    Companion,
+    Certification,
+    Reference,
+    TimeAvailability,
+    RecurringAvailability,
+    Skill,
+)
+from .autocomplete import MAX_SUGGESTIONS, skill_autocomplete
+from .context import get_companion_context
+from .services_factory import ServiceFactory
 from .forms import (
     ReferenceForm,
     TimeAvailabilityForm,
+    RecurringAvailabilityForm,
     CertificationForm,
     SkillForm,
     CompanionUpdateForm,
 )
 
+services_factory = ServiceFactory()
+time_availability_service = services_factory.get_service("TIME_AVAILABILITY")
+recurring_availability_service = services_factory.get_service(
+    "RECURRING_AVAILABILITY"
+)
+
 
 class CompanionRegistrationView(UserRegistrationView):
     """
@@ -66,10 +86,12 @@ def get_actualCompanion(request):
 
     Returns:
         Companion: The current companion.
+
+    Raises:
+        Http404: If the user is not a companion.
     """
-    actualUserId = request.user.idUser
-    actualCompanion = get_object_or_404(Companion, idUser=actualUserId)
-    return actualCompanion
+    # Shared by every view of the request, see CompanionContext.
+    return get_companion_context(request).companion
 
 
 @login_required
@@ -80,10 +102,7 @@ def reference_companion_list(request):
     Returns:
         QuerySet: All references of a Companion.
     """
-    actualCompanion = get_actualCompanion(request)
-    referencesCompanion = Reference.objects.filter(
-        idCompanion=actualCompanion.idCompanion
-    )
+    referencesCompanion = get_companion_context(request).references
     return referencesCompanion
 
 
@@ -164,13 +183,10 @@ def time_availability_list(request):
         request (HttpRequest): The HTTP request object.
 
     Returns:
-        QuerySet: A queryset of TimeAvailability objects filtered by the current companion's ID, ordered by date and start time.
+        QuerySet: A queryset of the current companion's TimeAvailability objects from today on, ordered by date and start time.
 
     """
-    actualCompanion = get_actualCompanion(request)
-    time_availabilities = TimeAvailability.objects.filter(
-        idCompanion=actualCompanion.idCompanion
-    ).order_by("date", "startTime")
+    time_availabilities = get_companion_context(request).time_availabilities
 
     return time_availabilities
 
@@ -193,16 +209,14 @@ def create_time_availability(request):
     if request.method == "POST":
         form = TimeAvailabilityForm(request.POST)
         if form.is_valid():
-            # Validate if a TimeAvailability already exists with the same date and times
+            # Validate that the companion has no TimeAvailability overlapping these times
             date = form.cleaned_data["date"]
             start_time = form.cleaned_data["startTime"]
             end_time = form.cleaned_data["endTime"]
 
-            existing_availability = TimeAvailability.objects.filter(
-                date=date, startTime__lte=end_time, endTime__gte=start_time
-            )
-
-            if existing_availability.exists():
+            if time_availability_service.collides(
+                actualCompanion, date, start_time, end_time
+            ):
                 messages.error(
                     request,
                     "Time availability already exists for the specified period.",
@@ -260,6 +274,136 @@ def delete_time_availability(request, idTimeAvailability):
     return redirect("editGeneralAllCompanion")
 
 
+@login_required
+def recurring_availability_list(request):
+    """
+    View function for retrieving the recurring availabilities of the current companion.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        QuerySet: A queryset of the RecurringAvailability objects that have not ended yet.
+    """
+    recurringAvailabilities = get_companion_context(request).recurring_availabilities
+    return recurringAvailabilities
+
+
+@login_required
+def create_recurring_availability(request):
+    """
+    View function for creating a weekly recurring availability for the current companion.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        HttpResponse or RecurringAvailabilityForm: If the request method is POST, redirects to the 'editGeneralAllCompanion' page with appropriate messages.
+        If the request method is GET, returns the RecurringAvailabilityForm for rendering.
+    """
+    actualCompanion = get_actualCompanion(request)
+
+    if request.method == "POST":
+        form = RecurringAvailabilityForm(request.POST)
+        if form.is_valid():
+            # Validate that no other rule shares a weekday and time in the same period
+            if recurring_availability_service.collides(
+                actualCompanion,
+                form.cleaned_data["weekdays"],
+                form.cleaned_data["startTime"],
+                form.cleaned_data["endTime"],
+                form.cleaned_data["validFrom"],
+                form.cleaned_data["validUntil"],
+            ):
+                messages.error(
+                    request,
+                    "A recurring availability already exists for the specified days and times.",
+                )
+            else:
+                recurring_availability_service.create_rule(form, actualCompanion)
+                messages.success(request, "Recurring availability added successfully!")
+        else:
+            # Invalid form submission
+            for field, errors in form.errors.items():
+                for error in errors:
+                    messages.error(request, f"{error}")
+
+        return redirect("editGeneralAllCompanion")
+    else:
+        # Render the form for a GET request
+        form = RecurringAvailabilityForm()
+
+    return form
+
+
+@login_required
+def delete_recurring_availability(request, idRecurringAvailability):
+    """
+    View function for deleting a recurring availability of the current companion.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        idRecurringAvailability (int): The ID of the recurring availability to delete.
+
+    Returns:
+        HttpResponse: Redirects to the 'editGeneralAllCompanion' page with appropriate messages.
+    """
+    actualCompanion = get_actualCompanion(request)
+    rule = get_object_or_404(
+        RecurringAvailability, idRecurringAvailability=idRecurringAvailability
+    )
+
+    # Verify that the user is the rule owner
+    if actualCompanion.idCompanion == rule.idCompanion_id:
+        recurring_availability_service.delete_rule(rule)
+        messages.success(request, "The recurring availability was successfully deleted.")
+    else:
+        messages.error(
+            request, "You do not have permission to delete this recurring availability."
+        )
+
+    return redirect("editGeneralAllCompanion")
+
+
+@login_required
+def skip_recurring_availability_date(request, idRecurringAvailability):
+    """
+    View function for skipping one date of a recurring availability.
+
+    Args:
+        request (HttpRequest): The HTTP request object, with the date to skip in POST.
+        idRecurringAvailability (int): The ID of the recurring availability.
+
+    Returns:
+        HttpResponse: Redirects to the 'editGeneralAllCompanion' page with appropriate messages.
+    """
+    actualCompanion = get_actualCompanion(request)
+    rule = get_object_or_404(
+        RecurringAvailability, idRecurringAvailability=idRecurringAvailability
+    )
+
+    if request.method != "POST":
+        return redirect("editGeneralAllCompanion")
+
+    if actualCompanion.idCompanion != rule.idCompanion_id:
+        messages.error(
+            request, "You do not have permission to change this recurring availability."
+        )
+        return redirect("editGeneralAllCompanion")
+
+    dateField = forms.DateField()
+    try:
+        date = dateField.clean(request.POST.get("date"))
+        recurring_availability_service.skip_date(rule, date)
+        messages.success(request, f"You will not be available on {date} for this rule.")
+    except ValidationError:
+        messages.error(request, "Enter a valid date.")
+    except ValueError as e:
+        messages.error(request, str(e))
+
+    return redirect("editGeneralAllCompanion")
+
+
 @login_required
 def create_certification(request):
     """
@@ -314,10 +458,7 @@ def certifications_companion_list(request):
         QuerySet: A queryset of Certification objects filtered by the current companion's ID.
 
     """
-    actualCompanion = get_actualCompanion(request)
-    certifications = Certification.objects.filter(
-        idCompanion=actualCompanion.idCompanion
-    )
+    certifications = get_companion_context(request).certifications
     return certifications
 
 
@@ -392,6 +533,36 @@ def create_skill(request):
     return form
 
 
+@login_required
+@require_GET
+def skill_suggestions(request):
+    """
+    JSON endpoint suggesting existing skills for the skill input, so
+    companions reuse a spelling instead of adding near duplicates.
+
+    Query parameters:
+        q: What has been typed so far.
+        limit: Number of suggestions, 10 by default.
+
+    Returns:
+        JsonResponse: `suggestions`, a list of {"description", "count"},
+        most frequent first.
+    """
+    try:
+        limit = min(max(int(request.GET.get("limit", 10)), 1), MAX_SUGGESTIONS)
+    except ValueError:
+        limit = 10
+    suggestions = skill_autocomplete.suggest(request.GET.get("q", ""), limit)
+    return JsonResponse(
+        {
+            "suggestions": [
+                {"description": description, "count": count}
+                for description, count in suggestions
+            ]
+        }
+    )
+
+
 @login_required
 def skill_companion_list(request):
     """
@@ -403,11 +574,8 @@ def skill_companion_list(request):
     Returns:
         QuerySet: A queryset containing the skills associated with the current companion.
     """
-    # Retrieve the current companion from the request
-    actualCompanion = get_actualCompanion(request)
-
     # Retrieve the skills associated with the current companion
-    skillsCompanion = Skill.objects.filter(idCompanion=actualCompanion.idCompanion)
+    skillsCompanion = get_companion_context(request).skills
 
     return skillsCompanion
 
@@ -496,6 +664,8 @@ def edit_general_all_companion(request):
     listReferencesCompanion = reference_companion_list(request)
     formCreateTimeAvailability = create_time_availability(request)
     listTimeAvailabilityCompanion = time_availability_list(request)
+    formCreateRecurringAvailability = create_recurring_availability(request)
+    listRecurringAvailabilityCompanion = recurring_availability_list(request)
     formCertificationCompanion = create_certification(request)
     listCertificationCompanion = certifications_companion_list(request)
     formCreateSkill = create_skill(request)
@@ -512,6 +682,8 @@ def edit_general_all_companion(request):
             "listReferencesCompanion": listReferencesCompanion,
             "formCreateTimeAvailability": formCreateTimeAvailability,
             "listTimeAvailabilityCompanion": listTimeAvailabilityCompanion,
+            "formCreateRecurringAvailability": formCreateRecurringAvailability,
+            "listRecurringAvailabilityCompanion": listRecurringAvailabilityCompanion,
             "formCertificationCompanion": formCertificationCompanion,
             "listCertificationCompanion": listCertificationCompanion,
             "formCreateSkill": formCreateSkill,
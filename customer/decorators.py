@@ -19,10 +19,9 @@ def actual_customer_required(customer_service):
         @wraps(view_func)
         @login_required
         def _wrapped_view(request, *args, **kwargs):
-            actual_user_id = request.user.idUser
-
-            # Use the service to obtain the current customer
-            actual_customer = customer_service.get_customer_by_user_id(actual_user_id)
+            # Use the service to obtain the current customer, the user loaded
+            # by the authentication backend already carries it
+            actual_customer = customer_service.get_customer_by_user(request.user)
 
             if actual_customer is None:
                 return HttpResponseForbidden(
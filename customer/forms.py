@@ -1,4 +1,5 @@
 from django import forms
+from authentication.care_taxonomy import CARE_CHOICES, to_choices
 from .models import MedicalInformation, Preference, Customer
 
 
@@ -11,8 +12,17 @@ class MedicalInformationForm(forms.ModelForm):
         fields (list): A special value "__all__" indicates that all fields in the model should be included in the form.
         exclude (list): Specifies the fields to be excluded from the form ("idMedicalInformation", "idCustomer").
 
+    Attributes:
+        clean_careNeedsMask(): Converts the selected care needs to a bit mask.
     """
 
+    careNeedsMask = forms.TypedMultipleChoiceField(
+        label="Care needs",
+        choices=CARE_CHOICES,
+        coerce=int,
+        widget=forms.CheckboxSelectMultiple,
+    )
+
     class Meta:
         model = MedicalInformation
         fields = "__all__"
@@ -32,6 +42,10 @@ class MedicalInformationForm(forms.ModelForm):
         super(MedicalInformationForm, self).__init__(*args, **kwargs)
         for field in self.fields.values():
             field.required = False
+        self.initial["careNeedsMask"] = to_choices(self.initial.get("careNeedsMask") or 0)
+
+    def clean_careNeedsMask(self):
+        return sum(set(self.cleaned_data.get("careNeedsMask", [])))
 
 
 class PreferenceForm(forms.ModelForm):
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from authentication.text_search import create_database_index, drop_database_index
+
+
+def create_text_index(apps, schema_editor):
+    create_database_index(schema_editor, "customer_preference", "idPreference", "description")
+
+
+def drop_text_index(apps, schema_editor):
+    drop_database_index(schema_editor, "customer_preference")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0003_alter_medicalinformation_idcustomer'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_text_index, drop_text_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.4 on 2026-10-17 03:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0004_preference_text_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medicalinformation',
+            name='careNeedsMask',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -1,8 +1,9 @@
 from django.db import models
 from authentication.models import User
+from authentication.mixins import DirtyFieldsMixin
 
 
-class Customer(models.Model):
+class Customer(DirtyFieldsMixin, models.Model):
     """
     Model for representing a customer.
 
@@ -47,6 +48,7 @@ class MedicalInformation(models.Model):
         medicationIntake (TextField): Text field to store information about medication taken by the user.
         medicationRestriction (TextField): Text field to store information about medication restrictions.
         emergencyContact (CharField): Char field to store emergency contact information (limited to 15 characters).
+        careNeedsMask (PositiveBigIntegerField): Coded care needs, as a mask of authentication.care_taxonomy bits.
         idCustomer (ForeignKey): Foreign key linking to the Customer model, establishing a one-to-one relationship.
     """
 
@@ -56,6 +58,7 @@ class MedicalInformation(models.Model):
     medicationIntake = models.TextField(null=True)
     medicationRestriction = models.TextField(null=True)
     emergencyContact = models.CharField(max_length=15, null=True)
+    careNeedsMask = models.PositiveBigIntegerField(default=0)
     idCustomer = models.ForeignKey(Customer, on_delete=models.CASCADE, unique=True)
 
 
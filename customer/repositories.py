@@ -14,6 +14,11 @@ class AbstractCustomerRepository(ABC):
         """Gets a customer by the user ID."""
         pass
 
+    @abstractmethod
+    def get_by_user(self, user):
+        """Gets the customer of a loaded user."""
+        pass
+
     @abstractmethod
     def create(self, user):
         """Creates a new customer."""
@@ -39,6 +44,24 @@ class CustomerRepository(AbstractCustomerRepository):
                 f"An error occurred while fetching the customer: {str(e)}"
             )
 
+    def get_by_user(self, user):
+        """
+        Implements the method to retrieve the customer of a user.
+
+        Users loaded by the authentication backend already carry their
+        customer row, in which case no query is made.
+        """
+        try:
+            return user.customer
+        except self.model.DoesNotExist:
+            # Return None if the customer does not exist
+            return None
+        except Exception as e:
+            # Log or handle the unexpected exception here
+            raise RuntimeError(
+                f"An error occurred while fetching the customer: {str(e)}"
+            )
+
     def create(self, user):
         """Implements the method to create a new customer."""
         try:
@@ -18,6 +18,11 @@ class AbstractCustomerService(ABC):
         """Retrieves a customer associated with the given user ID."""
         pass
 
+    @abstractmethod
+    def get_customer_by_user(self, user):
+        """Retrieves the customer associated with a loaded user."""
+        pass
+
 
 class CustomerService(AbstractCustomerService):
     """
@@ -63,6 +68,21 @@ class CustomerService(AbstractCustomerService):
         except Exception as e:
             raise RuntimeError(f"An error occurred while fetching customer: {str(e)}")
 
+    def get_customer_by_user(self, user):
+        """
+        Retrieves the customer associated with a loaded user.
+
+        Args:
+            user (User): The user, usually `request.user`.
+
+        Returns:
+            Customer or None: The customer instance or None if not found.
+        """
+        try:
+            return self.customer_repository.get_by_user(user)
+        except Exception as e:
+            raise RuntimeError(f"An error occurred while fetching customer: {str(e)}")
+
 
 class AbstractMedicalInformationService(ABC):
     @abstractmethod
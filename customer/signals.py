@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from authentication.text_search import preference_index
+
+from .models import Preference
+
+
+@receiver(post_save, sender=Preference)
+def update_preference_text_index(sender, instance, **kwargs):
+    """Applies a saved preference description to the text index once it is committed."""
+    pk, owner, description = instance.pk, instance.idCustomer_id, instance.description
+    transaction.on_commit(lambda: preference_index.update(pk, owner, description))
+
+
+@receiver(post_delete, sender=Preference)
+def remove_from_preference_text_index(sender, instance, **kwargs):
+    """Removes a deleted preference description from the text index once it is committed."""
+    pk = instance.pk
+    transaction.on_commit(lambda: preference_index.update(pk))
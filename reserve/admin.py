@@ -1,3 +1,41 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from .models import CareRequest, CompanionRecommendation, Reservation, ReservationHold
+from .services_factory import ServiceFactory
 
-# Register your models here.
+admin.site.register(CompanionRecommendation)
+admin.site.register(Reservation)
+admin.site.register(ReservationHold)
+
+
+@admin.register(CareRequest)
+class CareRequestAdmin(admin.ModelAdmin):
+    list_display = [
+        "idCareRequest",
+        "idCustomer",
+        "date",
+        "startTime",
+        "endTime",
+        "skills",
+        "location",
+        "state",
+        "idCompanion",
+    ]
+    list_filter = ["state", "date"]
+    actions = ["assign_companions"]
+
+    @admin.action(description="Assign companions to the selected pending requests")
+    def assign_companions(self, request, queryset):
+        """Solves the assignment of the selected requests and books it."""
+        service = ServiceFactory().get_service("CARE_ASSIGNMENT")
+        try:
+            assignments, unassigned = service.assign_pending(
+                ids=list(queryset.values_list("pk", flat=True))
+            )
+        except RuntimeError as e:
+            self.message_user(request, str(e), messages.ERROR)
+            return
+        self.message_user(
+            request,
+            f"{len(assignments)} requests assigned, {len(unassigned)} left pending.",
+            messages.SUCCESS if assignments else messages.WARNING,
+        )
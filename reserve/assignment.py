@@ -0,0 +1,285 @@
+"""
+Assignment of pending care requests to companions.
+
+Requests are assigned one window at a time: a window gathers requests
+whose UTC ranges overlap, directly or through other requests of the
+window, and windows do not overlap each other. A companion takes at most
+one request of a window, so assignments never collide, while the same
+companion can take a morning and an afternoon visit of a date, and the
+matrices stay small however many dates a batch spans. For each window, a
+cost matrix of requests by companions is built with numpy from the
+companion index (rates, skills, coordinates), the availability engine and
+the reservations and holds of the window, then the assignment of least
+total cost is solved exactly.
+
+The cost of a pair, in currency units, is the price of the visit at the
+companion's hourly rate with the surcharges of reserve.pricing, plus
+ASSIGNMENT_COST_PER_KM per km between the companion and the visit
+(ASSIGNMENT_MAX_DISTANCE_KM when either has no coordinates) and
+ASSIGNMENT_MISSING_SKILL_COST per requested skill the companion lacks.
+Companions unavailable, busy, or farther than ASSIGNMENT_MAX_DISTANCE_KM
+cannot take the request.
+
+The solver is scipy's linear_sum_assignment when scipy is installed, and
+otherwise a numpy implementation of the Hungarian algorithm.
+"""
+from collections import namedtuple
+
+import numpy as np
+from django.conf import settings
+
+from authentication.geo import haversine_km
+from companion.availability import availability_engine
+
+from .booking import MAX_RESERVATION_LENGTH, hold_store
+from .intervals import IntervalTree
+from .matching import NO_ROWS, companion_index, normalize
+from .models import Reservation
+from .pricing import PRICE_DIVISOR, pricing_policy, rate_card
+
+try:
+    from scipy.optimize import linear_sum_assignment as _scipy_assignment
+except ImportError:
+    _scipy_assignment = None
+
+# Cost of the pairs that cannot be assigned: above any real cost, yet small
+# enough for the potentials of the solver to keep cents exact.
+INFEASIBLE = 1e9
+
+Assignment = namedtuple("Assignment", ["request", "companion_id", "cost"])
+
+
+def hungarian(cost):
+    """
+    Solves a rectangular assignment problem with the Hungarian algorithm:
+    one shortest augmenting path (Dijkstra over reduced costs) per row,
+    each step vectorized over the columns.
+
+    Args:
+        cost (ndarray): (rows, columns) matrix of finite costs.
+
+    Returns:
+        tuple: (rows, columns) index arrays of the pairs of least total
+        cost, one per row (or column, when there are fewer columns),
+        ordered by row.
+    """
+    cost = np.asarray(cost, dtype=float)
+    if cost.shape[0] > cost.shape[1]:
+        columns, rows = hungarian(cost.T)
+        order = np.argsort(rows)
+        return rows[order], columns[order]
+
+    n, m = cost.shape
+    u = np.zeros(n)
+    v = np.zeros(m)
+    row_of = np.full(m, -1, dtype=np.int64)
+    column_of = np.full(n, -1, dtype=np.int64)
+
+    # Start from each row's cheapest column, when no cheaper row took it:
+    # with u the row minima these pairs are tight, and only the other rows
+    # need an augmenting path.
+    cheapest = cost.argmin(axis=1)
+    u[:] = cost[np.arange(n), cheapest]
+    for row in np.argsort(u, kind="stable"):
+        if row_of[cheapest[row]] < 0:
+            row_of[cheapest[row]] = row
+            column_of[row] = cheapest[row]
+
+    previous_row = np.empty(m, dtype=np.int64)
+    for start in np.flatnonzero(column_of < 0):
+        distances = np.full(m, np.inf)
+        # Reached columns are out of the search: +inf on their distances.
+        reached = np.zeros(m)
+        shortest = np.empty(m)
+        rows, columns = [start], []
+        row, distance = start, 0.0
+        while True:
+            through_row = cost[row] - v
+            through_row += distance - u[row]
+            through_row += reached
+            better = through_row < distances
+            np.copyto(distances, through_row, where=better)
+            np.copyto(previous_row, row, where=better)
+            column = int(np.argmin(distances))
+            distance = distances[column]
+            shortest[column] = distance
+            columns.append(column)
+            distances[column] = reached[column] = np.inf
+            if row_of[column] < 0:
+                break
+            row = row_of[column]
+            rows.append(row)
+
+        # Keep the reduced costs non-negative and the path tight.
+        u[start] += distance
+        rows = np.array(rows[1:], dtype=np.int64)
+        u[rows] += distance - shortest[column_of[rows]]
+        columns = np.array(columns, dtype=np.int64)
+        v[columns] -= distance - shortest[columns]
+        # Flip the path back to the start row.
+        while True:
+            row = previous_row[column]
+            row_of[column] = row
+            column_of[row], column = column, column_of[row]
+            if row == start:
+                break
+
+    rows = np.flatnonzero(column_of >= 0)
+    return rows, column_of[rows]
+
+
+def solver_name():
+    """Name of the solver used, "scipy" or "hungarian"."""
+    return "scipy" if _scipy_assignment is not None else "hungarian"
+
+
+def solve(cost):
+    """Least cost assignment of a matrix, with scipy when it is installed."""
+    if _scipy_assignment is not None:
+        return _scipy_assignment(cost)
+    return hungarian(cost)
+
+
+def windows(requests):
+    """
+    Splits care requests into windows of overlapping UTC ranges.
+
+    Args:
+        requests (iterable): CareRequest objects.
+
+    Returns:
+        list: Lists of requests, by start; the requests of a window are
+        ordered by start too, and a window starts at or after the end of
+        the previous one.
+    """
+    groups, ends_at = [], None
+    for request in sorted(requests, key=lambda request: (request.startsAt, request.pk)):
+        if groups and request.startsAt < ends_at:
+            groups[-1].append(request)
+            ends_at = max(ends_at, request.endsAt)
+        else:
+            groups.append([request])
+            ends_at = request.endsAt
+    return groups
+
+
+def _busy_tree(requests):
+    """
+    Loads the reservations and holds overlapping a window of requests, with
+    one query each.
+
+    Returns:
+        IntervalTree: Busy UTC ranges valued with the companion ID.
+    """
+    first_date = min(request.date for request in requests)
+    last_date = max(request.date for request in requests)
+    starts_at = min(request.startsAt for request in requests)
+    ends_at = max(request.endsAt for request in requests)
+    tree = IntervalTree(
+        Reservation.objects.filter(
+            state="confirmed",
+            startsAt__lt=ends_at,
+            endsAt__gt=starts_at,
+            startsAt__gt=starts_at - MAX_RESERVATION_LENGTH,
+        ).values_list("startsAt", "endsAt", "idCompanion")
+    )
+    for hold in hold_store.between(first_date, last_date, starts_at, ends_at):
+        tree.add(hold.starts_at, hold.ends_at, hold.companion_id)
+    return tree
+
+
+def cost_matrix(requests, index):
+    """
+    Builds the cost matrix of a window of requests.
+
+    Args:
+        requests (list): CareRequest objects of a window, with their
+            customer's user selected.
+        index (CompanionIndex): The bookable companions.
+
+    Returns:
+        ndarray: (requests, companions of the index) costs, INFEASIBLE
+        where the companion cannot take the request.
+    """
+    busy = _busy_tree(requests)
+    policy = pricing_policy()
+    max_km = settings.ASSIGNMENT_MAX_DISTANCE_KM
+    cost = np.empty((len(requests), len(index.ids)))
+    for row, request in enumerate(requests):
+        try:
+            free = availability_engine.free_companions(
+                request.date, request.startTime, request.endTime
+            )
+        except ValueError:
+            # Visits past midnight do not fit in the bitmaps of one day.
+            free = NO_ROWS
+        feasible = np.isin(index.ids, free)
+        busy_ids = [
+            companion_id
+            for _, _, companion_id in busy.overlapping(request.startsAt, request.endsAt)
+        ]
+        feasible &= ~np.isin(index.ids, busy_ids)
+
+        user = request.idCustomer.idUser
+        latitude = request.latitude if request.latitude is not None else user.latitude
+        longitude = request.longitude if request.longitude is not None else user.longitude
+        if latitude is None or longitude is None:
+            distances = np.full(len(index.ids), float(max_km))
+        else:
+            distances = haversine_km(latitude, longitude, index.latitudes, index.longitudes)
+            feasible &= ~(distances > max_km)
+            distances = np.where(np.isnan(distances), max_km, distances)
+
+        skills = {normalize(skill) for skill in request.get_skills()}
+        missing = np.full(len(index.ids), len(skills))
+        for skill in skills:
+            missing[index.skills.get(skill, NO_ROWS)] -= 1
+
+        card = rate_card(policy, request.date, request.startTime, request.endTime)
+        cost[row] = np.where(
+            feasible,
+            index.rates * (card.weight / PRICE_DIVISOR / 100)
+            + settings.ASSIGNMENT_COST_PER_KM * distances
+            + settings.ASSIGNMENT_MISSING_SKILL_COST * missing,
+            INFEASIBLE,
+        )
+    return cost
+
+
+def assign(requests):
+    """
+    Finds the assignment of least total cost of care requests to companions.
+
+    Args:
+        requests (iterable): Pending CareRequest objects, with their
+            customer's user selected.
+
+    Returns:
+        tuple: (assignments, unassigned): Assignment tuples, and the
+        requests no companion can take.
+    """
+    index = companion_index.get()
+    assignments, unassigned = [], []
+    for group in windows(requests):
+        cost = cost_matrix(group, index)
+
+        # Solve over the requests and companions having a feasible pair only.
+        feasible = cost < INFEASIBLE
+        rows = np.flatnonzero(feasible.any(axis=1))
+        columns = np.flatnonzero(feasible.any(axis=0))
+        assigned = set()
+        if len(rows):
+            cost = cost[np.ix_(rows, columns)]
+            for row, column in zip(*solve(cost)):
+                if cost[row, column] < INFEASIBLE:
+                    request = group[rows[row]]
+                    assigned.add(request.pk)
+                    assignments.append(
+                        Assignment(
+                            request,
+                            int(index.ids[columns[column]]),
+                            float(cost[row, column]),
+                        )
+                    )
+        unassigned += [request for request in group if request.pk not in assigned]
+    return assignments, unassigned
@@ -0,0 +1,316 @@
+"""
+Busy time of the companions: reservations and holds.
+
+A companion is busy during its confirmed reservations and during the
+holds of customers checking out one of its time ranges. A search excludes
+the companions busy in its window with one range query over
+reservation_window_idx plus one read of the holds of the date, however
+many companions it ranks.
+
+Holds last RESERVATION_HOLD_TTL seconds. They are placed and checked
+under the same companion lock as the reservations (see
+ReservationRepository). They live in the shared cache, in one entry per
+local date holding every hold of the date, updated under a short lock
+taken with `cache.add`. When the cache is local to the process (another
+process would not see the holds), fails, or its lock cannot be taken,
+the hold is stored as a ReservationHold row instead; reads always include
+those rows. Expired holds are ignored by reads, and their rows are
+deleted in batches by a background sweeper (or the sweep_holds command).
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connections
+from django.utils import timezone
+
+from companion.time_ranges import overlapping, to_utc_range
+
+from .models import Reservation, ReservationHold
+
+logger = logging.getLogger(__name__)
+
+# Reservations are booked within a day (a window ending before it starts ends
+# the next day), which bounds the index range an overlap query reads.
+MAX_RESERVATION_LENGTH = timedelta(hours=24)
+
+HOLDS_KEY_PREFIX = "reserve.holds:"
+# A crashed process releases the lock of a date's holds after this many seconds.
+HOLDS_LOCK_TIMEOUT = 5
+# Wait for the lock at most this many seconds, then store the hold in the database.
+HOLDS_LOCK_WAIT = 1
+
+Hold = namedtuple(
+    "Hold", ["token", "companion_id", "customer_id", "starts_at", "ends_at", "expires_at"]
+)
+
+# A slot of a batch booking, and whether it was booked (reservation) or why not (error).
+RequestedSlot = namedtuple("RequestedSlot", ["companion_id", "date", "start_time", "end_time"])
+SlotResult = namedtuple("SlotResult", ["slot", "reservation", "error"])
+
+
+def busy_reservations(date, start_time, end_time):
+    """Confirmed reservations overlapping a local time window."""
+    start, _ = to_utc_range(date, start_time, end_time)
+    return Reservation.objects.filter(
+        overlapping(date, start_time, end_time),
+        startsAt__gt=start - MAX_RESERVATION_LENGTH,
+        state="confirmed",
+    )
+
+
+class HoldStore:
+    """Holds of companion time ranges, in the shared cache or the database."""
+
+    def __init__(self, cache_alias="default"):
+        self.cache_alias = cache_alias
+        self._sweeper = None
+        self._sweeper_lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def uses_cache(self):
+        store = settings.RESERVATION_HOLD_STORE
+        if store == "auto":
+            return not isinstance(self.cache, (LocMemCache, DummyCache))
+        return store == "cache"
+
+    @staticmethod
+    def _key(date):
+        return HOLDS_KEY_PREFIX + date.isoformat()
+
+    def _update_cached(self, date, update):
+        """
+        Applies `update` to the holds of a date in the cache, under its lock.
+
+        Returns:
+            bool: False when the cache could not be used.
+        """
+        key = self._key(date)
+        lock_key = key + ":lock"
+        try:
+            deadline = time.monotonic() + HOLDS_LOCK_WAIT
+            while not self.cache.add(lock_key, 1, HOLDS_LOCK_TIMEOUT):
+                if time.monotonic() > deadline:
+                    logger.warning("Timed out waiting for the lock of %s", key)
+                    return False
+                time.sleep(0.001)
+            try:
+                now = timezone.now()
+                holds = {
+                    token: hold
+                    for token, hold in (self.cache.get(key) or {}).items()
+                    if hold.expires_at > now
+                }
+                update(holds)
+                if holds:
+                    # The entry disappears with its last hold.
+                    timeout = max(hold.expires_at for hold in holds.values()) - now
+                    self.cache.set(key, holds, timeout.total_seconds() + 1)
+                else:
+                    self.cache.delete(key)
+            finally:
+                self.cache.delete(lock_key)
+            return True
+        except Exception:
+            logger.exception("Could not update the holds of %s in the cache", date)
+            return False
+
+    def add(self, customer_id, companion_id, date, start_time, end_time):
+        """
+        Holds a companion's time range for RESERVATION_HOLD_TTL seconds.
+
+        The caller must hold the companion's booking lock and have checked
+        that the range is free.
+
+        Returns:
+            Hold: The new hold.
+        """
+        starts_at, ends_at = to_utc_range(date, start_time, end_time)
+        hold = Hold(
+            # The date finds the cache entry of the hold when it is released.
+            f"{date:%Y%m%d}-{uuid.uuid4().hex}",
+            companion_id,
+            customer_id,
+            starts_at,
+            ends_at,
+            timezone.now() + timedelta(seconds=settings.RESERVATION_HOLD_TTL),
+        )
+
+        def add(holds):
+            holds[hold.token] = hold
+
+        if not (self.uses_cache() and self._update_cached(date, add)):
+            ReservationHold.objects.create(
+                token=hold.token,
+                idCustomer_id=customer_id,
+                idCompanion_id=companion_id,
+                date=date,
+                startTime=start_time,
+                endTime=end_time,
+                expiresAt=hold.expires_at,
+            )
+            self._ensure_sweeper()
+        return hold
+
+    def release(self, token, customer_id=None):
+        """
+        Releases a hold before it expires.
+
+        Args:
+            token (str): Token of the hold.
+            customer_id (int): Only release the hold if it belongs to this customer.
+
+        Returns:
+            bool: Whether a hold was released.
+        """
+        try:
+            date = datetime.strptime(token[:8], "%Y%m%d").date()
+        except ValueError:
+            return False
+        released = []
+
+        def release(holds):
+            hold = holds.get(token)
+            if hold is not None and customer_id in (None, hold.customer_id):
+                released.append(holds.pop(token))
+
+        if self.uses_cache():
+            self._update_cached(date, release)
+        rows = ReservationHold.objects.filter(token=token)
+        if customer_id is not None:
+            rows = rows.filter(idCustomer_id=customer_id)
+        return bool(released) or rows.delete()[0] > 0
+
+    def overlapping(self, date, starts_at, ends_at, companion_id=None):
+        """
+        Finds the active holds overlapping a UTC range of a local date.
+
+        Returns:
+            list: Holds, from the cache and the database.
+        """
+        return self.between(
+            date, date, starts_at, ends_at, None if companion_id is None else [companion_id]
+        )
+
+    def between(self, first_date, last_date, starts_at, ends_at, companion_ids=None):
+        """
+        Finds the active holds overlapping a UTC range spanning local dates.
+
+        Args:
+            first_date (date), last_date (date): Local dates of the range.
+            starts_at (datetime), ends_at (datetime): The UTC range.
+            companion_ids (list): Only holds of these companions, all by default.
+
+        Returns:
+            list: Holds, from the cache and the database.
+        """
+        now = timezone.now()
+        holds = []
+        if self.uses_cache():
+            # A range of the previous date may run past midnight.
+            day, keys = first_date - timedelta(days=1), []
+            while day <= last_date:
+                keys.append(self._key(day))
+                day += timedelta(days=1)
+            try:
+                entries = self.cache.get_many(keys).values()
+            except Exception:
+                logger.exception("Could not read the holds of %s from the cache", first_date)
+                entries = []
+            holds = [
+                hold
+                for entry in entries
+                for hold in entry.values()
+                if hold.starts_at < ends_at
+                and hold.ends_at > starts_at
+                and hold.expires_at > now
+                and (companion_ids is None or hold.companion_id in companion_ids)
+            ]
+
+        rows = ReservationHold.objects.filter(
+            startsAt__lt=ends_at,
+            endsAt__gt=starts_at,
+            startsAt__gt=starts_at - MAX_RESERVATION_LENGTH,
+            expiresAt__gt=now,
+        )
+        if companion_ids is not None:
+            rows = rows.filter(idCompanion__in=companion_ids)
+        holds += [
+            Hold(*row)
+            for row in rows.values_list(
+                "token", "idCompanion", "idCustomer", "startsAt", "endsAt", "expiresAt"
+            )
+        ]
+        return holds
+
+    def sweep(self, batch_size=None):
+        """
+        Deletes expired hold rows in batches of RESERVATION_HOLD_SWEEP_BATCH,
+        so the sweep never holds long locks on the table.
+
+        Returns:
+            int: Number of holds deleted.
+        """
+        batch_size = batch_size or settings.RESERVATION_HOLD_SWEEP_BATCH
+        deleted = 0
+        while True:
+            ids = list(
+                ReservationHold.objects.filter(expiresAt__lte=timezone.now()).values_list(
+                    "idReservationHold", flat=True
+                )[:batch_size]
+            )
+            if not ids:
+                return deleted
+            ReservationHold.objects.filter(idReservationHold__in=ids).delete()
+            deleted += len(ids)
+
+    def _ensure_sweeper(self):
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        with self._sweeper_lock:
+            if self._sweeper is not None and self._sweeper.is_alive():
+                return
+            self._sweeper = threading.Thread(
+                target=self._sweep_forever, name="reservation-hold-sweeper", daemon=True
+            )
+            self._sweeper.start()
+
+    def _sweep_forever(self):
+        while True:
+            time.sleep(settings.RESERVATION_HOLD_SWEEP_INTERVAL)
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("Could not sweep the expired reservation holds")
+            finally:
+                connections.close_all()
+
+
+hold_store = HoldStore()
+
+
+def busy_companions(date, start_time, end_time):
+    """
+    Finds the companions busy during a local time window.
+
+    Returns:
+        ndarray: IDs of the companions with a confirmed reservation or an
+        active hold overlapping the window.
+    """
+    starts_at, ends_at = to_utc_range(date, start_time, end_time)
+    ids = set(
+        busy_reservations(date, start_time, end_time).values_list("idCompanion", flat=True)
+    )
+    ids.update(hold.companion_id for hold in hold_store.overlapping(date, starts_at, ends_at))
+    return np.fromiter(ids, dtype=np.int64, count=len(ids))
@@ -0,0 +1,107 @@
+from django import forms
+from django.utils import timezone
+from authentication.care_taxonomy import to_mask
+
+
+class CompanionSearchForm(forms.Form):
+    """
+    Query parameters of the companion search.
+
+    Attributes:
+        clean_skills(), clean_languages(): Split the comma separated lists.
+        clean_careNeeds(): Converts the comma separated care codes to a bit mask.
+        clean(): Custom validation of the availability window and the rate range.
+    """
+
+    date = forms.DateField(required=False)
+    startTime = forms.TimeField(required=False)
+    endTime = forms.TimeField(required=False)
+    skills = forms.CharField(required=False)
+    # Free text matched against skill descriptions, prefix and typo tolerant.
+    q = forms.CharField(required=False, max_length=100)
+    languages = forms.CharField(required=False)
+    minRate = forms.DecimalField(required=False, min_value=0)
+    maxRate = forms.DecimalField(required=False, min_value=0)
+    genre = forms.ChoiceField(
+        required=False,
+        choices=[("", "Any"), ("male", "Male"), ("female", "Female"), ("other", "Other")],
+    )
+    location = forms.CharField(required=False, max_length=100)
+    # Care codes of authentication.care_taxonomy the companion must all cover.
+    careNeeds = forms.CharField(required=False)
+    cursor = forms.CharField(required=False)
+    limit = forms.IntegerField(required=False, min_value=1, max_value=100)
+
+    def _split(self, name):
+        value = self.cleaned_data.get(name) or ""
+        return [item.strip() for item in value.split(",") if item.strip()]
+
+    def clean_skills(self):
+        return self._split("skills")
+
+    def clean_languages(self):
+        return self._split("languages")
+
+    def clean_careNeeds(self):
+        try:
+            return to_mask(self._split("careNeeds"))
+        except ValueError as e:
+            raise forms.ValidationError(str(e))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        window = [cleaned_data.get(f) for f in ("date", "startTime", "endTime")]
+        if any(window) and not all(window):
+            raise forms.ValidationError(
+                "The availability window needs a date, a start time and an end time."
+            )
+        if all(window) and window[1] >= window[2]:
+            raise forms.ValidationError("The start time must be before the end time.")
+        min_rate, max_rate = cleaned_data.get("minRate"), cleaned_data.get("maxRate")
+        if min_rate is not None and max_rate is not None and min_rate > max_rate:
+            raise forms.ValidationError("The minimum rate must not exceed the maximum rate.")
+        return cleaned_data
+
+
+class CompanionNearbyForm(forms.Form):
+    """
+    Query parameters of the nearby companion search. Without a location the
+    search is around the logged in user.
+    """
+
+    location = forms.CharField(required=False, max_length=100)
+    radiusKm = forms.FloatField(required=False, min_value=0.1, max_value=500)
+    limit = forms.IntegerField(required=False, min_value=1, max_value=100)
+
+
+class ReservationForm(forms.Form):
+    """
+    A companion's time range to book.
+
+    Attributes:
+        clean_date(): Custom validation to ensure date is not in the past.
+        clean(): Custom validation to ensure start time is before end time.
+    """
+
+    idCompanion = forms.IntegerField(min_value=1)
+    date = forms.DateField()
+    startTime = forms.TimeField()
+    endTime = forms.TimeField()
+
+    def clean_date(self):
+        date = self.cleaned_data.get("date")
+
+        if date and date < timezone.now().date():
+            raise forms.ValidationError("Date cannot be in the past.")
+
+        return date
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_time = cleaned_data.get("startTime")
+        end_time = cleaned_data.get("endTime")
+
+        if start_time and end_time and start_time >= end_time:
+            raise forms.ValidationError("The start time must be before the end time.")
+
+        return cleaned_data
@@ -0,0 +1,141 @@
+"""
+In-memory interval tree of half-open [start, end) ranges.
+
+An AVL tree ordered by start, where each node also keeps the largest end
+in its subtree. A subtree ending before a query is skipped whole, so the
+ranges overlapping a query are found in O(log n + k), and ranges can be
+added while querying (a batch checks each slot against the slots it
+already accepted).
+"""
+
+
+class _Node:
+    __slots__ = ("start", "end", "value", "max_end", "height", "left", "right")
+
+    def __init__(self, start, end, value):
+        self.start = start
+        self.end = end
+        self.value = value
+        self.max_end = end
+        self.height = 1
+        self.left = None
+        self.right = None
+
+
+def _height(node):
+    return node.height if node is not None else 0
+
+
+def _update(node):
+    node.height = 1 + max(_height(node.left), _height(node.right))
+    node.max_end = node.end
+    for child in (node.left, node.right):
+        if child is not None and child.max_end > node.max_end:
+            node.max_end = child.max_end
+
+
+def _rotate_right(node):
+    pivot = node.left
+    node.left, pivot.right = pivot.right, node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+
+def _rotate_left(node):
+    pivot = node.right
+    node.right, pivot.left = pivot.left, node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+
+def _balance(node):
+    _update(node)
+    skew = _height(node.left) - _height(node.right)
+    if skew > 1:
+        if _height(node.left.left) < _height(node.left.right):
+            node.left = _rotate_left(node.left)
+        return _rotate_right(node)
+    if skew < -1:
+        if _height(node.right.right) < _height(node.right.left):
+            node.right = _rotate_right(node.right)
+        return _rotate_left(node)
+    return node
+
+
+def _insert(node, new):
+    if node is None:
+        return new
+    if new.start < node.start:
+        node.left = _insert(node.left, new)
+    else:
+        node.right = _insert(node.right, new)
+    return _balance(node)
+
+
+class IntervalTree:
+    """
+    Half-open ranges with a value each, such as UTC datetime ranges.
+
+    Args:
+        intervals (iterable): (start, end, value) tuples to add.
+    """
+
+    def __init__(self, intervals=()):
+        self._root = None
+        self._size = 0
+        for start, end, value in intervals:
+            self.add(start, end, value)
+
+    def __len__(self):
+        return self._size
+
+    def add(self, start, end, value=None):
+        """
+        Adds the range [start, end).
+
+        Raises:
+            ValueError: If the range does not end after it starts.
+        """
+        if not start < end:
+            raise ValueError("An interval must end after it starts.")
+        self._root = _insert(self._root, _Node(start, end, value))
+        self._size += 1
+
+    def overlapping(self, start, end):
+        """
+        Finds the ranges overlapping [start, end); touching ones do not.
+
+        Returns:
+            list: (start, end, value) tuples ordered by start.
+        """
+        found = []
+        stack = []
+        node = self._root
+        while stack or node is not None:
+            # Nothing under a node ending at or before the query start overlaps it.
+            while node is not None and node.max_end > start:
+                stack.append(node)
+                node = node.left
+            if not stack:
+                break
+            node = stack.pop()
+            if node.start >= end:
+                # Every later range starts after the query too.
+                break
+            if node.end > start:
+                found.append((node.start, node.end, node.value))
+            node = node.right
+        return found
+
+    def covers(self, start, end):
+        """Checks whether the ranges together cover all of [start, end)."""
+        reached = start
+        for first, last, _ in self.overlapping(start, end):
+            if first > reached:
+                return False
+            reached = max(reached, last)
+            if reached >= end:
+                return True
+        return reached >= end
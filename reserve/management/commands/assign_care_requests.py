@@ -0,0 +1,51 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from reserve.services_factory import ServiceFactory
+
+
+class Command(BaseCommand):
+    help = (
+        "Assigns companions to the pending care requests, at the least total "
+        "cost of rates, distances and missing skills, and books them. "
+        "Use --dry-run to only print the assignments."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            action="append",
+            type=date.fromisoformat,
+            dest="dates",
+            help="Only assign the requests of this date (YYYY-MM-DD); can be repeated.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Print the assignments without booking them.",
+        )
+
+    def handle(self, *args, **options):
+        service = ServiceFactory().get_service("CARE_ASSIGNMENT")
+        start = time.perf_counter()
+        assignments, unassigned = service.assign_pending(
+            dates=options["dates"], dry_run=options["dry_run"]
+        )
+        elapsed = time.perf_counter() - start
+
+        if options["dry_run"] or options["verbosity"] > 1:
+            for assignment in assignments:
+                request = assignment.request
+                self.stdout.write(
+                    f"Request {request.pk} ({request.date} {request.startTime}-"
+                    f"{request.endTime}) -> companion {assignment.companion_id}, "
+                    f"cost {assignment.cost:.2f}"
+                )
+        self.stdout.write(
+            f"{len(assignments)} requests {'would be ' if options['dry_run'] else ''}assigned "
+            f"in {elapsed:.1f} s, total cost "
+            f"{sum(assignment.cost for assignment in assignments):.2f}; "
+            f"{len(unassigned)} left pending."
+        )
@@ -0,0 +1,177 @@
+import random
+import time
+from datetime import time as dtime, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from authentication.geo import cell_of, gazetteer
+from authentication.models import User
+from companion.models import Companion, Skill, TimeAvailability
+from companion.time_ranges import to_utc_range
+from customer.models import Customer
+from reserve.assignment import INFEASIBLE, assign, cost_matrix, solver_name, windows
+from reserve.matching import companion_index
+from reserve.models import CareRequest
+
+BATCH_SIZE = 5000
+EMAIL_PREFIX = "bench-assignment-"
+SKILLS = ["nursing", "cooking", "driving", "dementia care", "physiotherapy", "reading"]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the assignment of care requests to companions over "
+        "generated companions, availabilities and requests, without booking "
+        "them. The dataset is created inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=3000)
+        parser.add_argument("--companions", type=int, default=2000)
+        parser.add_argument("--days", type=int, default=7, help="Dates the requests span.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        try:
+            with transaction.atomic():
+                self.run(rng, **options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _users(self, kind, count, places, rng):
+        emails = [f"{EMAIL_PREFIX}{kind}-{n}@example.invalid" for n in range(count)]
+        users = []
+        for email in emails:
+            latitude, longitude = rng.choice(places)
+            latitude += rng.gauss(0, 0.1)
+            longitude += rng.gauss(0, 0.1)
+            users.append(
+                User(
+                    names="Bench",
+                    lastNames=kind,
+                    email=email,
+                    password="!",
+                    latitude=latitude,
+                    longitude=longitude,
+                    geoCell=cell_of(latitude, longitude),
+                )
+            )
+        User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+        return list(User.objects.filter(email__in=emails).values_list("idUser", flat=True))
+
+    def populate(self, rng, requests, companions, days):
+        # A few cities, so that most requests have companions within reach.
+        places = list(dict.fromkeys(gazetteer().values()))[:8]
+        dates = [timezone.localdate() + timedelta(days=n + 1) for n in range(days)]
+
+        Companion.objects.bulk_create(
+            Companion(
+                idUser_id=user_id,
+                stateAvailability="available",
+                hourlyRate=Decimal(rng.randrange(1000, 6000)) / 100,
+            )
+            for user_id in self._users("companion", companions, places, rng)
+        )
+        companion_ids = list(
+            Companion.objects.filter(idUser__email__startswith=EMAIL_PREFIX).values_list(
+                "idCompanion", flat=True
+            )
+        )
+        TimeAvailability.objects.bulk_create(
+            (
+                TimeAvailability(
+                    idCompanion_id=companion_id,
+                    date=day,
+                    startTime=dtime(rng.randrange(6, 10)),
+                    endTime=dtime(rng.randrange(14, 21)),
+                )
+                for companion_id in companion_ids
+                for day in dates
+                if rng.random() < 0.8
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        Skill.objects.bulk_create(
+            (
+                Skill(idCompanion_id=companion_id, description=skill)
+                for companion_id in companion_ids
+                for skill in rng.sample(SKILLS, rng.randrange(1, 4))
+            ),
+            batch_size=BATCH_SIZE,
+        )
+
+        Customer.objects.bulk_create(
+            Customer(idUser_id=user_id, accountState="active")
+            for user_id in self._users("customer", max(requests // 3, 1), places, rng)
+        )
+        customers = list(Customer.objects.filter(idUser__email__startswith=EMAIL_PREFIX))
+        rows = []
+        for _ in range(requests):
+            day, start = rng.choice(dates), rng.randrange(8, 16)
+            end = start + rng.randrange(1, 4)
+            starts_at, ends_at = to_utc_range(day, dtime(start), dtime(end))
+            rows.append(
+                CareRequest(
+                    idCustomer=rng.choice(customers),
+                    date=day,
+                    startTime=dtime(start),
+                    endTime=dtime(end),
+                    # bulk_create does not call save(), which sets them.
+                    startsAt=starts_at,
+                    endsAt=ends_at,
+                    skills=", ".join(rng.sample(SKILLS, rng.randrange(0, 3))),
+                )
+            )
+        CareRequest.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+
+    def greedy_cost(self, requests, index):
+        """Reference: each request takes the cheapest companion left, in order."""
+        total, assigned = 0.0, 0
+        for group in windows(requests):
+            cost = cost_matrix(group, index)
+            taken = np.zeros(cost.shape[1], dtype=bool)
+            for row in cost:
+                row = np.where(taken, INFEASIBLE, row)
+                column = int(np.argmin(row))
+                if row[column] < INFEASIBLE:
+                    taken[column] = True
+                    total += row[column]
+                    assigned += 1
+        return total, assigned
+
+    def run(self, rng, requests, companions, days, **options):
+        start = time.perf_counter()
+        self.populate(rng, requests, companions, days)
+        self.stdout.write(
+            f"Generated {companions} companions and {requests} requests over {days} days "
+            f"in {time.perf_counter() - start:.1f} s."
+        )
+        care_requests = list(
+            CareRequest.objects.filter(idCustomer__idUser__email__startswith=EMAIL_PREFIX)
+            .select_related("idCustomer__idUser")
+            .order_by("date", "pk")
+        )
+        start = time.perf_counter()
+        index = companion_index.get()
+        self.stdout.write(f"Built the companion index in {time.perf_counter() - start:.1f} s.")
+
+        start = time.perf_counter()
+        assignments, unassigned = assign(care_requests)
+        elapsed = time.perf_counter() - start
+        total = sum(assignment.cost for assignment in assignments)
+        greedy, greedy_assigned = self.greedy_cost(care_requests, index)
+        self.stdout.write(
+            f"Assigned {len(assignments)} requests ({len(unassigned)} left pending) in "
+            f"{elapsed:.2f} s with the {solver_name()} solver: total cost {total:.2f}, "
+            f"greedy {greedy:.2f} for {greedy_assigned} requests."
+        )
@@ -0,0 +1,221 @@
+import random
+import time
+from datetime import date, time as dtime, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from authentication.models import Language, LanguageUser, User
+from companion.models import Companion, RecurringAvailability, Skill, TimeAvailability
+from companion.time_ranges import to_utc_range
+from reserve.matching import companion_index
+from reserve.repositories import CompanionSearchRepository
+from reserve.services import CompanionSearchService
+
+BATCH_SIZE = 5000
+EMAIL_PREFIX = "bench-search-"
+
+LOCATIONS = [
+    "Bogotá", "Medellín", "Cali", "Barranquilla", "Cartagena", "Cúcuta",
+    "Bucaramanga", "Pereira", "Santa Marta", "Ibagué", "Manizales", "Pasto",
+    "Neiva", "Villavicencio", "Armenia", "Montería", "Popayán", "Sincelejo",
+    "Valledupar", "Tunja",
+]
+GENRES = ["male", "female", "other"]
+SKILLS = [
+    "cooking", "driving", "first aid", "nursing", "physiotherapy", "reading",
+    "cleaning", "shopping", "medication", "dementia care", "mobility",
+    "companionship", "gardening", "music", "chess", "walking", "bathing",
+    "feeding", "night care", "diabetes care",
+]
+LANGUAGES = ["Spanish", "English", "French", "Portuguese", "German", "Italian"]
+
+
+class Rollback(Exception):
+    pass
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the companion search over a generated dataset and checks "
+        "the p95 latency against a target. The dataset is created inside a "
+        "transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--companions", type=int, default=100_000)
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument(
+            "--pages",
+            type=int,
+            default=3,
+            help="Pages followed with the cursor for every query (default: 3).",
+        )
+        parser.add_argument(
+            "--p95-ms",
+            type=float,
+            default=150,
+            help="p95 latency target per page, in ms (default: 150).",
+        )
+        parser.add_argument(
+            "--sql",
+            action="store_true",
+            help="Rank in SQL instead of on the in-memory companion index.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        try:
+            with transaction.atomic():
+                self.run(rng, **options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def populate(self, count, rng, day):
+        languages = {}
+        for name in LANGUAGES:
+            languages[name] = Language.objects.get_or_create(name=name)[0].idLanguage
+
+        for first in range(0, count, BATCH_SIZE):
+            emails = [f"{EMAIL_PREFIX}{n}@example.invalid" for n in range(first, min(first + BATCH_SIZE, count))]
+            User.objects.bulk_create(
+                User(
+                    names="Bench",
+                    lastNames=email,
+                    email=email,
+                    password="!",
+                    genre=rng.choice(GENRES),
+                    location=rng.choice(LOCATIONS),
+                )
+                for email in emails
+            )
+            user_ids = list(
+                User.objects.filter(email__in=emails).values_list("idUser", flat=True)
+            )
+            Companion.objects.bulk_create(
+                Companion(
+                    idUser_id=user_id,
+                    stateAvailability=rng.choices(
+                        ["available", "not available"], [9, 1]
+                    )[0],
+                    hourlyRate=Decimal(rng.randrange(1000, 6000)) / 100,
+                )
+                for user_id in user_ids
+            )
+            companions = list(
+                Companion.objects.filter(idUser_id__in=user_ids).values_list(
+                    "idCompanion", "idUser_id"
+                )
+            )
+
+            skills, spoken, one_offs, rules = [], [], [], []
+            for companion_id, user_id in companions:
+                skills += [
+                    Skill(idCompanion_id=companion_id, description=skill)
+                    for skill in rng.sample(SKILLS, rng.randint(1, 4))
+                ]
+                spoken += [
+                    LanguageUser(idUser_id=user_id, idLanguage_id=languages[name])
+                    for name in rng.sample(LANGUAGES, rng.randint(1, 3))
+                ]
+                kind = rng.random()
+                start = dtime(rng.randint(6, 14))
+                end = dtime(start.hour + rng.randint(2, 8))
+                if kind < 0.5:
+                    startsAt, endsAt = to_utc_range(day, start, end)
+                    one_offs.append(
+                        TimeAvailability(
+                            idCompanion_id=companion_id,
+                            date=day,
+                            startTime=start,
+                            endTime=end,
+                            startsAt=startsAt,
+                            endsAt=endsAt,
+                        )
+                    )
+                elif kind < 0.8:
+                    rules.append(
+                        RecurringAvailability(
+                            idCompanion_id=companion_id,
+                            weekdays=rng.randint(1, 127),
+                            startTime=start,
+                            endTime=end,
+                            validFrom=day - timedelta(days=30),
+                        )
+                    )
+            Skill.objects.bulk_create(skills)
+            LanguageUser.objects.bulk_create(spoken)
+            TimeAvailability.objects.bulk_create(one_offs)
+            RecurringAvailability.objects.bulk_create(rules)
+
+    def random_criteria(self, rng, day):
+        criteria = {"skills": [], "languages": []}
+        if rng.random() < 0.7:
+            start = rng.randint(8, 16)
+            criteria.update(
+                date=day, startTime=dtime(start), endTime=dtime(start + rng.randint(1, 3))
+            )
+        if rng.random() < 0.6:
+            criteria["skills"] = rng.sample(SKILLS, rng.randint(1, 3))
+        if rng.random() < 0.5:
+            criteria["languages"] = rng.sample(LANGUAGES, rng.randint(1, 2))
+        if rng.random() < 0.5:
+            low = rng.randint(10, 40)
+            criteria.update(minRate=Decimal(low), maxRate=Decimal(low + rng.randint(5, 20)))
+        if rng.random() < 0.4:
+            criteria["location"] = rng.choice(LOCATIONS)
+        if rng.random() < 0.3:
+            criteria["genre"] = rng.choice(GENRES)
+        return criteria
+
+    def run(self, rng, companions, queries, pages, p95_ms, sql, **options):
+        day = date(2000, 1, 3)
+        started = time.perf_counter()
+        self.populate(companions, rng, day)
+        self.stdout.write(
+            f"Generated {companions} companions in {time.perf_counter() - started:.1f} s."
+        )
+
+        if sql:
+            service = CompanionSearchService(CompanionSearchRepository())
+        else:
+            service = CompanionSearchService(CompanionSearchRepository(), companion_index)
+            started = time.perf_counter()
+            companion_index.get()
+            self.stdout.write(
+                f"Built the companion index in {time.perf_counter() - started:.1f} s."
+            )
+        timings = {page: [] for page in range(1, pages + 1)}
+        for _ in range(queries):
+            criteria = self.random_criteria(rng, day)
+            cursor = None
+            for page in range(1, pages + 1):
+                start = time.perf_counter()
+                result = service.search(criteria, cursor)
+                timings[page].append((time.perf_counter() - start) * 1000)
+                cursor = result["next"]
+                if cursor is None:
+                    break
+
+        all_timings = [t for page_timings in timings.values() for t in page_timings]
+        self.stdout.write(f"{'page':>6} {'queries':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+        for label, values in list(timings.items()) + [("all", all_timings)]:
+            if values:
+                self.stdout.write(
+                    f"{label:>6} {len(values):>8} {_percentile(values, 0.5):>8.1f} "
+                    f"{_percentile(values, 0.95):>8.1f} {max(values):>8.1f}"
+                )
+
+        p95 = _percentile(all_timings, 0.95)
+        if p95 <= p95_ms:
+            self.stdout.write(self.style.SUCCESS(f"p95 {p95:.1f} ms <= target {p95_ms:g} ms"))
+        else:
+            self.stdout.write(self.style.ERROR(f"p95 {p95:.1f} ms > target {p95_ms:g} ms"))
@@ -0,0 +1,136 @@
+import random
+import time
+from decimal import Decimal
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from authentication.geo import cell_of, cell_ranges, gazetteer, haversine_km, within
+from authentication.models import User
+from companion.models import Companion
+
+BATCH_SIZE = 5000
+EMAIL_PREFIX = "bench-nearby-"
+RADII_KM = [2, 5, 10, 25, 50, 100]
+
+
+class Rollback(Exception):
+    pass
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the nearest companion query over generated geocoded "
+        "users, against an exact scan of every companion, and checks that "
+        "both return the same companions. The dataset is created inside a "
+        "transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100_000)
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument(
+            "--spread",
+            type=float,
+            default=0.15,
+            help="Standard deviation, in degrees, of the users around each place (default: 0.15).",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        try:
+            with transaction.atomic():
+                self.run(rng, **options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def populate(self, count, rng, spread):
+        # Big cities get more users: weight the places by their rank.
+        places = list(dict.fromkeys(gazetteer().values()))
+        weights = [1 / (rank + 1) for rank in range(len(places))]
+        for first in range(0, count, BATCH_SIZE):
+            emails = [f"{EMAIL_PREFIX}{n}@example.invalid" for n in range(first, min(first + BATCH_SIZE, count))]
+            users = []
+            for email in emails:
+                latitude, longitude = rng.choices(places, weights)[0]
+                latitude += rng.gauss(0, spread)
+                longitude += rng.gauss(0, spread)
+                users.append(
+                    User(
+                        names="Bench",
+                        lastNames=email,
+                        email=email,
+                        password="!",
+                        latitude=latitude,
+                        longitude=longitude,
+                        geoCell=cell_of(latitude, longitude),
+                    )
+                )
+            User.objects.bulk_create(users)
+            user_ids = User.objects.filter(email__in=emails).values_list("idUser", flat=True)
+            Companion.objects.bulk_create(
+                Companion(
+                    idUser_id=user_id,
+                    stateAvailability=rng.choices(["available", "not available"], [9, 1])[0],
+                    hourlyRate=Decimal(rng.randrange(1000, 6000)) / 100,
+                )
+                for user_id in user_ids
+            )
+        return places
+
+    def scan(self, companions, latitude, longitude, radius_km, limit):
+        """Reference: the exact distance of every companion."""
+        rows = list(companions.values_list("pk", "idUser__latitude", "idUser__longitude"))
+        ids, latitudes, longitudes = (np.array(column) for column in zip(*rows))
+        distances = haversine_km(latitude, longitude, latitudes.astype(float), longitudes.astype(float))
+        inside = np.flatnonzero(distances <= radius_km)
+        order = inside[np.lexsort((ids[inside], distances[inside]))][:limit]
+        return [int(ids[row]) for row in order]
+
+    def run(self, rng, users, queries, limit, spread, **options):
+        start = time.perf_counter()
+        places = self.populate(users, rng, spread)
+        self.stdout.write(f"Generated {users} users in {time.perf_counter() - start:.1f} s.")
+
+        companions = Companion.objects.filter(stateAvailability="available", idUser__geoCell__isnull=False)
+        pruned, scanned, candidates, found = [], [], [], []
+        for _ in range(queries):
+            latitude, longitude = rng.choice(places)
+            radius = rng.choice(RADII_KM)
+
+            start = time.perf_counter()
+            result = within(companions, latitude, longitude, radius, limit, prefix="idUser__")
+            pruned.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            expected = self.scan(companions, latitude, longitude, radius, limit)
+            scanned.append(time.perf_counter() - start)
+
+            if [companion_id for companion_id, _ in result] != expected:
+                raise CommandError(f"Different companions within {radius} km of {latitude}, {longitude}.")
+            found.append(len(result))
+            candidates.append(
+                sum(
+                    companions.filter(idUser__geoCell__range=cells).count()
+                    for cells in cell_ranges(latitude, longitude, radius)
+                )
+            )
+
+        for name, timings in (("cell pruned", pruned), ("full scan", scanned)):
+            self.stdout.write(
+                f"{name}: p50 {_percentile(timings, 0.5) * 1000:.1f} ms, "
+                f"p95 {_percentile(timings, 0.95) * 1000:.1f} ms"
+            )
+        self.stdout.write(
+            f"{sum(candidates) / queries:.0f} candidates read per query on average "
+            f"(of {companions.count()}), {sum(found) / queries:.1f} companions returned."
+        )
@@ -0,0 +1,78 @@
+import random
+import time
+from datetime import date, time as dtime, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reserve.pricing import pricing_policy, quote_cents, quote_reference, rate_card, to_decimal
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks vectorized quotes of random slots for random hourly "
+        "rates against the Decimal reference, and checks that every line, "
+        "subtotal, discount and total is the same to the cent."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--companions", type=int, default=500)
+        parser.add_argument("--slots", type=int, default=40)
+        parser.add_argument("--quotes", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def random_slots(self, rng, count):
+        first = date.today()
+        slots = []
+        for _ in range(count):
+            # Any minute, up to ten hours, some of them overnight.
+            start = rng.randrange(24 * 60)
+            end = (start + rng.randrange(15, 10 * 60)) % (24 * 60)
+            slots.append(
+                (
+                    first + timedelta(days=rng.randrange(28)),
+                    dtime(start // 60, start % 60),
+                    dtime(end // 60, end % 60),
+                )
+            )
+        return slots
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        policy = pricing_policy()
+        vectorized, reference = [], []
+        for _ in range(options["quotes"]):
+            # Odd cents and long slots make many lines fall on half cents.
+            rates = [
+                Decimal(rng.randrange(100, 2_000_000)).scaleb(-2)
+                for _ in range(options["companions"])
+            ]
+            slots = self.random_slots(rng, options["slots"])
+
+            rate_card.cache_clear()
+            start = time.perf_counter()
+            lines, subtotals, discounts, totals, _ = quote_cents(
+                [int(rate * 100) for rate in rates], slots, policy
+            )
+            vectorized.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            expected = quote_reference(rates, slots, policy)
+            reference.append(time.perf_counter() - start)
+
+            for row, (rate, reference_quote) in enumerate(zip(rates, expected)):
+                got = (
+                    [to_decimal(line) for line in lines[row]],
+                    to_decimal(subtotals[row]),
+                    to_decimal(discounts[row]),
+                    to_decimal(totals[row]),
+                )
+                if got != reference_quote:
+                    raise CommandError(f"Different quote at {rate}/h for {slots}: {got}.")
+
+        quotes = options["quotes"]
+        self.stdout.write(
+            f"{options['companions']} companions x {options['slots']} slots, {quotes} quotes, "
+            f"identical to the cent: vectorized {sum(vectorized) / quotes * 1000:.2f} ms, "
+            f"Decimal reference {sum(reference) / quotes * 1000:.0f} ms per quote."
+        )
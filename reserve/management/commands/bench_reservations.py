@@ -0,0 +1,164 @@
+import random
+import threading
+import time
+from collections import Counter
+from datetime import date, time as dtime
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from authentication.models import User
+from companion.models import Companion
+from customer.models import Customer
+from reserve.models import Reservation
+from reserve.repositories import ReservationRepository
+from reserve.services import ReservationService
+
+EMAIL_PREFIX = "bench-reservations-"
+# A date no real reservation uses.
+BENCH_DATE = date(2099, 1, 5)
+
+
+class CountingRepository(ReservationRepository):
+    """Counts the attempts, including the retries of lost races."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.attempts = 0
+        self._lock = threading.Lock()
+
+    def create(self, *args, **kwargs):
+        with self._lock:
+            self.attempts += 1
+        return super().create(*args, **kwargs)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks concurrent reservations: threads book overlapping time "
+        "ranges of a few companions, then the reservations are checked for "
+        "double bookings. Reports throughput and conflict rates per locking "
+        "strategy. Threads need their own connections, so the rows are "
+        "committed and deleted at the end: do not run it on a production "
+        "database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--bookings", type=int, default=100, help="Bookings per thread.")
+        parser.add_argument(
+            "--companions",
+            type=int,
+            default=4,
+            help="Companions booked; fewer means more contention (default: 4).",
+        )
+        parser.add_argument(
+            "--locking",
+            choices=("lock", "optimistic", "both"),
+            default="both",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Database: {connection.vendor}")
+        self.cleanup()
+        try:
+            customers, companion_ids = self.populate(options["threads"], options["companions"])
+            strategies = (
+                ["lock", "optimistic"] if options["locking"] == "both" else [options["locking"]]
+            )
+            for locking in strategies:
+                Reservation.objects.filter(idCompanion__in=companion_ids).delete()
+                self.run(locking, customers, companion_ids, options["bookings"], options["seed"])
+        finally:
+            self.cleanup()
+
+    def cleanup(self):
+        User.objects.filter(email__startswith=EMAIL_PREFIX).delete()
+
+    def populate(self, threads, count):
+        customers = []
+        for n in range(threads):
+            user = User.objects.create(
+                names="Bench",
+                lastNames="Customer",
+                email=f"{EMAIL_PREFIX}customer-{n}@example.invalid",
+                password="!",
+            )
+            customers.append(Customer.objects.create(idUser=user, accountState="active"))
+        companions = []
+        for n in range(count):
+            user = User.objects.create(
+                names="Bench",
+                lastNames="Companion",
+                email=f"{EMAIL_PREFIX}companion-{n}@example.invalid",
+                password="!",
+            )
+            companions.append(
+                Companion.objects.create(
+                    idUser=user, stateAvailability="available", hourlyRate=Decimal("20.00")
+                ).idCompanion
+            )
+        return customers, companions
+
+    def run(self, locking, customers, companion_ids, bookings, seed):
+        repository = CountingRepository(locking=locking)
+        # Availability is not what is measured: book without checking it.
+        service = ReservationService(repository)
+        outcomes = Counter()
+        outcomes_lock = threading.Lock()
+
+        def book(customer, rng):
+            try:
+                for _ in range(bookings):
+                    # One to three hours starting on a half hour between 6:00
+                    # and 18:00: most ranges overlap others.
+                    start = rng.randrange(12, 36)
+                    end = start + rng.randrange(2, 7)
+                    try:
+                        service.reserve(
+                            customer,
+                            rng.choice(companion_ids),
+                            BENCH_DATE,
+                            dtime(start // 2, 30 * (start % 2)),
+                            dtime(end // 2, 30 * (end % 2)),
+                        )
+                        outcome = "booked"
+                    except ValueError:
+                        outcome = "conflict"
+                    except RuntimeError:
+                        outcome = "gave up"
+                    with outcomes_lock:
+                        outcomes[outcome] += 1
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=book, args=(customer, random.Random(seed + n)))
+            for n, customer in enumerate(customers)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        self.check_no_double_booking(companion_ids)
+        total = sum(outcomes.values())
+        self.stdout.write(
+            f"{locking}: {total / elapsed:.0f} bookings/s over {len(threads)} threads, "
+            f"{outcomes['booked']} booked, {outcomes['conflict'] / total:.1%} conflicts, "
+            f"{outcomes['gave up']} gave up, "
+            f"{repository.attempts / total:.2f} attempts per booking."
+        )
+
+    def check_no_double_booking(self, companion_ids):
+        last_end = {}
+        for companion_id, starts_at, ends_at in Reservation.objects.filter(
+            idCompanion__in=companion_ids, state="confirmed"
+        ).order_by("idCompanion", "startsAt").values_list("idCompanion", "startsAt", "endsAt"):
+            if companion_id in last_end and starts_at < last_end[companion_id]:
+                raise CommandError(f"Companion {companion_id} is booked twice at {starts_at}.")
+            last_end[companion_id] = ends_at
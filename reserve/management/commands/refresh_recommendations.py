@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from reserve.recommendations import recommendation_engine
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the recommended companions of every customer, IDF weights "
+        "included. Incremental updates keep the weights of the last full "
+        "refresh, run this periodically (e.g. nightly) and after bulk imports."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.RECOMMENDATIONS_BATCH_SIZE,
+            help="Customers scored per matrix operation.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        def progress(done, total):
+            if done == total or done % (options["batch_size"] * 100) == 0:
+                self.stdout.write(f"{done}/{total} customers")
+
+        model = recommendation_engine.refresh_all(options["batch_size"], progress)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Refreshed the recommendations over {len(model.ids)} companions and "
+                f"{len(model.idf)} tokens in {time.perf_counter() - started:.1f} s."
+            )
+        )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from reserve.booking import hold_store
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes the expired reservation holds stored in the database. The "
+        "web processes sweep them in the background; run this from cron "
+        "when they are not running."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Holds deleted per query (default: RESERVATION_HOLD_SWEEP_BATCH).",
+        )
+
+    def handle(self, *args, **options):
+        deleted = hold_store.sweep(options["batch_size"])
+        self.stdout.write(f"{deleted} expired holds deleted.")
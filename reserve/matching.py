@@ -0,0 +1,252 @@
+"""
+In-memory index of bookable companions for the reservation search.
+
+The index holds one numpy column per searchable attribute of every
+available companion with an hourly rate (ID, rate in cents, genre,
+location, care competencies mask, coordinates) plus inverted lists from
+each skill and language to the rows having it. A search is then a
+handful of vectorized comparisons, the availability window comes from the
+slot bitmaps of the availability engine less the companions booked or held
+then, and only the companions of the returned page are read from the
+database.
+
+The index is rebuilt from the database when the version stamp in the
+shared cache changes (see reserve.signals). A rebuild runs in a background
+thread while searches keep using the previous index; only the very first
+build is synchronous.
+"""
+import logging
+import re
+import threading
+import time
+from decimal import Decimal
+
+import numpy as np
+from django.core.cache import caches
+from django.db import connections
+
+from authentication.models import LanguageUser
+from authentication.text_search import skill_index
+from companion.availability import availability_engine
+from companion.models import Companion, Skill
+
+from .booking import busy_companions
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "companion-index:version"
+
+GENRES = {"male": 1, "female": 2, "other": 3}
+
+NO_ROWS = np.empty(0, dtype=np.int64)
+
+
+def normalize(value):
+    """Skills, languages and locations are matched case and space insensitively."""
+    return " ".join((value or "").split()).casefold()
+
+
+def location_regex(value):
+    """
+    Builds a case-insensitive regular expression (for `__iregex`) matching
+    the locations that normalize like the given one, so a database query
+    agrees with the index.
+    """
+    words = [re.escape(word) for word in normalize(value).split(" ")]
+    return "^ *" + " +".join(words) + " *$"
+
+
+class CompanionIndex:
+    """
+    Columns of the bookable companions, sorted by ID.
+
+    Attributes:
+        ids (ndarray): Companion IDs.
+        rates (ndarray): Hourly rates in cents.
+        genres (ndarray): Genre codes, 0 when unknown.
+        locations (ndarray): Location codes, -1 when unknown.
+        competencies (ndarray): Care competencies masks.
+        latitudes (ndarray), longitudes (ndarray): Coordinates, NaN when unknown.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        rows = sorted(
+            Companion.objects.filter(
+                stateAvailability="available", hourlyRate__isnull=False
+            ).values_list(
+                "idCompanion",
+                "hourlyRate",
+                "idUser__genre",
+                "idUser__location",
+                "idUser",
+                "competenciesMask",
+                "idUser__latitude",
+                "idUser__longitude",
+            )
+        )
+        self.location_codes = {}
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.rates = np.array([int(row[1] * 100) for row in rows], dtype=np.int64)
+        self.genres = np.array([GENRES.get(row[2], 0) for row in rows], dtype=np.int8)
+        self.locations = np.array(
+            [
+                self.location_codes.setdefault(normalize(row[3]), len(self.location_codes))
+                if row[3]
+                else -1
+                for row in rows
+            ],
+            dtype=np.int32,
+        )
+        self.competencies = np.array([row[5] for row in rows], dtype=np.int64)
+        self.latitudes = np.array(
+            [np.nan if row[6] is None else row[6] for row in rows], dtype=float
+        )
+        self.longitudes = np.array(
+            [np.nan if row[7] is None else row[7] for row in rows], dtype=float
+        )
+
+        position_by_companion = {row[0]: position for position, row in enumerate(rows)}
+        position_by_user = {row[4]: position for position, row in enumerate(rows)}
+        self.skills = self._inverted(
+            Skill.objects.values_list("idCompanion", "description"), position_by_companion
+        )
+        self.languages = self._inverted(
+            LanguageUser.objects.values_list("idUser", "idLanguage__name"), position_by_user
+        )
+
+    @staticmethod
+    def _inverted(pairs, positions):
+        lists = {}
+        for owner, term in pairs.iterator(chunk_size=10_000):
+            position = positions.get(owner)
+            if position is not None:
+                lists.setdefault(normalize(term), set()).add(position)
+        return {
+            term: np.fromiter(sorted(rows), dtype=np.int64, count=len(rows))
+            for term, rows in lists.items()
+        }
+
+    def search(self, criteria, after=None, limit=20):
+        """
+        Ranks the companions matching the criteria.
+
+        Args:
+            criteria (dict): Cleaned data of a CompanionSearchForm.
+            after (tuple): (matches, hourlyRate, idCompanion) of the last
+                companion of the previous page, or None.
+            limit (int): Page size.
+
+        Returns:
+            list: (matches, hourlyRate, idCompanion) sort keys of the page,
+            in rank order.
+        """
+        keep = np.ones(len(self.ids), dtype=bool)
+        if criteria.get("minRate") is not None:
+            keep &= self.rates >= int(criteria["minRate"] * 100)
+        if criteria.get("maxRate") is not None:
+            keep &= self.rates <= int(criteria["maxRate"] * 100)
+        if criteria.get("genre"):
+            keep &= self.genres == GENRES.get(criteria["genre"], -1)
+        if criteria.get("location"):
+            keep &= self.locations == self.location_codes.get(
+                normalize(criteria["location"]), -2
+            )
+        if criteria.get("careNeeds"):
+            needs = criteria["careNeeds"]
+            keep &= (self.competencies & needs) == needs
+        if criteria.get("q"):
+            keep &= np.isin(self.ids, skill_index.search(criteria["q"]))
+        if criteria.get("date"):
+            window = (criteria["date"], criteria["startTime"], criteria["endTime"])
+            keep &= np.isin(self.ids, availability_engine.free_companions(*window))
+            keep &= ~np.isin(self.ids, busy_companions(*window))
+
+        matches = np.zeros(len(self.ids), dtype=np.int16)
+        for skill in criteria.get("skills", []):
+            matches[self.skills.get(normalize(skill), NO_ROWS)] += 1
+        for language in criteria.get("languages", []):
+            matches[self.languages.get(normalize(language), NO_ROWS)] += 1
+
+        if after is not None:
+            after_matches, after_rate, after_id = after
+            after_rate = int(after_rate * 100)
+            keep &= (
+                (matches < after_matches)
+                | ((matches == after_matches) & (self.rates > after_rate))
+                | (
+                    (matches == after_matches)
+                    & (self.rates == after_rate)
+                    & (self.ids > after_id)
+                )
+            )
+
+        rows = np.flatnonzero(keep)
+        # Rows are sorted by ID: a stable sort by rate and then by matches
+        # gives (matches desc, rate, ID).
+        rows = rows[np.argsort(self.rates[rows], kind="stable")]
+        rows = rows[np.argsort(-matches[rows], kind="stable")][:limit]
+        return [
+            (int(matches[row]), Decimal(int(self.rates[row])).scaleb(-2), int(self.ids[row]))
+            for row in rows
+        ]
+
+
+class CompanionIndexHolder:
+    """Builds the index lazily and rebuilds it in the background when stale."""
+
+    def __init__(self, cache_alias="default"):
+        self.cache_alias = cache_alias
+        self._index = None
+        self._lock = threading.Lock()
+        self._rebuilding = False
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def invalidate(self):
+        """Marks the index of every process as stale."""
+        if not self.cache.add(VERSION_KEY, 1, None):
+            try:
+                self.cache.incr(VERSION_KEY)
+            except ValueError:
+                self.cache.set(VERSION_KEY, 1, None)
+
+    def _rebuild(self, version):
+        try:
+            start = time.perf_counter()
+            self._index = CompanionIndex(version)
+            logger.info(
+                "Companion index rebuilt in %.0f ms", (time.perf_counter() - start) * 1000
+            )
+        except Exception:
+            logger.exception("Could not rebuild the companion index")
+        finally:
+            self._rebuilding = False
+            connections.close_all()
+
+    def get(self):
+        """Returns the current index, starting a rebuild if it is stale."""
+        version = self.cache.get(VERSION_KEY, 0)
+        index = self._index
+        if index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = CompanionIndex(version)
+                return self._index
+
+        if index.version != version:
+            with self._lock:
+                if not self._rebuilding:
+                    self._rebuilding = True
+                    threading.Thread(
+                        target=self._rebuild,
+                        args=(version,),
+                        name="companion-index",
+                        daemon=True,
+                    ).start()
+        return index
+
+
+companion_index = CompanionIndexHolder()
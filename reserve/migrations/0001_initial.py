@@ -0,0 +1,31 @@
+# Generated by Django 4.2.4 on 2026-10-17 03:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('customer', '0004_preference_text_index'),
+        ('companion', '0008_skill_text_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanionRecommendation',
+            fields=[
+                ('idCompanionRecommendation', models.AutoField(primary_key=True, serialize=False)),
+                ('score', models.FloatField()),
+                ('updatedAt', models.DateTimeField(auto_now=True)),
+                ('idCompanion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='companion.companion')),
+                ('idCustomer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='customer.customer')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['idCustomer', '-score'], name='recommendation_customer_idx')],
+                'unique_together': {('idCustomer', 'idCompanion')},
+            },
+        ),
+    ]
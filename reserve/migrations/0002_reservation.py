@@ -0,0 +1,34 @@
+# Generated by Django 4.2.4 on 2026-10-17 04:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companion', '0010_companion_bookingversion'),
+        ('customer', '0005_medicalinformation_careneedsmask'),
+        ('reserve', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reservation',
+            fields=[
+                ('idReservation', models.AutoField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('startTime', models.TimeField()),
+                ('endTime', models.TimeField()),
+                ('startsAt', models.DateTimeField(editable=False)),
+                ('endsAt', models.DateTimeField(editable=False)),
+                ('state', models.CharField(choices=[('confirmed', 'Confirmed'), ('cancelled', 'Cancelled')], default='confirmed', max_length=10)),
+                ('createdAt', models.DateTimeField(auto_now_add=True)),
+                ('idCompanion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='companion.companion')),
+                ('idCustomer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='customer.customer')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['idCompanion', 'startsAt', 'endsAt'], name='reservation_range_idx'), models.Index(fields=['startsAt', 'endsAt', 'idCompanion'], name='reservation_window_idx'), models.Index(fields=['idCustomer', 'startsAt'], name='reservation_customer_idx')],
+            },
+        ),
+    ]
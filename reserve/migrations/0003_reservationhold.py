@@ -0,0 +1,34 @@
+# Generated by Django 4.2.4 on 2026-10-17 04:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0005_medicalinformation_careneedsmask'),
+        ('companion', '0010_companion_bookingversion'),
+        ('reserve', '0002_reservation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservationHold',
+            fields=[
+                ('idReservationHold', models.AutoField(primary_key=True, serialize=False)),
+                ('token', models.CharField(max_length=48, unique=True)),
+                ('date', models.DateField()),
+                ('startTime', models.TimeField()),
+                ('endTime', models.TimeField()),
+                ('startsAt', models.DateTimeField(editable=False)),
+                ('endsAt', models.DateTimeField(editable=False)),
+                ('expiresAt', models.DateTimeField()),
+                ('idCompanion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='companion.companion')),
+                ('idCustomer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='customer.customer')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['startsAt', 'endsAt', 'idCompanion'], name='hold_window_idx'), models.Index(fields=['expiresAt'], name='hold_expiry_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.4 on 2026-10-17 04:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companion', '0010_companion_bookingversion'),
+        ('customer', '0005_medicalinformation_careneedsmask'),
+        ('reserve', '0003_reservationhold'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CareRequest',
+            fields=[
+                ('idCareRequest', models.AutoField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('startTime', models.TimeField()),
+                ('endTime', models.TimeField()),
+                ('startsAt', models.DateTimeField(editable=False)),
+                ('endsAt', models.DateTimeField(editable=False)),
+                ('skills', models.CharField(blank=True, max_length=255)),
+                ('location', models.CharField(blank=True, max_length=100)),
+                ('latitude', models.FloatField(blank=True, editable=False, null=True)),
+                ('longitude', models.FloatField(blank=True, editable=False, null=True)),
+                ('state', models.CharField(choices=[('pending', 'Pending'), ('assigned', 'Assigned'), ('cancelled', 'Cancelled')], default='pending', max_length=10)),
+                ('createdAt', models.DateTimeField(auto_now_add=True)),
+                ('idCompanion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='companion.companion')),
+                ('idCustomer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='customer.customer')),
+                ('idReservation', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='reserve.reservation')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['state', 'date'], name='carerequest_state_idx')],
+            },
+        ),
+    ]
@@ -1,3 +1,234 @@
 from django.db import models
+from authentication.geo import geocode
+from companion.models import Companion
+from companion.time_ranges import to_utc_range
+from customer.models import Customer
 
-# Create your models here.
+
+class CompanionRecommendation(models.Model):
+    """
+    Companion recommended to a customer, precomputed from how well the
+    companion's skills match the customer's preferences.
+
+    Attributes:
+        idCompanionRecommendation (AutoField): Primary key for the recommendation.
+        idCustomer (ForeignKey): The customer the companion is recommended to.
+        idCompanion (ForeignKey): The recommended companion.
+        score (FloatField): Cosine similarity between the TF-IDF vectors of
+            the preferences and the skills, in (0, 1].
+        updatedAt (DateTimeField): When the score was computed.
+    """
+
+    idCompanionRecommendation = models.AutoField(primary_key=True)
+    idCustomer = models.ForeignKey(Customer, on_delete=models.CASCADE)
+    idCompanion = models.ForeignKey(Companion, on_delete=models.CASCADE)
+    score = models.FloatField()
+    updatedAt = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("idCustomer", "idCompanion")
+        indexes = [
+            models.Index(fields=["idCustomer", "-score"], name="recommendation_customer_idx"),
+        ]
+
+    def __str__(self):
+        """
+        String representation of the CompanionRecommendation model.
+
+        Returns:
+            str: The customer, the companion and the score.
+        """
+        return f"{self.idCustomer} -> {self.idCompanion} ({self.score:.2f})"
+
+
+class Reservation(models.Model):
+    """
+    Time range of a companion booked by a customer.
+
+    Attributes:
+        idReservation (AutoField): Primary key for Reservation.
+        idCustomer (ForeignKey): The customer who booked.
+        idCompanion (ForeignKey): The booked companion.
+        date (DateField): Local date the reservation starts on.
+        startTime (TimeField): Local start time.
+        endTime (TimeField): Local end time.
+        startsAt (DateTimeField): Start of the reservation in UTC, kept in sync on save.
+        endsAt (DateTimeField): End of the reservation in UTC, kept in sync on save.
+        state (CharField): Confirmed or cancelled; only confirmed reservations
+            keep the companion busy.
+        createdAt (DateTimeField): When the reservation was made.
+    """
+
+    idReservation = models.AutoField(primary_key=True)
+    idCustomer = models.ForeignKey(Customer, on_delete=models.CASCADE)
+    idCompanion = models.ForeignKey(Companion, on_delete=models.CASCADE)
+    date = models.DateField()
+    startTime = models.TimeField()
+    endTime = models.TimeField()
+    startsAt = models.DateTimeField(editable=False)
+    endsAt = models.DateTimeField(editable=False)
+    state = models.CharField(
+        max_length=10,
+        choices=[("confirmed", "Confirmed"), ("cancelled", "Cancelled")],
+        default="confirmed",
+    )
+    createdAt = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Overlap check of one companion, under its booking lock.
+            models.Index(
+                fields=["idCompanion", "startsAt", "endsAt"],
+                name="reservation_range_idx",
+            ),
+            # Busy companions of a search window.
+            models.Index(
+                fields=["startsAt", "endsAt", "idCompanion"],
+                name="reservation_window_idx",
+            ),
+            models.Index(fields=["idCustomer", "startsAt"], name="reservation_customer_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        Keeps startsAt/endsAt in sync with the local date and times.
+        """
+        self.startsAt, self.endsAt = to_utc_range(self.date, self.startTime, self.endTime)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        """
+        String representation of the Reservation model.
+
+        Returns:
+            str: The companion, the customer and the time range.
+        """
+        return (
+            f"{self.idCompanion} <- {self.idCustomer}: "
+            f"{self.date} {self.startTime}-{self.endTime} ({self.state})"
+        )
+
+
+class ReservationHold(models.Model):
+    """
+    Hold of a companion's time range while a customer checks out, stored in
+    the database when the shared cache cannot be used (see reserve.booking).
+
+    Attributes:
+        idReservationHold (AutoField): Primary key for ReservationHold.
+        token (CharField): Token the customer releases the hold with.
+        idCustomer (ForeignKey): The customer holding the range.
+        idCompanion (ForeignKey): The held companion.
+        date (DateField): Local date of the range.
+        startTime (TimeField): Local start time.
+        endTime (TimeField): Local end time.
+        startsAt (DateTimeField): Start of the range in UTC, kept in sync on save.
+        endsAt (DateTimeField): End of the range in UTC, kept in sync on save.
+        expiresAt (DateTimeField): When the hold is released by itself.
+    """
+
+    idReservationHold = models.AutoField(primary_key=True)
+    token = models.CharField(max_length=48, unique=True)
+    idCustomer = models.ForeignKey(Customer, on_delete=models.CASCADE)
+    idCompanion = models.ForeignKey(Companion, on_delete=models.CASCADE)
+    date = models.DateField()
+    startTime = models.TimeField()
+    endTime = models.TimeField()
+    startsAt = models.DateTimeField(editable=False)
+    endsAt = models.DateTimeField(editable=False)
+    expiresAt = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # Holds of a search window or of one companion's range.
+            models.Index(
+                fields=["startsAt", "endsAt", "idCompanion"],
+                name="hold_window_idx",
+            ),
+            # Sweep of the expired holds.
+            models.Index(fields=["expiresAt"], name="hold_expiry_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        Keeps startsAt/endsAt in sync with the local date and times.
+        """
+        self.startsAt, self.endsAt = to_utc_range(self.date, self.startTime, self.endTime)
+        super().save(*args, **kwargs)
+
+
+class CareRequest(models.Model):
+    """
+    Visit a customer needs, waiting for a coordinator to assign it a
+    companion (see reserve.assignment).
+
+    Attributes:
+        idCareRequest (AutoField): Primary key for CareRequest.
+        idCustomer (ForeignKey): The customer needing care.
+        date (DateField): Local date of the visit.
+        startTime (TimeField): Local start time.
+        endTime (TimeField): Local end time.
+        startsAt (DateTimeField): Start of the visit in UTC, kept in sync on save.
+        endsAt (DateTimeField): End of the visit in UTC, kept in sync on save.
+        skills (CharField): Comma separated skills the companion should have.
+        location (CharField): Where the visit takes place; the customer's
+            own location when blank.
+        latitude (FloatField), longitude (FloatField): Coordinates of the
+            location, looked up in the gazetteer on save.
+        state (CharField): Pending until a companion is assigned, or cancelled.
+        idCompanion (ForeignKey): The assigned companion.
+        idReservation (OneToOneField): The reservation booked for the visit.
+        createdAt (DateTimeField): When the request was made.
+    """
+
+    idCareRequest = models.AutoField(primary_key=True)
+    idCustomer = models.ForeignKey(Customer, on_delete=models.CASCADE)
+    date = models.DateField()
+    startTime = models.TimeField()
+    endTime = models.TimeField()
+    startsAt = models.DateTimeField(editable=False)
+    endsAt = models.DateTimeField(editable=False)
+    skills = models.CharField(max_length=255, blank=True)
+    location = models.CharField(max_length=100, blank=True)
+    latitude = models.FloatField(null=True, blank=True, editable=False)
+    longitude = models.FloatField(null=True, blank=True, editable=False)
+    state = models.CharField(
+        max_length=10,
+        choices=[("pending", "Pending"), ("assigned", "Assigned"), ("cancelled", "Cancelled")],
+        default="pending",
+    )
+    idCompanion = models.ForeignKey(
+        Companion, null=True, blank=True, on_delete=models.SET_NULL
+    )
+    idReservation = models.OneToOneField(
+        Reservation, null=True, blank=True, on_delete=models.SET_NULL
+    )
+    createdAt = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Pending requests of the dates being assigned.
+            models.Index(fields=["state", "date"], name="carerequest_state_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        Keeps startsAt/endsAt in sync with the local date and times, and the
+        coordinates with the location.
+        """
+        self.startsAt, self.endsAt = to_utc_range(self.date, self.startTime, self.endTime)
+        self.latitude, self.longitude = geocode(self.location) or (None, None)
+        super().save(*args, **kwargs)
+
+    def get_skills(self):
+        """Returns the list of requested skills."""
+        return [skill.strip() for skill in self.skills.split(",") if skill.strip()]
+
+    def __str__(self):
+        """
+        String representation of the CareRequest model.
+
+        Returns:
+            str: The customer, the time range and the state.
+        """
+        return f"{self.idCustomer}: {self.date} {self.startTime}-{self.endTime} ({self.state})"
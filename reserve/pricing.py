@@ -0,0 +1,240 @@
+"""
+Quotes of time slots at the companions' hourly rates.
+
+A slot costs its wall-clock minutes (seconds are ignored) at the
+companion's hourly rate, with a surcharge on the minutes falling on a
+weekend (Saturday and Sunday) and on the minutes of the night window; both
+apply to a weekend night. The quote of a set of slots gets a volume
+discount by its total hours.
+
+Amounts are fixed-point integers: rates and prices in cents, surcharges
+and discounts in basis points. The rate card of a slot is its minutes and
+its weight, the sum over its minutes of the multiplier of each minute in
+basis points (10000 plus the surcharges), so the price of a slot is
+rate * weight / 600000 cents, rounded half up once. A quote of many
+companions by many slots is then one int64 outer product and a few
+integer divisions, and gives, cent for cent, the amounts of
+`quote_reference`, which prices every minute in Decimal.
+
+Rate cards depend only on the pricing policy and the slot; the most
+requested ones are cached.
+"""
+from collections import namedtuple
+from datetime import time as dtime, timedelta
+from decimal import ROUND_HALF_UP, Decimal, localcontext
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+
+from .matching import companion_index
+
+BASIS_POINTS = 10_000
+MINUTES_PER_DAY = 24 * 60
+# Price denominator: minutes per hour times the basis points of the multipliers.
+PRICE_DIVISOR = 60 * BASIS_POINTS
+RATE_CARD_CACHE_SIZE = 10_000
+CENT = Decimal("0.01")
+
+PricingPolicy = namedtuple(
+    "PricingPolicy",
+    ["weekend_surcharge", "night_surcharge", "night_start", "night_end", "volume_discounts"],
+)
+RateCard = namedtuple("RateCard", ["minutes", "weight"])
+Quote = namedtuple(
+    "Quote", ["companion_ids", "lines", "subtotals", "discounts", "totals", "discount"]
+)
+
+
+def pricing_policy():
+    """
+    Reads the pricing policy from the settings.
+
+    Returns:
+        PricingPolicy: Surcharges in basis points, the night window as local
+        times, and the volume discounts as (minimum hours, basis points)
+        pairs by increasing hours.
+    """
+    return PricingPolicy(
+        settings.PRICING_WEEKEND_SURCHARGE,
+        settings.PRICING_NIGHT_SURCHARGE,
+        dtime.fromisoformat(settings.PRICING_NIGHT_START),
+        dtime.fromisoformat(settings.PRICING_NIGHT_END),
+        tuple(sorted((hours, discount) for hours, discount in settings.PRICING_VOLUME_DISCOUNTS)),
+    )
+
+
+def _minute_of(value):
+    # Slots are priced to the minute.
+    return value.hour * 60 + value.minute
+
+
+def _overlap(start, end, first, last):
+    return max(0, min(end, last) - max(start, first))
+
+
+@lru_cache(maxsize=RATE_CARD_CACHE_SIZE)
+def rate_card(policy, date, start_time, end_time):
+    """
+    Computes the rate card of a slot. A slot ending at or before its start
+    time ends the next day.
+
+    Returns:
+        RateCard: Minutes of the slot, and the sum of the multipliers of
+        its minutes, in basis points.
+    """
+    start = _minute_of(start_time)
+    end = _minute_of(end_time)
+    if end <= start:
+        end += MINUTES_PER_DAY
+    night_start, night_end = _minute_of(policy.night_start), _minute_of(policy.night_end)
+    if night_start < night_end:
+        nights = [(night_start, night_end)]
+    else:
+        nights = [(0, night_end), (night_start, MINUTES_PER_DAY)]
+
+    weight = 0
+    for day in range(2):
+        offset = day * MINUTES_PER_DAY
+        minutes = _overlap(start, end, offset, offset + MINUTES_PER_DAY)
+        if not minutes:
+            continue
+        weight += minutes * BASIS_POINTS
+        if (date + timedelta(days=day)).weekday() >= 5:
+            weight += minutes * policy.weekend_surcharge
+        for first, last in nights:
+            weight += _overlap(start, end, offset + first, offset + last) * policy.night_surcharge
+    return RateCard(end - start, weight)
+
+
+def volume_discount(policy, minutes):
+    """Discount, in basis points, of a quote of this many minutes."""
+    discount = 0
+    for hours, basis_points in policy.volume_discounts:
+        if minutes >= hours * 60:
+            discount = basis_points
+    return discount
+
+
+def _divide_half_up(numerator, denominator):
+    """Rounds non-negative integer quotients half up, like ROUND_HALF_UP."""
+    return (2 * numerator + denominator) // (2 * denominator)
+
+
+def quote_cents(rates, slots, policy=None):
+    """
+    Quotes slots at hourly rates.
+
+    Args:
+        rates (ndarray): Hourly rates in cents, one per companion.
+        slots (list): (date, start_time, end_time) tuples.
+        policy (PricingPolicy): The policy of the settings by default.
+
+    Returns:
+        tuple: (lines, subtotals, discounts, totals, discount): int64 cents,
+        lines by companion and slot, the others by companion, and the
+        volume discount in basis points.
+
+    Raises:
+        ValueError: If a rate is negative, or so large the cents would
+        overflow int64.
+    """
+    policy = policy or pricing_policy()
+    cards = [rate_card(policy, *slot) for slot in slots]
+    weights = np.array([card.weight for card in cards], dtype=np.int64)
+    rates = np.asarray(rates, dtype=np.int64)
+    if len(rates) and rates.min() < 0:
+        raise ValueError("Hourly rates cannot be negative.")
+    # The doubled numerators of the roundings must fit in int64.
+    largest = int(rates.max()) if len(rates) else 0
+    largest_subtotal = largest * int(weights.sum()) // PRICE_DIVISOR + len(cards)
+    if (
+        2 * largest * int(weights.max(initial=0)) + PRICE_DIVISOR >= 2**63
+        or 2 * largest_subtotal * BASIS_POINTS + BASIS_POINTS >= 2**63
+    ):
+        raise ValueError("Hourly rates too large to quote.")
+
+    lines = _divide_half_up(rates[:, None] * weights[None, :], PRICE_DIVISOR)
+    subtotals = lines.sum(axis=1)
+    discount = volume_discount(policy, sum(card.minutes for card in cards))
+    discounts = _divide_half_up(subtotals * discount, BASIS_POINTS)
+    return lines, subtotals, discounts, subtotals - discounts, discount
+
+
+def quote(companion_ids, slots, policy=None):
+    """
+    Quotes slots for bookable companions, at their rates in the companion
+    index.
+
+    Args:
+        companion_ids (list): IDs of the companions; those not bookable are
+            left out.
+        slots (list): (date, start_time, end_time) tuples.
+        policy (PricingPolicy): The policy of the settings by default.
+
+    Returns:
+        Quote: Amounts in int64 cents, see `quote_cents`, and the IDs of
+        the quoted companions.
+    """
+    index = companion_index.get()
+    companion_ids = np.asarray(companion_ids, dtype=np.int64)
+    rows = np.searchsorted(index.ids, companion_ids)
+    found = rows < len(index.ids)
+    found[found] = index.ids[rows[found]] == companion_ids[found]
+    return Quote(companion_ids[found], *quote_cents(index.rates[rows[found]], slots, policy))
+
+
+def _reference_line(rate, policy, date, start_time, end_time):
+    start = _minute_of(start_time)
+    end = _minute_of(end_time)
+    if end <= start:
+        end += MINUTES_PER_DAY
+    night_start, night_end = _minute_of(policy.night_start), _minute_of(policy.night_end)
+    weekend = Decimal(policy.weekend_surcharge) / BASIS_POINTS
+    night = Decimal(policy.night_surcharge) / BASIS_POINTS
+    hours = Decimal(0)
+    for minute in range(start, end):
+        day, of_day = divmod(minute, MINUTES_PER_DAY)
+        multiplier = Decimal(1)
+        if (date + timedelta(days=day)).weekday() >= 5:
+            multiplier += weekend
+        if (
+            night_start <= of_day < night_end
+            if night_start < night_end
+            else of_day >= night_start or of_day < night_end
+        ):
+            multiplier += night
+        hours += multiplier
+    return (rate * hours / 60).quantize(CENT, rounding=ROUND_HALF_UP), end - start
+
+
+def quote_reference(rates, slots, policy=None):
+    """
+    Quotes slots at hourly rates with Decimal arithmetic, minute by minute.
+
+    Args:
+        rates (list): Hourly rates as Decimal.
+        slots (list): (date, start_time, end_time) tuples.
+        policy (PricingPolicy): The policy of the settings by default.
+
+    Returns:
+        list: (lines, subtotal, discount, total) per rate, in Decimal
+        currency units.
+    """
+    policy = policy or pricing_policy()
+    quotes = []
+    with localcontext() as context:
+        context.prec = 50
+        for rate in rates:
+            priced = [_reference_line(rate, policy, *slot) for slot in slots]
+            lines = [line for line, _ in priced]
+            discount = Decimal(volume_discount(policy, sum(minutes for _, minutes in priced)))
+            subtotal = sum(lines, Decimal("0.00"))
+            amount = (subtotal * discount / BASIS_POINTS).quantize(CENT, rounding=ROUND_HALF_UP)
+            quotes.append((lines, subtotal, amount, subtotal - amount))
+    return quotes
+
+
+def to_decimal(cents):
+    """Converts an amount in cents to Decimal currency units."""
+    return Decimal(int(cents)).scaleb(-2)
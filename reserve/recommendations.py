@@ -0,0 +1,446 @@
+"""
+Companion recommendations from customer preferences.
+
+Every available companion's skills and every customer's preferences are
+turned into TF-IDF vectors over the tokens of their descriptions
+(normalized like the text search: accents stripped, lower cased). A
+customer's recommendations are the companions with the highest cosine
+similarity, stored in CompanionRecommendation so the home page only reads
+them.
+
+The companion vectors are kept column-wise, as one (positions, weights)
+posting list per token: the scores of a batch of customers are then a
+dense (customers x companions) matrix accumulated one posting list per
+non-zero customer weight, and the top k of every row is taken with
+argpartition.
+
+Changes are applied incrementally by a background worker fed by the
+Preference and Skill signals: a customer whose preferences change gets
+their recommendations recomputed; a companion whose skills change gets
+their vector replaced, and the customers sharing a token with it, or
+having it recommended, are recomputed. The IDF weights are only
+recomputed by a full refresh (`refresh_recommendations`), incremental
+updates reuse the weights of the last one.
+"""
+import logging
+import math
+import queue
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections, transaction
+
+from authentication.text_search import tokenize
+from companion.models import Companion, Skill
+from customer.models import Preference
+
+from .models import CompanionRecommendation
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "recommendations:version"
+
+# Customers whose stored recommendations are merged per query.
+MERGE_BATCH_SIZE = 1000
+
+NO_POSITIONS = np.empty(0, dtype=np.int64)
+NO_WEIGHTS = np.empty(0, dtype=np.float32)
+
+
+def term_frequencies(descriptions):
+    return Counter(token for description in descriptions for token in tokenize(description))
+
+
+class TfidfModel:
+    """
+    TF-IDF vectors of the available companions' skills.
+
+    Attributes:
+        version (int): Version stamp the model was loaded at.
+        ids (list): Companion ID of every column.
+        idf (dict): IDF weight of every token of the companions' skills.
+        postings (dict): token -> (column positions, weights).
+        customers_by_token (dict): token -> IDs of the customers whose
+            preferences contain it.
+        customer_tokens (dict): customer ID -> tokens of their preferences.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self.ids = list(
+            Companion.objects.filter(stateAvailability="available")
+            .order_by("idCompanion")
+            .values_list("idCompanion", flat=True)
+        )
+        self.positions = {companion_id: i for i, companion_id in enumerate(self.ids)}
+
+        descriptions = {}
+        for companion_id, description in Skill.objects.filter(
+            idCompanion__stateAvailability="available"
+        ).values_list("idCompanion", "description").iterator():
+            descriptions.setdefault(companion_id, []).append(description)
+        frequencies = {
+            companion_id: term_frequencies(texts)
+            for companion_id, texts in descriptions.items()
+        }
+
+        document_frequency = Counter(
+            token for counts in frequencies.values() for token in counts
+        )
+        total = len(self.ids)
+        self.idf = {
+            token: math.log((1 + total) / (1 + count)) + 1
+            for token, count in document_frequency.items()
+        }
+
+        self.terms = {}
+        columns = {}
+        for companion_id, counts in frequencies.items():
+            vector = self.vectorize_counts(counts)
+            self.terms[companion_id] = vector
+            for token, weight in vector.items():
+                columns.setdefault(token, []).append((self.positions[companion_id], weight))
+        self.postings = {
+            token: (
+                np.array([position for position, _ in entries], dtype=np.int64),
+                np.array([weight for _, weight in entries], dtype=np.float32),
+            )
+            for token, entries in columns.items()
+        }
+
+        self.customers_by_token = {}
+        self.customer_tokens = {}
+        for customer_id, description in Preference.objects.values_list(
+            "idCustomer", "description"
+        ).iterator():
+            for token in tokenize(description):
+                self.customers_by_token.setdefault(token, set()).add(customer_id)
+                self.customer_tokens.setdefault(customer_id, set()).add(token)
+
+    def vectorize_counts(self, counts):
+        """L2 normalized sublinear TF-IDF weights of the known tokens."""
+        vector = {
+            token: (1 + math.log(count)) * self.idf[token]
+            for token, count in counts.items()
+            if token in self.idf
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return {token: weight / norm for token, weight in vector.items()} if norm else {}
+
+    def vectorize(self, descriptions):
+        return self.vectorize_counts(term_frequencies(descriptions))
+
+    def top_k(self, vectors, k):
+        """
+        Best companions of a batch of customer vectors.
+
+        Args:
+            vectors (list): Customer vectors, {token: weight}.
+            k (int): Companions per customer.
+
+        Returns:
+            list: For every vector, (companion ID, score) pairs, best first.
+        """
+        scores = np.zeros((len(vectors), len(self.ids)), dtype=np.float32)
+        for row, vector in enumerate(vectors):
+            for token, weight in vector.items():
+                positions, weights = self.postings.get(token, (NO_POSITIONS, NO_WEIGHTS))
+                # Positions are unique within a posting list.
+                scores[row, positions] += weight * weights
+
+        k = min(k, len(self.ids))
+        if k == 0:
+            return [[] for _ in vectors]
+        best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, best, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        best = np.take_along_axis(best, order, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        return [
+            [
+                (self.ids[position], float(score))
+                for position, score in zip(row_positions, row_scores)
+                if score > 0
+            ]
+            for row_positions, row_scores in zip(best, best_scores)
+        ]
+
+    def set_customer_tokens(self, customer_id, tokens):
+        old = self.customer_tokens.pop(customer_id, set())
+        for token in old - tokens:
+            self.customers_by_token.get(token, set()).discard(customer_id)
+        for token in tokens - old:
+            self.customers_by_token.setdefault(token, set()).add(customer_id)
+        if tokens:
+            self.customer_tokens[customer_id] = tokens
+
+    def set_companion(self, companion_id, descriptions, available):
+        """Replaces a companion's vector, removing it when not available."""
+        old = self.terms.pop(companion_id, {})
+        position = self.positions.get(companion_id)
+        if position is not None:
+            for token in old:
+                positions, weights = self.postings[token]
+                keep = positions != position
+                self.postings[token] = (positions[keep], weights[keep])
+
+        if available:
+            # A token no companion had yet weighs as if one companion had it.
+            for token in term_frequencies(descriptions):
+                self.idf.setdefault(token, math.log((1 + len(self.ids)) / 2) + 1)
+        new = self.vectorize(descriptions) if available else {}
+        if new:
+            if position is None:
+                position = self.positions[companion_id] = len(self.ids)
+                self.ids.append(companion_id)
+            self.terms[companion_id] = new
+            for token, weight in new.items():
+                positions, weights = self.postings.get(token, (NO_POSITIONS, NO_WEIGHTS))
+                self.postings[token] = (
+                    np.append(positions, position),
+                    np.append(weights, np.float32(weight)),
+                )
+
+
+class RecommendationEngine:
+    """
+    Computes and stores the recommendations of every process.
+
+    The model is versioned through the shared cache, like the other in-memory
+    indexes: a process reloads it when another process changed it.
+    """
+
+    def __init__(self, cache_alias="default"):
+        self.cache_alias = cache_alias
+        self._model = None
+        self._lock = threading.RLock()
+        self._queue = None
+        self._worker = None
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def _bump_version(self):
+        if self.cache.add(VERSION_KEY, 1, None):
+            return 1
+        try:
+            return self.cache.incr(VERSION_KEY)
+        except ValueError:
+            self.cache.set(VERSION_KEY, 1, None)
+            return 1
+
+    def get_model(self):
+        version = self.cache.get(VERSION_KEY, 0)
+        with self._lock:
+            if self._model is None or self._model.version != version:
+                self._model = TfidfModel(version)
+            return self._model
+
+    def _changed_model(self):
+        """The model to apply our own change to, reloaded if others changed it."""
+        version = self._bump_version()
+        with self._lock:
+            if self._model is None or self._model.version != version - 1:
+                self._model = TfidfModel(version)
+            self._model.version = version
+            return self._model
+
+    def store(self, customer_ids, recommendations):
+        """Replaces the stored recommendations of the customers."""
+        with transaction.atomic():
+            CompanionRecommendation.objects.filter(idCustomer__in=customer_ids).delete()
+            CompanionRecommendation.objects.bulk_create(
+                CompanionRecommendation(
+                    idCustomer_id=customer_id, idCompanion_id=companion_id, score=score
+                )
+                for customer_id, best in zip(customer_ids, recommendations)
+                for companion_id, score in best
+            )
+
+    def _preferences(self, customer_ids):
+        descriptions = {customer_id: [] for customer_id in customer_ids}
+        for customer_id, description in Preference.objects.filter(
+            idCustomer__in=customer_ids
+        ).values_list("idCustomer", "description"):
+            descriptions[customer_id].append(description)
+        return descriptions
+
+    def _recompute(self, model, customer_ids, batch_size=None):
+        batch_size = batch_size or settings.RECOMMENDATIONS_BATCH_SIZE
+        customer_ids = sorted(customer_ids)
+        for first in range(0, len(customer_ids), batch_size):
+            batch = customer_ids[first:first + batch_size]
+            descriptions = self._preferences(batch)
+            vectors = [model.vectorize(descriptions[customer_id]) for customer_id in batch]
+            self.store(batch, model.top_k(vectors, settings.RECOMMENDATIONS_TOP_K))
+
+    def refresh_customers(self, customer_ids):
+        """Recomputes the recommendations of customers whose preferences changed."""
+        model = self._changed_model()
+        for customer_id, texts in self._preferences(customer_ids).items():
+            model.set_customer_tokens(customer_id, set(term_frequencies(texts)))
+        self._recompute(model, customer_ids)
+
+    def refresh_companions(self, companion_ids):
+        """Replaces the vectors of companions whose skills or state changed."""
+        model = self._changed_model()
+        available = set(
+            Companion.objects.filter(
+                idCompanion__in=companion_ids, stateAvailability="available"
+            ).values_list("idCompanion", flat=True)
+        )
+        descriptions = {companion_id: [] for companion_id in companion_ids}
+        for companion_id, description in Skill.objects.filter(
+            idCompanion__in=companion_ids
+        ).values_list("idCompanion", "description"):
+            descriptions[companion_id].append(description)
+
+        holders = set(
+            CompanionRecommendation.objects.filter(
+                idCompanion__in=companion_ids
+            ).values_list("idCustomer", flat=True)
+        )
+        candidates = set()
+        for companion_id, texts in descriptions.items():
+            model.set_companion(companion_id, texts, companion_id in available)
+            for token in model.terms.get(companion_id, {}):
+                candidates |= model.customers_by_token.get(token, set())
+
+        # A changed companion may lose its place in the lists holding it, those
+        # are recomputed. Elsewhere it can only enter the list.
+        self._recompute(model, holders)
+        self._merge(model, companion_ids, candidates - holders)
+
+    def _merge(self, model, companion_ids, customer_ids):
+        """Scores companions for customers and inserts them where they rank."""
+        vectors = {
+            companion_id: model.terms[companion_id]
+            for companion_id in companion_ids
+            if companion_id in model.terms
+        }
+        if not vectors:
+            return
+        k = settings.RECOMMENDATIONS_TOP_K
+        customer_ids = sorted(customer_ids)
+        # Bounded by the query parameter limits rather than memory.
+        for first in range(0, len(customer_ids), MERGE_BATCH_SIZE):
+            batch = customer_ids[first:first + MERGE_BATCH_SIZE]
+            preferences = self._preferences(batch)
+            stored = {}
+            for pk, customer_id, companion_id, score in CompanionRecommendation.objects.filter(
+                idCustomer__in=batch
+            ).values_list("pk", "idCustomer", "idCompanion", "score"):
+                stored.setdefault(customer_id, []).append((score, companion_id, pk))
+
+            evicted, created = [], []
+            for customer_id in batch:
+                vector = model.vectorize(preferences[customer_id])
+                current = stored.get(customer_id, [])
+                entries = list(current)
+                for companion_id, companion_vector in vectors.items():
+                    score = sum(
+                        weight * companion_vector.get(token, 0)
+                        for token, weight in vector.items()
+                    )
+                    if score > 0:
+                        entries.append((score, companion_id, None))
+                best = sorted(entries, key=lambda entry: (-entry[0], entry[1]))[:k]
+                kept = {pk for _, _, pk in best}
+                evicted += [pk for _, _, pk in current if pk not in kept]
+                created += [
+                    CompanionRecommendation(
+                        idCustomer_id=customer_id, idCompanion_id=companion_id, score=score
+                    )
+                    for score, companion_id, pk in best
+                    if pk is None
+                ]
+            with transaction.atomic():
+                CompanionRecommendation.objects.filter(pk__in=evicted).delete()
+                CompanionRecommendation.objects.bulk_create(created)
+
+    def refresh_all(self, batch_size=None, progress=None):
+        """
+        Reloads the model, IDF weights included, and recomputes every
+        customer's recommendations.
+        """
+        self._bump_version()
+        model = self.get_model()
+        customer_ids = set(
+            Preference.objects.values_list("idCustomer", flat=True).distinct()
+        )
+        batch_size = batch_size or settings.RECOMMENDATIONS_BATCH_SIZE
+        ordered = sorted(customer_ids)
+        for first in range(0, len(ordered), batch_size):
+            self._recompute(model, ordered[first:first + batch_size], batch_size)
+            if progress:
+                progress(min(first + batch_size, len(ordered)), len(ordered))
+        # Customers without preferences anymore keep no recommendations.
+        CompanionRecommendation.objects.exclude(idCustomer__in=customer_ids).delete()
+        return model
+
+    def enqueue(self, kind, object_id):
+        """
+        Queues a changed customer or companion for the background worker,
+        once the current transaction commits.
+        """
+        self.enqueue_many(kind, [object_id])
+
+    def enqueue_many(self, kind, object_ids):
+        """Queues several changed customers or companions, see `enqueue`."""
+        object_ids = list(object_ids)
+        if not object_ids:
+            return
+        if not settings.RECOMMENDATIONS_ASYNC:
+            refresh = self.refresh_customers if kind == "customer" else self.refresh_companions
+            transaction.on_commit(lambda: refresh(object_ids))
+            return
+
+        def put():
+            work = self._get_queue()
+            for object_id in object_ids:
+                work.put((kind, object_id))
+
+        transaction.on_commit(put)
+
+    def _get_queue(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._queue = queue.Queue()
+                self._worker = threading.Thread(
+                    target=self._work, name="recommendations", daemon=True
+                )
+                self._worker.start()
+            return self._queue
+
+    def _work(self):
+        while True:
+            changes = {"customer": set(), "companion": set()}
+            kind, object_id = self._queue.get()
+            changes[kind].add(object_id)
+            # Coalesce the changes of a burst (e.g. a form adding several rows).
+            time.sleep(settings.RECOMMENDATIONS_DEBOUNCE)
+            while True:
+                try:
+                    kind, object_id = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                changes[kind].add(object_id)
+
+            close_old_connections()
+            try:
+                if changes["companion"]:
+                    self.refresh_companions(changes["companion"])
+                if changes["customer"]:
+                    self.refresh_customers(changes["customer"])
+            except Exception:
+                logger.exception("Could not refresh the recommendations")
+            finally:
+                close_old_connections()
+
+
+recommendation_engine = RecommendationEngine()
@@ -0,0 +1,798 @@
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Exists, F, IntegerField, OuterRef, Q, Value, When
+from django.utils import timezone
+from authentication import care_taxonomy
+from authentication.geo import within
+from authentication.models import Language, LanguageUser
+from authentication.text_search import skill_index
+from companion.models import (
+    Companion,
+    RecurringAvailability,
+    RecurringAvailabilityException,
+    Skill,
+    TimeAvailability,
+)
+from companion.recurrence import expand, weekday_bit
+from companion.time_ranges import covering, to_utc_range
+from .booking import (
+    MAX_RESERVATION_LENGTH,
+    Hold,
+    RequestedSlot,
+    SlotResult,
+    busy_reservations,
+    hold_store,
+)
+from .intervals import IntervalTree
+from .matching import location_regex, normalize
+from .models import CareRequest, CompanionRecommendation, Reservation
+
+
+class AbstractCompanionSearchRepository(ABC):
+    """
+    Interface for the companion search repository.
+    Defines the abstract methods that must be implemented by concrete repositories.
+    """
+
+    @abstractmethod
+    def search(self, criteria, after=None, limit=20):
+        """Gets one page of ranked companions matching the criteria."""
+        pass
+
+    @abstractmethod
+    def get_page(self, keys, criteria):
+        """Gets the companions of a page ranked elsewhere."""
+        pass
+
+
+class CompanionSearchRepository(AbstractCompanionSearchRepository):
+    """
+    Concrete repository that implements AbstractCompanionSearchRepository using Django ORM.
+
+    Hard criteria (availability window, rate range, genre, location, care
+    needs) filter the companions, and those booked or held during the window
+    are left out. Skills and languages rank them: companions matching more
+    of them come first, then the cheapest, then by ID. Every criterion is a
+    probe on a composite index: companion_search_idx, skill_companion_idx,
+    languageuser_user_idx and the TimeAvailability UTC range index. Care
+    needs are a bitwise predicate, which no index can seek: it is checked on
+    the companion_competencies_idx entries. The location is matched case and
+    space insensitively, like the in-memory index, so it is checked on the
+    users of the other candidates.
+    """
+
+    def __init__(self, model=Companion):
+        self.model = model
+
+    def _filter(self, criteria, location=True):
+        companions = self.model.objects.filter(
+            stateAvailability="available", hourlyRate__isnull=False
+        )
+        if criteria.get("minRate") is not None:
+            companions = companions.filter(hourlyRate__gte=criteria["minRate"])
+        if criteria.get("maxRate") is not None:
+            companions = companions.filter(hourlyRate__lte=criteria["maxRate"])
+        if location and criteria.get("location"):
+            # Case and space insensitive, like the in-memory index.
+            companions = companions.filter(
+                idUser__location__iregex=location_regex(criteria["location"])
+            )
+        if criteria.get("genre"):
+            companions = companions.filter(idUser__genre=criteria["genre"])
+        if criteria.get("careNeeds"):
+            companions = care_taxonomy.covering(companions, criteria["careNeeds"])
+        return companions
+
+    def _available_in_window(self, date, start_time, end_time):
+        """
+        A one-off availability covers the window, or a weekly rule does and
+        no one-off availability replaces the rules on that date.
+        """
+        one_offs = TimeAvailability.objects.filter(idCompanion=OuterRef("pk"))
+        one_off_covers = Exists(one_offs.filter(covering(date, start_time, end_time)))
+        one_off_on_date = Exists(one_offs.filter(date=date))
+        rule_covers = Exists(
+            RecurringAvailability.objects.filter(
+                Q(validUntil__isnull=True) | Q(validUntil__gte=date),
+                idCompanion=OuterRef("pk"),
+                validFrom__lte=date,
+                startTime__lte=start_time,
+                endTime__gte=end_time,
+            )
+            .annotate(onDate=F("weekdays").bitand(weekday_bit(date)))
+            .filter(onDate__gt=0)
+            .exclude(
+                Exists(
+                    RecurringAvailabilityException.objects.filter(
+                        idRecurringAvailability=OuterRef("pk"), date=date
+                    )
+                )
+            )
+        )
+        return one_off_covers | (rule_covers & ~one_off_on_date)
+
+    def _matches(self, criteria):
+        """Number of the requested skills and languages a companion has."""
+        terms = [
+            Exists(
+                Skill.objects.filter(idCompanion=OuterRef("pk"), description__iexact=skill)
+            )
+            for skill in criteria["skills"]
+        ]
+        if criteria["languages"]:
+            names = Q()
+            for name in criteria["languages"]:
+                names |= Q(name__iexact=name)
+            terms += [
+                Exists(
+                    LanguageUser.objects.filter(
+                        idUser=OuterRef("idUser"), idLanguage=language_id
+                    )
+                )
+                for language_id in Language.objects.filter(names).values_list(
+                    "idLanguage", flat=True
+                )
+            ]
+
+        matches = Value(0, output_field=IntegerField())
+        for term in terms:
+            matches = matches + Case(
+                When(term, then=Value(1)), default=Value(0), output_field=IntegerField()
+            )
+        return matches
+
+    def search(self, criteria, after=None, limit=20):
+        """
+        Implements the method to retrieve one page of ranked companions.
+
+        Args:
+            criteria (dict): Cleaned data of a CompanionSearchForm.
+            after (tuple): (matches, hourlyRate, idCompanion) of the last
+                companion of the previous page, or None for the first page.
+            limit (int): Page size.
+
+        Returns:
+            list: Companions with their user and a `matches` attribute.
+        """
+        try:
+            companions = self._filter(criteria)
+            if criteria.get("q"):
+                companions = companions.filter(
+                    idCompanion__in=skill_index.search(criteria["q"])
+                )
+            if criteria.get("date"):
+                window = (criteria["date"], criteria["startTime"], criteria["endTime"])
+                held = {
+                    hold.companion_id
+                    for hold in hold_store.overlapping(criteria["date"], *to_utc_range(*window))
+                }
+                companions = (
+                    companions.filter(self._available_in_window(*window))
+                    .exclude(Exists(busy_reservations(*window).filter(idCompanion=OuterRef("pk"))))
+                    .exclude(idCompanion__in=held)
+                )
+
+            companions = companions.annotate(matches=self._matches(criteria))
+            if after is not None:
+                matches, rate, companion_id = after
+                companions = companions.filter(
+                    Q(matches__lt=matches)
+                    | Q(matches=matches, hourlyRate__gt=rate)
+                    | Q(matches=matches, hourlyRate=rate, idCompanion__gt=companion_id)
+                )
+
+            return list(
+                companions.select_related("idUser").order_by(
+                    "-matches", "hourlyRate", "idCompanion"
+                )[:limit]
+            )
+        except Exception as e:
+            # Log or handle the unexpected exception here
+            raise RuntimeError(f"An error occurred while searching companions: {str(e)}")
+
+    def get_page(self, keys, criteria):
+        """
+        Implements the method to retrieve the companions of a page ranked by
+        the in-memory index.
+
+        The rate, genre, location and care needs filters are checked again so a
+        companion changed since the index was built is left out; the
+        location is compared normalized, as the index does.
+
+        Args:
+            keys (list): (matches, hourlyRate, idCompanion) sort keys, in rank order.
+            criteria (dict): Cleaned data of a CompanionSearchForm.
+
+        Returns:
+            list: Companions with their user and a `matches` attribute, in rank order.
+        """
+        try:
+            companions = (
+                self._filter(criteria, location=False)
+                .select_related("idUser")
+                .in_bulk([companion_id for _, _, companion_id in keys])
+            )
+            location = normalize(criteria.get("location"))
+            page = []
+            for matches, _, companion_id in keys:
+                companion = companions.get(companion_id)
+                if companion is not None and (
+                    not location or normalize(companion.idUser.location) == location
+                ):
+                    companion.matches = matches
+                    page.append(companion)
+            return page
+        except Exception as e:
+            # Log or handle the unexpected exception here
+            raise RuntimeError(f"An error occurred while getting companions: {str(e)}")
+
+
+class AbstractCompanionRecommendationRepository(ABC):
+    """
+    Interface for the companion recommendation repository.
+    Defines the abstract methods that must be implemented by concrete repositories.
+    """
+
+    @abstractmethod
+    def get_by_customer(self, customer, limit):
+        """Gets the best recommendations of a customer."""
+        pass
+
+
+class CompanionRecommendationRepository(AbstractCompanionRecommendationRepository):
+    """
+    Concrete repository that implements AbstractCompanionRecommendationRepository using Django ORM.
+    """
+
+    def __init__(self, model=CompanionRecommendation):
+        self.model = model
+
+    def get_by_customer(self, customer, limit):
+        """
+        Implements the method to retrieve the best recommendations of a customer.
+
+        Args:
+            customer (Customer): The customer.
+            limit (int): Maximum number of recommendations.
+
+        Returns:
+            list: Recommendations with their companion and its user, best first.
+        """
+        try:
+            return list(
+                self.model.objects.filter(
+                    idCustomer=customer, idCompanion__stateAvailability="available"
+                )
+                .select_related("idCompanion__idUser")
+                .order_by("-score")[:limit]
+            )
+        except Exception as e:
+            # Log or handle the unexpected exception here
+            raise RuntimeError(f"An error occurred while getting recommendations: {str(e)}")
+
+
+class AbstractCompanionNearbyRepository(ABC):
+    """
+    Interface for the nearby companion repository.
+    Defines the abstract methods that must be implemented by concrete repositories.
+    """
+
+    @abstractmethod
+    def nearest(self, latitude, longitude, radius_km, limit):
+        """Gets the available companions nearest to a point."""
+        pass
+
+
+class CompanionNearbyRepository(AbstractCompanionNearbyRepository):
+    """
+    Concrete repository that implements AbstractCompanionNearbyRepository using Django ORM.
+
+    Companions are located by the coordinates of their user (see
+    authentication.geo): the grid cells around the point are read through
+    user_geo_cell_idx and the candidates are ranked by exact distance.
+    """
+
+    def __init__(self, model=Companion):
+        self.model = model
+
+    def nearest(self, latitude, longitude, radius_km, limit):
+        """
+        Implements the method to retrieve the available companions nearest to a point.
+
+        Args:
+            latitude (float), longitude (float): The point.
+            radius_km (float): Maximum distance, in km.
+            limit (int): Maximum number of companions.
+
+        Returns:
+            list: Companions with their user and a `distanceKm` attribute, nearest first.
+        """
+        try:
+            ranked = within(
+                self.model.objects.filter(stateAvailability="available"),
+                latitude,
+                longitude,
+                radius_km,
+                limit,
+                prefix="idUser__",
+            )
+            companions = self.model.objects.select_related("idUser").in_bulk(
+                [companion_id for companion_id, _ in ranked]
+            )
+            page = []
+            for companion_id, distance in ranked:
+                companion = companions.get(companion_id)
+                if companion is not None:
+                    companion.distanceKm = distance
+                    page.append(companion)
+            return page
+        except Exception as e:
+            # Log or handle the unexpected exception here
+            raise RuntimeError(f"An error occurred while getting companions: {str(e)}")
+
+
+class StaleBookingVersion(Exception):
+    """Another reservation of the companion was made since its booking version was read."""
+
+
+class AbstractReservationRepository(ABC):
+    """
+    Interface for the reservation repository.
+    Defines the abstract methods that must be implemented by concrete repositories.
+    """
+
+    @abstractmethod
+    def create(self, customer, companion_id, date, start_time, end_time):
+        """Books a companion's time range, atomically."""
+        pass
+
+    @abstractmethod
+    def create_many(self, customer, slots, on_booked=None):
+        """Books the free slots of a batch atomically."""
+        pass
+
+    @abstractmethod
+    def hold(self, customer, companion_id, date, start_time, end_time):
+        """Holds a companion's time range for a while, atomically."""
+        pass
+
+    @abstractmethod
+    def release_hold(self, customer, token):
+        """Releases a customer's hold before it expires."""
+        pass
+
+
+class ReservationRepository(AbstractReservationRepository):
+    """
+    Concrete repository that implements AbstractReservationRepository using Django ORM.
+
+    The reservations and holds of a companion are serialized on its row,
+    through Companion.bookingVersion:
+
+    - "lock": the transaction starts by incrementing the version. The
+      UPDATE takes the row lock (the database write lock on SQLite) before
+      anything is read, so the overlap check runs alone, and a transaction
+      waits for a single lock, which cannot deadlock.
+    - "optimistic": the version is read along with the overlap check and
+      only incremented if unchanged, before the insert. A transaction that
+      lost the race raises StaleBookingVersion to be retried.
+
+    A range is free when it overlaps no confirmed reservation and no hold of
+    another customer. The customer's own holds of the range are released
+    when it is booked or held again.
+    """
+
+    def __init__(self, model=Reservation, locking=None, hold_store=hold_store):
+        self.model = model
+        self.locking = locking or settings.RESERVATION_LOCKING
+        self.hold_store = hold_store
+
+    def _own_holds(self, customer, companion_id, date, starts_at, ends_at):
+        return [
+            hold
+            for hold in self.hold_store.overlapping(date, starts_at, ends_at, companion_id)
+            if hold.customer_id == customer.pk
+        ]
+
+    def _is_free(self, customer, companion_id, date, starts_at, ends_at):
+        booked = self.model.objects.filter(
+            idCompanion_id=companion_id,
+            state="confirmed",
+            startsAt__lt=ends_at,
+            endsAt__gt=starts_at,
+        ).exists()
+        return not booked and all(
+            hold.customer_id == customer.pk
+            for hold in self.hold_store.overlapping(date, starts_at, ends_at, companion_id)
+        )
+
+    def _is_available(self, companion_id, date, starts_at, ends_at):
+        return self._availability_trees([companion_id], date, date)[companion_id].covers(
+            starts_at, ends_at
+        )
+
+    def _claim(self, customer, companion_id, date, starts_at, ends_at):
+        """
+        Takes the companion's booking lock and checks the range is within its
+        availabilities and free. Must run in a transaction.
+        """
+        companions = Companion.objects.filter(
+            idCompanion=companion_id, stateAvailability="available"
+        )
+        if self.locking == "optimistic":
+            version = companions.values_list("bookingVersion", flat=True).first()
+            if version is None:
+                raise ValueError("The companion cannot be booked.")
+            if not self._is_available(companion_id, date, starts_at, ends_at):
+                raise ValueError("The companion is not available at this time.")
+            if not self._is_free(customer, companion_id, date, starts_at, ends_at):
+                raise ValueError("The companion is already booked at this time.")
+            if not companions.filter(bookingVersion=version).update(
+                bookingVersion=F("bookingVersion") + 1
+            ):
+                raise StaleBookingVersion(f"Companion {companion_id} was booked meanwhile.")
+        else:
+            if not companions.update(bookingVersion=F("bookingVersion") + 1):
+                raise ValueError("The companion cannot be booked.")
+            if not self._is_available(companion_id, date, starts_at, ends_at):
+                raise ValueError("The companion is not available at this time.")
+            if not self._is_free(customer, companion_id, date, starts_at, ends_at):
+                raise ValueError("The companion is already booked at this time.")
+
+    def create(self, customer, companion_id, date, start_time, end_time):
+        """
+        Implements the method to book a companion's time range.
+
+        Args:
+            customer (Customer): The customer booking.
+            companion_id (int): ID of the companion.
+            date (date): Local date of the reservation.
+            start_time (time): Local start time.
+            end_time (time): Local end time.
+
+        Returns:
+            Reservation: The confirmed reservation.
+
+        Raises:
+            ValueError: If the companion cannot be booked, is not available, or is
+                already booked or held at this time.
+            StaleBookingVersion: If another reservation of the companion won the race.
+            OperationalError: If the database gave up waiting for a lock.
+        """
+        starts_at, ends_at = to_utc_range(date, start_time, end_time)
+        with transaction.atomic():
+            self._claim(customer, companion_id, date, starts_at, ends_at)
+            reservation = self.model.objects.create(
+                idCustomer=customer,
+                idCompanion_id=companion_id,
+                date=date,
+                startTime=start_time,
+                endTime=end_time,
+            )
+            for hold in self._own_holds(customer, companion_id, date, starts_at, ends_at):
+                self.hold_store.release(hold.token)
+            return reservation
+
+    def _lock_companions(self, companion_ids):
+        """
+        Takes the booking locks of the companions of a batch, in ID order so
+        two batches cannot deadlock. Must run in a transaction.
+
+        Returns:
+            dict: Booking version by ID of the available companions, the
+            version read with "optimistic" locking, None with "lock".
+        """
+        companions = Companion.objects.filter(stateAvailability="available")
+        if self.locking == "optimistic":
+            return dict(
+                companions.filter(idCompanion__in=companion_ids).values_list(
+                    "idCompanion", "bookingVersion"
+                )
+            )
+        return {
+            companion_id: None
+            for companion_id in sorted(companion_ids)
+            if companions.filter(idCompanion=companion_id).update(
+                bookingVersion=F("bookingVersion") + 1
+            )
+        }
+
+    def _availability_trees(self, companion_ids, first_date, last_date):
+        """
+        Loads the availabilities of the companions between two dates, with
+        one query for the one-off availabilities and one for the rules.
+
+        Returns:
+            dict: IntervalTree of the UTC availability ranges by companion ID.
+        """
+        one_offs, rules = defaultdict(list), defaultdict(list)
+        for one_off in TimeAvailability.objects.filter(
+            idCompanion__in=companion_ids, date__range=(first_date, last_date)
+        ):
+            one_offs[one_off.idCompanion_id].append(one_off)
+        for rule in RecurringAvailability.objects.filter(
+            Q(validUntil__isnull=True) | Q(validUntil__gte=first_date),
+            idCompanion__in=companion_ids,
+            validFrom__lte=last_date,
+        ).prefetch_related("recurringavailabilityexception_set"):
+            rules[rule.idCompanion_id].append(rule)
+
+        trees = {}
+        for companion_id in companion_ids:
+            skipped_dates = {
+                rule.pk: {
+                    exception.date
+                    for exception in rule.recurringavailabilityexception_set.all()
+                }
+                for rule in rules[companion_id]
+            }
+            slots = expand(
+                rules[companion_id], first_date, last_date, one_offs[companion_id], skipped_dates
+            )
+            trees[companion_id] = IntervalTree(
+                (*to_utc_range(slot.date, slot.startTime, slot.endTime), None)
+                for slot in slots
+                if slot.startTime is not None
+                and slot.endTime is not None
+                and slot.startTime < slot.endTime
+            )
+        return trees
+
+    def _busy_trees(self, companion_ids, first_date, last_date, starts_at, ends_at):
+        """
+        Loads the confirmed reservations and active holds of the companions
+        overlapping a UTC range, with one query each.
+
+        Returns:
+            dict: IntervalTree of the busy ranges by companion ID, valued with
+            the Hold, or None for a reservation.
+        """
+        trees = {companion_id: IntervalTree() for companion_id in companion_ids}
+        for companion_id, start, end in self.model.objects.filter(
+            idCompanion__in=companion_ids,
+            state="confirmed",
+            startsAt__lt=ends_at,
+            endsAt__gt=starts_at,
+            startsAt__gt=starts_at - MAX_RESERVATION_LENGTH,
+        ).values_list("idCompanion", "startsAt", "endsAt"):
+            trees[companion_id].add(start, end)
+        for hold in self.hold_store.between(
+            first_date, last_date, starts_at, ends_at, companion_ids
+        ):
+            trees[hold.companion_id].add(hold.starts_at, hold.ends_at, hold)
+        return trees
+
+    def create_many(self, customer, slots, on_booked=None):
+        """
+        Implements the method to book the free slots of a batch.
+
+        The availabilities, reservations and holds of the companions are read
+        once for the whole span of the batch, and every slot is checked
+        against them in memory. Each accepted slot is added to the busy
+        ranges, so a later slot overlapping it is rejected. The accepted
+        slots are inserted with one bulk_create in the transaction holding
+        the companions' booking locks.
+
+        Args:
+            customer (Customer): The customer booking.
+            slots (list): RequestedSlot tuples.
+            on_booked (callable): Called with the results before the
+                transaction commits, so the writes depending on the bookings
+                commit or roll back with them.
+
+        Returns:
+            list: One SlotResult per slot, in the order of the slots.
+
+        Raises:
+            StaleBookingVersion: If another reservation of a companion won the race.
+            OperationalError: If the database gave up waiting for a lock.
+        """
+        ranges = [to_utc_range(slot.date, slot.start_time, slot.end_time) for slot in slots]
+        companion_ids = sorted({slot.companion_id for slot in slots})
+        first_date = min(slot.date for slot in slots)
+        last_date = max(slot.date for slot in slots)
+        starts_at = min(start for start, _ in ranges)
+        ends_at = max(end for _, end in ranges)
+
+        with transaction.atomic():
+            versions = self._lock_companions(companion_ids)
+            available = self._availability_trees(companion_ids, first_date, last_date)
+            busy = self._busy_trees(companion_ids, first_date, last_date, starts_at, ends_at)
+
+            results, own_holds = [], []
+            for slot, (start, end) in zip(slots, ranges):
+                if slot.companion_id not in versions:
+                    results.append(SlotResult(slot, None, "The companion cannot be booked."))
+                    continue
+                if not available[slot.companion_id].covers(start, end):
+                    results.append(
+                        SlotResult(slot, None, "The companion is not available at this time.")
+                    )
+                    continue
+                overlaps = [
+                    value for _, _, value in busy[slot.companion_id].overlapping(start, end)
+                ]
+                if any(isinstance(value, RequestedSlot) for value in overlaps):
+                    results.append(
+                        SlotResult(slot, None, "The slot overlaps another slot of the batch.")
+                    )
+                    continue
+                if any(
+                    not isinstance(value, Hold) or value.customer_id != customer.pk
+                    for value in overlaps
+                ):
+                    results.append(
+                        SlotResult(slot, None, "The companion is already booked at this time.")
+                    )
+                    continue
+                own_holds += overlaps
+                # Later slots of the batch must not overlap an accepted one.
+                busy[slot.companion_id].add(start, end, slot)
+                reservation = self.model(
+                    idCustomer=customer,
+                    idCompanion_id=slot.companion_id,
+                    date=slot.date,
+                    startTime=slot.start_time,
+                    endTime=slot.end_time,
+                    # bulk_create does not call save(), which sets them.
+                    startsAt=start,
+                    endsAt=end,
+                )
+                results.append(SlotResult(slot, reservation, None))
+
+            reservations = [result.reservation for result in results if result.reservation]
+            if not reservations:
+                if on_booked is not None:
+                    on_booked(results)
+                return results
+            if self.locking == "optimistic":
+                for companion_id in sorted({r.idCompanion_id for r in reservations}):
+                    if not Companion.objects.filter(
+                        idCompanion=companion_id, bookingVersion=versions[companion_id]
+                    ).update(bookingVersion=F("bookingVersion") + 1):
+                        raise StaleBookingVersion(
+                            f"Companion {companion_id} was booked meanwhile."
+                        )
+
+            self.model.objects.bulk_create(reservations)
+            if any(reservation.pk is None for reservation in reservations):
+                # The database does not return the IDs of bulk inserts (MySQL).
+                ids = {
+                    (companion_id, start): pk
+                    for pk, companion_id, start in self.model.objects.filter(
+                        idCustomer=customer,
+                        idCompanion__in=companion_ids,
+                        state="confirmed",
+                        startsAt__in=[r.startsAt for r in reservations],
+                    ).values_list("pk", "idCompanion", "startsAt")
+                }
+                for reservation in reservations:
+                    reservation.pk = ids[(reservation.idCompanion_id, reservation.startsAt)]
+            if on_booked is not None:
+                on_booked(results)
+            for hold in {hold.token: hold for hold in own_holds}.values():
+                self.hold_store.release(hold.token)
+            return results
+
+    def hold(self, customer, companion_id, date, start_time, end_time):
+        """
+        Implements the method to hold a companion's time range.
+
+        Args:
+            customer (Customer): The customer checking out.
+            companion_id (int): ID of the companion.
+            date (date): Local date of the range.
+            start_time (time): Local start time.
+            end_time (time): Local end time.
+
+        Returns:
+            Hold: The hold, with its token and expiry.
+
+        Raises:
+            ValueError: If the companion cannot be booked, is not available, or is
+                already booked or held at this time.
+            StaleBookingVersion: If another reservation of the companion won the race.
+            OperationalError: If the database gave up waiting for a lock.
+        """
+        starts_at, ends_at = to_utc_range(date, start_time, end_time)
+        with transaction.atomic():
+            self._claim(customer, companion_id, date, starts_at, ends_at)
+            for hold in self._own_holds(customer, companion_id, date, starts_at, ends_at):
+                self.hold_store.release(hold.token)
+            return self.hold_store.add(customer.pk, companion_id, date, start_time, end_time)
+
+    def release_hold(self, customer, token):
+        """
+        Implements the method to release a customer's hold.
+
+        Returns:
+            bool: Whether the customer had this hold.
+        """
+        try:
+            return self.hold_store.release(token, customer.pk)
+        except Exception as e:
+            # Log or handle the unexpected exception here
+            raise RuntimeError(f"An error occurred while releasing the hold: {str(e)}")
+
+
+class AbstractCareRequestRepository(ABC):
+    """
+    Interface for the care request repository.
+    Defines the abstract methods that must be implemented by concrete repositories.
+    """
+
+    @abstractmethod
+    def get_pending(self, ids=None, dates=None):
+        """Gets the pending care requests to assign."""
+        pass
+
+    @abstractmethod
+    def save_assigned(self, requests):
+        """Saves the companions and reservations assigned to care requests."""
+        pass
+
+
+class CareRequestRepository(AbstractCareRequestRepository):
+    """
+    Concrete repository that implements AbstractCareRequestRepository using Django ORM.
+    """
+
+    def __init__(self, model=CareRequest):
+        self.model = model
+
+    def get_pending(self, ids=None, dates=None):
+        """
+        Implements the method to retrieve the pending care requests to assign.
+
+        Args:
+            ids (list): Only these requests, all by default.
+            dates (list): Only the requests of these dates, all by default.
+
+        Returns:
+            list: Pending requests from today on, with their customer's user.
+        """
+        try:
+            requests = self.model.objects.filter(
+                state="pending", date__gte=timezone.localdate()
+            ).select_related("idCustomer__idUser")
+            if ids is not None:
+                requests = requests.filter(pk__in=ids)
+            if dates is not None:
+                requests = requests.filter(date__in=dates)
+            return list(requests.order_by("date", "pk"))
+        except Exception as e:
+            # Log or handle the unexpected exception here
+            raise RuntimeError(f"An error occurred while getting care requests: {str(e)}")
+
+    def save_assigned(self, requests):
+        """
+        Implements the method to save the assignments of care requests.
+
+        The requests are locked first, so an assignment run saving them
+        concurrently waits, then finds them no longer pending. Must run in
+        the booking transaction, which it rolls back in that case.
+
+        Args:
+            requests (list): CareRequest objects with their state, companion
+                and reservation set.
+
+        Raises:
+            RuntimeError: If some of the requests are no longer pending.
+        """
+        try:
+            pending = set(
+                self.model.objects.select_for_update()
+                .filter(pk__in=[request.pk for request in requests], state="pending")
+                .values_list("pk", flat=True)
+            )
+            if len(pending) == len(requests):
+                self.model.objects.bulk_update(
+                    requests, ["state", "idCompanion", "idReservation"], batch_size=500
+                )
+        except Exception as e:
+            # Log or handle the unexpected exception here
+            raise RuntimeError(f"An error occurred while saving care requests: {str(e)}")
+        if len(pending) < len(requests):
+            raise RuntimeError("Some care requests were assigned by another run.")
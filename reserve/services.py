@@ -0,0 +1,429 @@
+import base64
+import json
+import logging
+import random
+import time
+from abc import ABC, abstractmethod
+from decimal import Decimal
+from django.conf import settings
+from django.db import OperationalError
+from authentication.geo import geocode
+from .assignment import assign
+from .booking import RequestedSlot
+from .repositories import (
+    AbstractCareRequestRepository,
+    AbstractCompanionNearbyRepository,
+    AbstractCompanionRecommendationRepository,
+    AbstractCompanionSearchRepository,
+    AbstractReservationRepository,
+    StaleBookingVersion,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 20
+DEFAULT_NEARBY_RADIUS_KM = 10
+
+
+class AbstractCompanionSearchService(ABC):
+    @abstractmethod
+    def search(self, criteria, cursor=None, limit=DEFAULT_PAGE_SIZE):
+        """Searches one page of companions."""
+        pass
+
+
+class CompanionSearchService(AbstractCompanionSearchService):
+    """
+    Service to search and rank companions for a reservation.
+
+    Pages are keyset paginated: the cursor holds the sort key of the last
+    companion of the page, so every page costs the same however deep it is.
+
+    With a companion index the ranking runs in memory and only the page is
+    read from the database; without one the repository ranks in SQL.
+    """
+
+    def __init__(
+        self,
+        companion_search_repository: AbstractCompanionSearchRepository,
+        companion_index=None,
+    ):
+        self.companion_search_repository = companion_search_repository
+        self.companion_index = companion_index
+
+    @staticmethod
+    def encode_cursor(key):
+        matches, rate, companion_id = key
+        return base64.urlsafe_b64encode(
+            json.dumps([matches, str(rate), companion_id]).encode()
+        ).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Raises:
+            ValueError: If the cursor was not produced by encode_cursor.
+        """
+        try:
+            matches, rate, companion_id = json.loads(base64.urlsafe_b64decode(cursor))
+            return int(matches), Decimal(rate), int(companion_id)
+        except Exception:
+            raise ValueError("Invalid cursor.")
+
+    def search(self, criteria, cursor=None, limit=DEFAULT_PAGE_SIZE):
+        """
+        Searches one page of companions.
+
+        Args:
+            criteria (dict): Cleaned data of a CompanionSearchForm.
+            cursor (str): The `next` cursor of the previous page, if any.
+            limit (int): Page size.
+
+        Returns:
+            dict: `results`, the ranked companions, and `next`, the cursor of
+            the following page or None on the last page.
+
+        Raises:
+            ValueError: If the cursor is invalid.
+        """
+        after = self.decode_cursor(cursor) if cursor else None
+        # One extra row tells whether there is a next page.
+        if self.companion_index is not None:
+            keys = self.companion_index.get().search(criteria, after, limit + 1)
+            results = self.companion_search_repository.get_page(keys[:limit], criteria)
+        else:
+            companions = self.companion_search_repository.search(criteria, after, limit + 1)
+            keys = [
+                (companion.matches, companion.hourlyRate, companion.idCompanion)
+                for companion in companions
+            ]
+            results = companions[:limit]
+        return {
+            "results": results,
+            "next": self.encode_cursor(keys[limit - 1]) if len(keys) > limit else None,
+        }
+
+
+class AbstractCompanionRecommendationService(ABC):
+    @abstractmethod
+    def get_recommendations(self, customer, limit=None):
+        """Gets the companions recommended to a customer."""
+        pass
+
+
+class CompanionRecommendationService(AbstractCompanionRecommendationService):
+    """
+    Service to read the companions recommended to customers. They are
+    computed ahead of time by reserve.recommendations.
+    """
+
+    def __init__(
+        self, companion_recommendation_repository: AbstractCompanionRecommendationRepository
+    ):
+        self.companion_recommendation_repository = companion_recommendation_repository
+
+    def get_recommendations(self, customer, limit=None):
+        """
+        Gets the companions recommended to a customer.
+
+        Args:
+            customer (Customer): The customer.
+            limit (int): Maximum number of recommendations, RECOMMENDATIONS_TOP_K by default.
+
+        Returns:
+            list: CompanionRecommendation instances with their companion, best first.
+        """
+        return self.companion_recommendation_repository.get_by_customer(
+            customer, limit or settings.RECOMMENDATIONS_TOP_K
+        )
+
+
+class AbstractCompanionNearbyService(ABC):
+    @abstractmethod
+    def nearest(self, radius_km, location=None, user=None, limit=DEFAULT_PAGE_SIZE):
+        """Gets the available companions nearest to a location or a user."""
+        pass
+
+
+class CompanionNearbyService(AbstractCompanionNearbyService):
+    """
+    Service to find the available companions within a distance, nearest
+    first. Places are resolved with the offline gazetteer.
+    """
+
+    def __init__(self, companion_nearby_repository: AbstractCompanionNearbyRepository):
+        self.companion_nearby_repository = companion_nearby_repository
+
+    def nearest(self, radius_km, location=None, user=None, limit=DEFAULT_PAGE_SIZE):
+        """
+        Gets the available companions within a distance of a place.
+
+        Args:
+            radius_km (float): Maximum distance, in km.
+            location (str): Place to search around.
+            user (User): User to search around when no location is given.
+            limit (int): Maximum number of companions.
+
+        Returns:
+            list: Companions with a `distanceKm` attribute, nearest first.
+
+        Raises:
+            ValueError: If the place is not in the gazetteer.
+        """
+        if location:
+            point = geocode(location)
+        elif user is not None and user.latitude is not None:
+            point = (user.latitude, user.longitude)
+        else:
+            point = None
+        if point is None:
+            raise ValueError("The location is not a known municipality.")
+        return self.companion_nearby_repository.nearest(*point, radius_km, limit)
+
+
+class AbstractReservationService(ABC):
+    @abstractmethod
+    def reserve(self, customer, companion_id, date, start_time, end_time):
+        """Books a companion's time range."""
+        pass
+
+    @abstractmethod
+    def reserve_many(self, customer, slots, on_booked=None):
+        """Books the free slots of a batch."""
+        pass
+
+    @abstractmethod
+    def hold(self, customer, companion_id, date, start_time, end_time):
+        """Holds a companion's time range during a checkout."""
+        pass
+
+    @abstractmethod
+    def release_hold(self, customer, token):
+        """Releases a hold before it expires."""
+        pass
+
+
+class ReservationService(AbstractReservationService):
+    """
+    Service to hold and book companions.
+
+    Every attempt runs in its own transaction and an attempt that lost a
+    race is retried from scratch, so reserve(), reserve_many() and hold() must
+    not be called inside an atomic block.
+    """
+
+    def __init__(
+        self,
+        reservation_repository: AbstractReservationRepository,
+        availability_engine=None,
+    ):
+        self.reservation_repository = reservation_repository
+        self.availability_engine = availability_engine
+
+    def _claim(self, claim, customer, companion_id, date, start_time, end_time):
+        # The engine only spares the lock to slots it already knows are not
+        # available; the repository checks availability again under the lock.
+        if self.availability_engine is not None and not self.availability_engine.is_free(
+            companion_id, date, start_time, end_time
+        ):
+            raise ValueError("The companion is not available at this time.")
+        return self._retry(claim, customer, companion_id, date, start_time, end_time)
+
+    def _retry(self, attempt_once, *args):
+        attempts = settings.RESERVATION_MAX_ATTEMPTS
+        for attempt in range(attempts):
+            try:
+                return attempt_once(*args)
+            except (StaleBookingVersion, OperationalError):
+                if attempt + 1 == attempts:
+                    raise RuntimeError(
+                        "The companion is being booked by other customers, please try again."
+                    )
+                # Random backoff, so the losers of a race do not collide again.
+                time.sleep(random.uniform(0, settings.RESERVATION_RETRY_DELAY * 2**attempt))
+
+    def reserve(self, customer, companion_id, date, start_time, end_time):
+        """
+        Books a companion's time range.
+
+        Args:
+            customer (Customer): The customer booking.
+            companion_id (int): ID of the companion.
+            date (date): Local date of the reservation.
+            start_time (time): Local start time.
+            end_time (time): Local end time.
+
+        Returns:
+            Reservation: The confirmed reservation.
+
+        Raises:
+            ValueError: If the companion is not available, or already booked or held at this time.
+            RuntimeError: If the booking kept losing races with other bookings.
+        """
+        return self._claim(
+            self.reservation_repository.create, customer, companion_id, date, start_time, end_time
+        )
+
+    def reserve_many(self, customer, slots, on_booked=None):
+        """
+        Books the free slots of a batch, such as the visits of a care plan,
+        in one transaction. Slots that are not available, already booked or
+        held, or overlap an earlier slot of the batch are rejected, the
+        others are booked.
+
+        Args:
+            customer (Customer): The customer booking.
+            slots (list): RequestedSlot tuples.
+            on_booked (callable): Called with the results in the transaction
+                of the bookings, see ReservationRepository.create_many. It
+                runs again if the attempt is retried.
+
+        Returns:
+            list: One SlotResult per slot, in the order of the slots, with
+            the reservation of a booked slot or the reason it was rejected.
+
+        Raises:
+            RuntimeError: If the booking kept losing races with other bookings.
+        """
+        if not slots:
+            return []
+        return self._retry(self.reservation_repository.create_many, customer, slots, on_booked)
+
+    def hold(self, customer, companion_id, date, start_time, end_time):
+        """
+        Holds a companion's time range for RESERVATION_HOLD_TTL seconds, while
+        the customer checks out. Meanwhile no other customer can book or hold it.
+
+        Args:
+            customer (Customer): The customer checking out.
+            companion_id (int): ID of the companion.
+            date (date): Local date of the range.
+            start_time (time): Local start time.
+            end_time (time): Local end time.
+
+        Returns:
+            Hold: The hold, with its token and expiry.
+
+        Raises:
+            ValueError: If the companion is not available, or already booked or held at this time.
+            RuntimeError: If the hold kept losing races with other bookings.
+        """
+        return self._claim(
+            self.reservation_repository.hold, customer, companion_id, date, start_time, end_time
+        )
+
+    def release_hold(self, customer, token):
+        """
+        Releases a hold before it expires.
+
+        Args:
+            customer (Customer): The customer holding the range.
+            token (str): Token of the hold.
+
+        Raises:
+            ValueError: If the customer has no such hold.
+        """
+        if not self.reservation_repository.release_hold(customer, token):
+            raise ValueError("The hold does not exist or has expired.")
+
+
+class AbstractCareAssignmentService(ABC):
+    @abstractmethod
+    def assign_pending(self, ids=None, dates=None, dry_run=False):
+        """Assigns companions to the pending care requests."""
+        pass
+
+
+class CareAssignmentService(AbstractCareAssignmentService):
+    """
+    Service to assign companions to pending care requests in batches (see
+    reserve.assignment), booking a reservation for every assigned request.
+    """
+
+    def __init__(
+        self,
+        care_request_repository: AbstractCareRequestRepository,
+        reservation_service: AbstractReservationService,
+    ):
+        self.care_request_repository = care_request_repository
+        self.reservation_service = reservation_service
+
+    def assign_pending(self, ids=None, dates=None, dry_run=False):
+        """
+        Assigns the companions of least total cost to the pending care
+        requests, and books them.
+
+        The reservations of each customer are booked as one batch, and the
+        customer's requests are marked assigned in the same transaction. A
+        request whose companion was booked meanwhile by someone else stays
+        pending, and so do the requests of a customer whose batch could not
+        be booked, or had a request assigned meanwhile by another run.
+
+        Args:
+            ids (list): Only these requests, all by default.
+            dates (list): Only the requests of these dates, all by default.
+            dry_run (bool): Find the assignments without booking them.
+
+        Returns:
+            tuple: (assignments, unassigned): the Assignment tuples booked
+            (or found, in a dry run), and the requests left pending.
+        """
+        requests = self.care_request_repository.get_pending(ids, dates)
+        assignments, unassigned = assign(requests)
+        if dry_run:
+            return assignments, unassigned
+
+        booked = []
+        by_customer = {}
+        for assignment in assignments:
+            by_customer.setdefault(assignment.request.idCustomer_id, []).append(assignment)
+        for customer_assignments in by_customer.values():
+            customer = customer_assignments[0].request.idCustomer
+            slots = [
+                RequestedSlot(
+                    assignment.companion_id,
+                    assignment.request.date,
+                    assignment.request.startTime,
+                    assignment.request.endTime,
+                )
+                for assignment in customer_assignments
+            ]
+            try:
+                results = self.reservation_service.reserve_many(
+                    customer,
+                    slots,
+                    on_booked=lambda results, assignments=customer_assignments: (
+                        self._save_assigned(assignments, results)
+                    ),
+                )
+            except RuntimeError:
+                # Nothing of this customer was committed, the others go on.
+                logger.exception("Could not book the care requests of customer %s", customer.pk)
+                for assignment in customer_assignments:
+                    self._unassign(assignment.request)
+                results = [None] * len(customer_assignments)
+            for assignment, result in zip(customer_assignments, results):
+                if result is None or result.reservation is None:
+                    unassigned.append(assignment.request)
+                else:
+                    booked.append(assignment)
+        return booked, unassigned
+
+    def _save_assigned(self, assignments, results):
+        """Marks the requests whose visit was booked, in the booking transaction."""
+        assigned = []
+        for assignment, result in zip(assignments, results):
+            request = assignment.request
+            if result.reservation is None:
+                # A retried attempt may have booked it the first time.
+                self._unassign(request)
+                continue
+            request.state = "assigned"
+            request.idCompanion_id = assignment.companion_id
+            request.idReservation = result.reservation
+            assigned.append(request)
+        self.care_request_repository.save_assigned(assigned)
+
+    @staticmethod
+    def _unassign(request):
+        request.state, request.idCompanion, request.idReservation = "pending", None, None
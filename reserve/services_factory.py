@@ -0,0 +1,60 @@
+from django.conf import settings
+from companion.availability import availability_engine
+from .matching import companion_index
+from .services import (
+    CareAssignmentService,
+    CompanionNearbyService,
+    CompanionRecommendationService,
+    CompanionSearchService,
+    ReservationService,
+)
+from .repositories import (
+    CareRequestRepository,
+    CompanionNearbyRepository,
+    CompanionRecommendationRepository,
+    CompanionSearchRepository,
+    ReservationRepository,
+)
+
+
+class ServiceFactory:
+    """
+    Factory to create instances of services with their associated repositories.
+    """
+
+    def get_service(self, service_type: str):
+        """
+        Returns the appropriate service based on the specified type.
+
+        Args:
+            service_type (str): The type of service to create.
+
+        Returns:
+            An instance of the requested service with its associated repository.
+
+        Raises:
+            ValueError: If the service_type is not supported.
+        """
+
+        services = {
+            "COMPANION_SEARCH": lambda: CompanionSearchService(
+                CompanionSearchRepository(),
+                companion_index if settings.COMPANION_SEARCH_IN_MEMORY else None,
+            ),
+            "COMPANION_RECOMMENDATION": lambda: CompanionRecommendationService(
+                CompanionRecommendationRepository()
+            ),
+            "COMPANION_NEARBY": lambda: CompanionNearbyService(CompanionNearbyRepository()),
+            "RESERVATION": lambda: ReservationService(
+                ReservationRepository(), availability_engine
+            ),
+            "CARE_ASSIGNMENT": lambda: CareAssignmentService(
+                CareRequestRepository(),
+                ReservationService(ReservationRepository(), availability_engine),
+            ),
+        }
+
+        if service_type not in services:
+            raise ValueError(f"The service type '{service_type}' is not supported.")
+
+        return services[service_type]()
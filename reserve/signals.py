@@ -0,0 +1,74 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from authentication.models import LanguageUser, User
+from companion.models import Companion, Skill
+from customer.models import Preference
+
+from .matching import companion_index
+from .models import CompanionRecommendation
+from .recommendations import recommendation_engine
+
+# User fields the companion index holds.
+INDEXED_USER_FIELDS = {"genre", "location", "latitude", "longitude"}
+
+
+@receiver(post_save, sender=Companion)
+@receiver(post_delete, sender=Companion)
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+@receiver(post_save, sender=LanguageUser)
+@receiver(post_delete, sender=LanguageUser)
+def invalidate_companion_index(sender, instance, **kwargs):
+    """Marks the companion index stale once the change is committed."""
+    transaction.on_commit(companion_index.invalidate)
+
+
+@receiver(post_save, sender=User)
+def invalidate_companion_index_for_user(sender, instance, update_fields=None, **kwargs):
+    """Logins and profile edits save the user too, only indexed fields count."""
+    if update_fields is not None and not INDEXED_USER_FIELDS & set(update_fields):
+        return
+    if Companion.objects.filter(idUser=instance).exists():
+        transaction.on_commit(companion_index.invalidate)
+
+
+@receiver(post_save, sender=Preference)
+@receiver(post_delete, sender=Preference)
+def refresh_customer_recommendations(sender, instance, **kwargs):
+    """Recomputes the recommendations of a customer whose preferences changed."""
+    recommendation_engine.enqueue("customer", instance.idCustomer_id)
+
+
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+def refresh_skill_recommendations(sender, instance, **kwargs):
+    """Rescores a companion whose skills changed."""
+    recommendation_engine.enqueue("companion", instance.idCompanion_id)
+
+
+@receiver(post_save, sender=Companion)
+def refresh_companion_recommendations(sender, instance, update_fields=None, **kwargs):
+    """Only available companions are recommended."""
+    if update_fields is None or "stateAvailability" in update_fields:
+        recommendation_engine.enqueue("companion", instance.idCompanion)
+
+
+@receiver(pre_delete, sender=Companion)
+def remember_recommendation_holders(sender, instance, **kwargs):
+    """The deletion cascades to the recommendations, read their customers first."""
+    instance._recommendation_holders = list(
+        CompanionRecommendation.objects.filter(idCompanion=instance).values_list(
+            "idCustomer", flat=True
+        )
+    )
+
+
+@receiver(post_delete, sender=Companion)
+def remove_companion_recommendations(sender, instance, **kwargs):
+    """Rescores the customers a deleted companion was recommended to."""
+    recommendation_engine.enqueue("companion", instance.idCompanion)
+    recommendation_engine.enqueue_many(
+        "customer", getattr(instance, "_recommendation_holders", ())
+    )
@@ -3,4 +3,10 @@ from . import views
 
 urlpatterns = [
     path('home/', views.homeReserve, name='homeReserve'),
+    path('search/', views.companion_search, name='companionSearch'),
+    path('nearby/', views.companion_nearby, name='companionNearby'),
+    path('book/', views.book_companion, name='bookCompanion'),
+    path('book/batch/', views.book_companion_batch, name='bookCompanionBatch'),
+    path('hold/', views.hold_companion, name='holdCompanion'),
+    path('hold/<str:token>/release/', views.release_hold, name='releaseHold'),
 ]
\ No newline at end of file
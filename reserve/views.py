@@ -1,8 +1,301 @@
+import json
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render
+from django.views.decorators.http import require_GET, require_POST
+from authentication.photos import rendition_url
+from customer.services_factory import ServiceFactory as CustomerServiceFactory
+from .booking import RequestedSlot
+from .forms import CompanionNearbyForm, CompanionSearchForm, ReservationForm
+from .services import DEFAULT_NEARBY_RADIUS_KM, DEFAULT_PAGE_SIZE
+from .services_factory import ServiceFactory
+
+services_factory = ServiceFactory()
+companion_search_service = services_factory.get_service("COMPANION_SEARCH")
+companion_recommendation_service = services_factory.get_service("COMPANION_RECOMMENDATION")
+companion_nearby_service = services_factory.get_service("COMPANION_NEARBY")
+reservation_service = services_factory.get_service("RESERVATION")
+customer_service = CustomerServiceFactory().get_service("CUSTOMER")
+
+
+def _companion_json(companion, accepts_webp):
+    return {
+        "idCompanion": companion.idCompanion,
+        "names": companion.idUser.names,
+        "lastNames": companion.idUser.lastNames,
+        "genre": companion.idUser.genre,
+        "location": companion.idUser.location,
+        "hourlyRate": str(companion.hourlyRate),
+        "personalDescription": companion.personalDescription,
+        "profilePhoto": (
+            rendition_url(companion.idUser.profilePhoto, "card", accepts_webp)
+            if companion.idUser.profilePhoto
+            else settings.PROFILE_PHOTO_DEFAULT_URL
+        ),
+    }
+
 
 def homeReserve(request):
     return render(request, 'reserve/home_reserve.html', {'name_page': 'homeReserve'})
 
 
 def homePage(request):
-    return render(request, 'reserve/home_page.html', {'name_page': 'home'})
\ No newline at end of file
+    # Customers see the companions recommended from their preferences,
+    # computed ahead of time.
+    recommendations = []
+    if request.user.is_authenticated and request.session.get("user_type") == "customer":
+        customer = customer_service.get_customer_by_user(request.user)
+        if customer is not None:
+            recommendations = companion_recommendation_service.get_recommendations(customer)
+    return render(
+        request,
+        'reserve/home_page.html',
+        {'name_page': 'home', 'recommendations': recommendations},
+    )
+
+
+@require_GET
+def companion_search(request):
+    """
+    JSON endpoint searching companions for a reservation.
+
+    Query parameters are those of CompanionSearchForm: an availability
+    window (date, startTime, endTime), comma separated skills and languages,
+    free text `q` matched against skill descriptions, a minRate/maxRate
+    range, genre, location, and the cursor and limit of the page.
+
+    Returns:
+        JsonResponse: `results` and the `next` page cursor, or `errors` with
+        status 400 when the parameters are invalid.
+    """
+    form = CompanionSearchForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+
+    try:
+        page = companion_search_service.search(
+            form.cleaned_data,
+            form.cleaned_data["cursor"],
+            form.cleaned_data["limit"] or DEFAULT_PAGE_SIZE,
+        )
+    except ValueError as e:
+        return JsonResponse({"errors": {"cursor": [str(e)]}}, status=400)
+
+    accepts_webp = "image/webp" in request.headers.get("Accept", "")
+    results = [
+        {**_companion_json(companion, accepts_webp), "matches": companion.matches}
+        for companion in page["results"]
+    ]
+    return JsonResponse({"results": results, "next": page["next"]})
+
+
+@require_GET
+def companion_nearby(request):
+    """
+    JSON endpoint listing the available companions within a distance, nearest first.
+
+    Query parameters are those of CompanionNearbyForm: the `location` to
+    search around (the logged in user's location by default), `radiusKm`
+    and `limit`.
+
+    Returns:
+        JsonResponse: `results` with their `distanceKm`, or `errors` with
+        status 400 when the parameters are invalid or the place is unknown.
+    """
+    form = CompanionNearbyForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+
+    try:
+        companions = companion_nearby_service.nearest(
+            form.cleaned_data["radiusKm"] or DEFAULT_NEARBY_RADIUS_KM,
+            location=form.cleaned_data["location"],
+            user=request.user if request.user.is_authenticated else None,
+            limit=form.cleaned_data["limit"] or DEFAULT_PAGE_SIZE,
+        )
+    except ValueError as e:
+        return JsonResponse({"errors": {"location": [str(e)]}}, status=400)
+
+    accepts_webp = "image/webp" in request.headers.get("Accept", "")
+    results = [
+        {**_companion_json(companion, accepts_webp), "distanceKm": round(companion.distanceKm, 2)}
+        for companion in companions
+    ]
+    return JsonResponse({"results": results})
+
+
+@login_required
+@require_POST
+def book_companion(request):
+    """
+    JSON endpoint booking a companion's time range for the logged in customer.
+
+    Form fields are those of ReservationForm: idCompanion, date, startTime
+    and endTime.
+
+    Returns:
+        JsonResponse: The `idReservation` with status 201; `errors` with
+        status 400 when the fields are invalid, 403 when the user is not a
+        customer, or 409 when the companion cannot be booked at this time.
+    """
+    customer = customer_service.get_customer_by_user(request.user)
+    if customer is None:
+        return JsonResponse(
+            {"errors": {"__all__": ["Only customers can book companions."]}}, status=403
+        )
+
+    form = ReservationForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+
+    try:
+        reservation = reservation_service.reserve(
+            customer,
+            form.cleaned_data["idCompanion"],
+            form.cleaned_data["date"],
+            form.cleaned_data["startTime"],
+            form.cleaned_data["endTime"],
+        )
+    except (ValueError, RuntimeError) as e:
+        return JsonResponse({"errors": {"__all__": [str(e)]}}, status=409)
+
+    return JsonResponse({"idReservation": reservation.idReservation}, status=201)
+
+
+@login_required
+@require_POST
+def book_companion_batch(request):
+    """
+    JSON endpoint booking many time ranges at once for the logged in
+    customer, such as the visits of a care plan. Free slots are booked in
+    one transaction, the others are rejected.
+
+    The request body is JSON: {"slots": [...]}, each slot having the fields
+    of ReservationForm (idCompanion, date, startTime and endTime).
+
+    Returns:
+        JsonResponse: `results`, one per slot in order, each with `accepted`
+        and the `idReservation` or the `errors` of the slot; with status
+        201 when a slot was booked, or 409 when none was. `errors` with
+        status 400 when the body is invalid, 403 when the user is not a
+        customer, or 409 when the companions are too busy to be booked.
+    """
+    customer = customer_service.get_customer_by_user(request.user)
+    if customer is None:
+        return JsonResponse(
+            {"errors": {"__all__": ["Only customers can book companions."]}}, status=403
+        )
+
+    try:
+        slots = json.loads(request.body)["slots"]
+    except (ValueError, TypeError, KeyError):
+        slots = None
+    if not isinstance(slots, list) or not slots:
+        return JsonResponse({"errors": {"slots": ["Send a list of slots."]}}, status=400)
+    limit = settings.RESERVATION_BATCH_MAX_SLOTS
+    if len(slots) > limit:
+        return JsonResponse(
+            {"errors": {"slots": [f"At most {limit} slots can be booked at once."]}}, status=400
+        )
+
+    results, requested = [], []
+    for slot in slots:
+        form = ReservationForm(slot if isinstance(slot, dict) else {})
+        if form.is_valid():
+            requested.append(
+                RequestedSlot(
+                    form.cleaned_data["idCompanion"],
+                    form.cleaned_data["date"],
+                    form.cleaned_data["startTime"],
+                    form.cleaned_data["endTime"],
+                )
+            )
+            results.append(None)
+        else:
+            results.append({"accepted": False, "errors": form.errors})
+
+    try:
+        booked = iter(reservation_service.reserve_many(customer, requested))
+    except RuntimeError as e:
+        return JsonResponse({"errors": {"__all__": [str(e)]}}, status=409)
+
+    for index, result in enumerate(results):
+        if result is None:
+            slot = next(booked)
+            results[index] = (
+                {"accepted": True, "idReservation": slot.reservation.idReservation}
+                if slot.reservation
+                else {"accepted": False, "errors": {"__all__": [slot.error]}}
+            )
+    accepted = any(result["accepted"] for result in results)
+    return JsonResponse({"results": results}, status=201 if accepted else 409)
+
+
+@login_required
+@require_POST
+def hold_companion(request):
+    """
+    JSON endpoint holding a companion's time range while the logged in
+    customer checks out. Nobody else can book or hold the range until the
+    hold expires, is released, or the customer books it.
+
+    Form fields are those of ReservationForm: idCompanion, date, startTime
+    and endTime.
+
+    Returns:
+        JsonResponse: The hold `token` and its `expiresAt` with status 201;
+        `errors` with status 400 when the fields are invalid, 403 when the
+        user is not a customer, or 409 when the companion cannot be held at
+        this time.
+    """
+    customer = customer_service.get_customer_by_user(request.user)
+    if customer is None:
+        return JsonResponse(
+            {"errors": {"__all__": ["Only customers can hold companions."]}}, status=403
+        )
+
+    form = ReservationForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+
+    try:
+        hold = reservation_service.hold(
+            customer,
+            form.cleaned_data["idCompanion"],
+            form.cleaned_data["date"],
+            form.cleaned_data["startTime"],
+            form.cleaned_data["endTime"],
+        )
+    except (ValueError, RuntimeError) as e:
+        return JsonResponse({"errors": {"__all__": [str(e)]}}, status=409)
+
+    return JsonResponse({"token": hold.token, "expiresAt": hold.expires_at}, status=201)
+
+
+@login_required
+@require_POST
+def release_hold(request, token):
+    """
+    JSON endpoint releasing a hold of the logged in customer.
+
+    Returns:
+        JsonResponse: Empty with status 204; `errors` with status 403 when
+        the user is not a customer, or 404 when the customer has no such
+        hold.
+    """
+    customer = customer_service.get_customer_by_user(request.user)
+    if customer is None:
+        return JsonResponse(
+            {"errors": {"__all__": ["Only customers can release holds."]}}, status=403
+        )
+
+    try:
+        reservation_service.release_hold(customer, token)
+    except ValueError as e:
+        return JsonResponse({"errors": {"__all__": [str(e)]}}, status=404)
+    except RuntimeError as e:
+        return JsonResponse({"errors": {"__all__": [str(e)]}}, status=409)
+
+    return HttpResponse(status=204)
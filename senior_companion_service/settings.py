@@ -82,7 +82,32 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "senior_companion_service.wsgi.application"
 
-SESSION_ENGINE = "django.contrib.sessions.backends.db"
+# Local memory by default; point it to a shared backend (Redis, Memcached)
+# when running several workers so limits and caches are shared.
+CACHES = {
+    "default": {
+        "BACKEND": config(
+            "CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": config("CACHE_LOCATION", default="senior-companion-service"),
+    }
+}
+
+# Sessions are read from a local LRU and the cache, and updates are written to
+# the database in batches by a background thread (see authentication/session_store.py).
+# With a per-process cache, such as the default, they go straight to the database.
+SESSION_ENGINE = "authentication.session_store"
+SESSION_LOCAL_CACHE_SIZE = config("SESSION_LOCAL_CACHE_SIZE", default=1000, cast=int)
+# Entries are checked against the version in the cache. 0 disables the LRU.
+SESSION_LOCAL_CACHE_TTL = config("SESSION_LOCAL_CACHE_TTL", default=2, cast=float)
+# Seconds between database flushes. 0 writes every session synchronously.
+SESSION_WRITE_BEHIND_INTERVAL = config(
+    "SESSION_WRITE_BEHIND_INTERVAL", default=2, cast=float
+)
+SESSION_WRITE_BEHIND_BATCH = config("SESSION_WRITE_BEHIND_BATCH", default=500, cast=int)
+# Expired sessions are deleted every SESSION_SWEEP_INTERVAL seconds, in chunks.
+SESSION_SWEEP_INTERVAL = config("SESSION_SWEEP_INTERVAL", default=600, cast=int)
+SESSION_SWEEP_CHUNK = config("SESSION_SWEEP_CHUNK", default=1000, cast=int)
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
@@ -117,14 +142,43 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 PASSWORD_HASHERS = [
-    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "authentication.hashers.BCryptSHA256PasswordHasher",
 ]
 
+# bcrypt cost factor for new hashes. Existing hashes are moved to this value
+# on the next successful login. Use `manage.py calibrate_bcrypt` to pick it.
+BCRYPT_ROUNDS = config("BCRYPT_ROUNDS", default=12, cast=int)
+
 AUTHENTICATION_BACKENDS = [
     "django.contrib.auth.backends.ModelBackend",
     "authentication.backends.EmailPasswordAuthBackend",
 ]
 
+# Seconds the authentication backend keeps a loaded user (with its
+# customer/companion row) in the cache.
+USER_LOADER_TTL = config("USER_LOADER_TTL", default=60, cast=int)
+
+# Size of the thread pool that runs bcrypt during login.
+BCRYPT_MAX_WORKERS = config("BCRYPT_MAX_WORKERS", default=4, cast=int)
+
+# Login shield: token buckets per email and per client IP checked before any
+# user lookup or bcrypt work, plus a short-lived cache of unknown emails.
+LOGIN_SHIELD_CACHE = "default"
+LOGIN_SHIELD_EMAIL_CAPACITY = config("LOGIN_SHIELD_EMAIL_CAPACITY", default=5, cast=int)
+LOGIN_SHIELD_EMAIL_REFILL_PER_MINUTE = config(
+    "LOGIN_SHIELD_EMAIL_REFILL_PER_MINUTE", default=1, cast=float
+)
+LOGIN_SHIELD_IP_CAPACITY = config("LOGIN_SHIELD_IP_CAPACITY", default=30, cast=int)
+LOGIN_SHIELD_IP_REFILL_PER_MINUTE = config(
+    "LOGIN_SHIELD_IP_REFILL_PER_MINUTE", default=10, cast=float
+)
+LOGIN_SHIELD_UNKNOWN_EMAIL_TTL = config(
+    "LOGIN_SHIELD_UNKNOWN_EMAIL_TTL", default=300, cast=int
+)
+LOGIN_SHIELD_TRUST_X_FORWARDED_FOR = config(
+    "LOGIN_SHIELD_TRUST_X_FORWARDED_FOR", default=False, cast=bool
+)
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -148,6 +202,85 @@ STATICFILES_DIRS = [
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 MEDIA_URL = "/media/"
 
+# Profile photos are stored as uploaded and resized in the background into
+# these renditions (name: bounding box in pixels), in WebP and JPEG.
+PROFILE_PHOTO_RENDITIONS = {"avatar": 64, "card": 300, "full": 1080}
+PROFILE_PHOTO_QUALITY = config("PROFILE_PHOTO_QUALITY", default=82, cast=int)
+PROFILE_PHOTO_WORKERS = config("PROFILE_PHOTO_WORKERS", default=2, cast=int)
+# Uploads above these ceilings are rejected before being decoded.
+PROFILE_PHOTO_MAX_BYTES = config(
+    "PROFILE_PHOTO_MAX_BYTES", default=20 * 1024 * 1024, cast=int
+)
+PROFILE_PHOTO_MAX_PIXELS = config("PROFILE_PHOTO_MAX_PIXELS", default=60_000_000, cast=int)
+PROFILE_PHOTO_DEFAULT_URL = MEDIA_URL + "profile_photos/default_profile_foto.jpg"
+
+# Time zone of the local dates and times companions enter their availability
+# in; they are also stored as UTC ranges.
+AVAILABILITY_TIME_ZONE = config("AVAILABILITY_TIME_ZONE", default="America/Bogota")
+
+# Days of companion availability bitmaps kept in memory by each process.
+AVAILABILITY_ENGINE_MAX_DAYS = config(
+    "AVAILABILITY_ENGINE_MAX_DAYS", default=60, cast=int
+)
+
+# Rank companion searches on an in-memory index of the companions instead
+# of in SQL.
+COMPANION_SEARCH_IN_MEMORY = config("COMPANION_SEARCH_IN_MEMORY", default=True, cast=bool)
+
+# Backend of the skill and preference text search: "auto" uses SQLite FTS5 or
+# the MySQL FULLTEXT index when the migrations created them, "memory" always
+# uses the in-process index.
+TEXT_SEARCH_BACKEND = config("TEXT_SEARCH_BACKEND", default="auto")
+
+# Companions recommended to every customer from their preferences, computed
+# by a background worker when preferences or skills change (synchronously
+# after commit when RECOMMENDATIONS_ASYNC is off). Customers are scored in
+# batches of RECOMMENDATIONS_BATCH_SIZE, each needing a float32 score per
+# companion and customer.
+RECOMMENDATIONS_TOP_K = config("RECOMMENDATIONS_TOP_K", default=10, cast=int)
+RECOMMENDATIONS_BATCH_SIZE = config("RECOMMENDATIONS_BATCH_SIZE", default=64, cast=int)
+RECOMMENDATIONS_ASYNC = config("RECOMMENDATIONS_ASYNC", default=True, cast=bool)
+RECOMMENDATIONS_DEBOUNCE = config("RECOMMENDATIONS_DEBOUNCE", default=0.5, cast=float)
+
+# How concurrent reservations of a companion are serialized: "lock" takes the
+# companion row first, "optimistic" checks its booking version when writing.
+# A booking losing a race (or a SQLite "database is locked") is retried up to
+# RESERVATION_MAX_ATTEMPTS times with a random backoff of up to
+# RESERVATION_RETRY_DELAY seconds, doubled at every attempt.
+RESERVATION_LOCKING = config("RESERVATION_LOCKING", default="lock")
+RESERVATION_MAX_ATTEMPTS = config("RESERVATION_MAX_ATTEMPTS", default=5, cast=int)
+RESERVATION_RETRY_DELAY = config("RESERVATION_RETRY_DELAY", default=0.01, cast=float)
+# Most slots a customer can book in one batch (reserve/book/batch/).
+RESERVATION_BATCH_MAX_SLOTS = config("RESERVATION_BATCH_MAX_SLOTS", default=200, cast=int)
+
+# Seconds a companion's time range stays held while a customer checks out.
+# Holds live in the shared cache ("cache"), or in the database ("database"),
+# which "auto" uses when the cache is local to each process. Expired hold rows
+# are deleted every RESERVATION_HOLD_SWEEP_INTERVAL seconds, in batches.
+RESERVATION_HOLD_TTL = config("RESERVATION_HOLD_TTL", default=600, cast=int)
+RESERVATION_HOLD_STORE = config("RESERVATION_HOLD_STORE", default="auto")
+RESERVATION_HOLD_SWEEP_INTERVAL = config(
+    "RESERVATION_HOLD_SWEEP_INTERVAL", default=60, cast=int
+)
+RESERVATION_HOLD_SWEEP_BATCH = config("RESERVATION_HOLD_SWEEP_BATCH", default=1000, cast=int)
+
+# Care request assignment (reserve.assignment): the cost of a companion for a
+# visit is its price at the hourly rate, plus a cost per km of distance and
+# per requested skill the companion lacks. Companions farther than
+# ASSIGNMENT_MAX_DISTANCE_KM are not assigned.
+ASSIGNMENT_COST_PER_KM = config("ASSIGNMENT_COST_PER_KM", default=0.5, cast=float)
+ASSIGNMENT_MISSING_SKILL_COST = config("ASSIGNMENT_MISSING_SKILL_COST", default=20.0, cast=float)
+ASSIGNMENT_MAX_DISTANCE_KM = config("ASSIGNMENT_MAX_DISTANCE_KM", default=50.0, cast=float)
+
+# Quotes (reserve.pricing): surcharges in basis points (2500 is 25%) on the
+# minutes of a weekend and of the night window, and volume discounts in basis
+# points by the total hours of the quote, as (minimum hours, discount) pairs.
+PRICING_WEEKEND_SURCHARGE = config("PRICING_WEEKEND_SURCHARGE", default=2500, cast=int)
+PRICING_NIGHT_SURCHARGE = config("PRICING_NIGHT_SURCHARGE", default=3500, cast=int)
+PRICING_NIGHT_START = config("PRICING_NIGHT_START", default="22:00")
+PRICING_NIGHT_END = config("PRICING_NIGHT_END", default="06:00")
+PRICING_VOLUME_DISCOUNTS = [(20, 500), (40, 1000), (80, 1500)]
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 